@@ -12,10 +12,46 @@ def create_app(config_name='default'):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     
+    # Pool sizing and timeouts from the DB_* settings
+    from app.utils.engine import init_engine_options
+    init_engine_options(app)
+    
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
     
+    # Request latency / SQL instrumentation on /metrics (first, so its timing covers the other hooks)
+    from app.utils.metrics import Metrics
+    Metrics(app)
+    
+    # Per-prefix ID allocator used by the service layer
+    from app.services.id_allocator import init_id_allocator
+    init_id_allocator(app)
+    
+    # Maintenance item search (full-text on PostgreSQL, in-memory index on SQLite)
+    from app.services.search import SearchEngine
+    SearchEngine().init_app(app)
+    
+    # Technician skill index for batch assignment
+    from app.services.assignment import AssignmentEngine
+    AssignmentEngine().init_app(app)
+    
+    # Read-through cache for summary/analytics/list reads
+    from app.utils.cache import ResponseCache
+    ResponseCache(app)
+    
+    # OIDC signing keys for bearer token verification
+    from app.utils.auth import init_auth
+    init_auth(app)
+    
+    # Periodic background jobs (started by the entrypoint, not here)
+    from app.utils.scheduler import init_scheduler
+    init_scheduler(app)
+    
+    # gzip/brotli/zstd response compression negotiated from Accept-Encoding
+    from app.utils.compression import Compression
+    Compression(app)
+    
     # Configure CORS for all routes (including /health and /api/*)
     CORS(app, resources={
         r"/*": {
@@ -1,7 +1,9 @@
 from app import db
 from datetime import datetime
 from enum import Enum
-from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.schema import CreateColumn
 
 class MaintenanceStatus(str, Enum):
     OVERDUE = 'overdue'
@@ -30,8 +32,62 @@ class FrequencyType(str, Enum):
     YEARLY = 'yearly'
     MILEAGE_BASED = 'mileage-based'
 
+class ReservationStatus(str, Enum):
+    RESERVED = 'reserved'
+    CONSUMED = 'consumed'
+    RELEASED = 'released'
+    SHORT = 'short'  # Units the item needs that stock could not cover; not counted in Part.reserved_quantity
+
+@compiles(CreateColumn)
+def _create_column(element, compiler, **kw):
+    # Columns marked postgresql_only (e.g. tsvector) are left out of CREATE TABLE elsewhere
+    if element.element.info.get('postgresql_only') and compiler.dialect.name != 'postgresql':
+        return None
+    return compiler.visit_create_column(element, **kw)
+
+# Weighted full-text document for search (A: id/vehicle/type, B: technician, C: description)
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('simple', "
+    "coalesce(id, '') || ' ' || coalesce(vehicle_id, '') || ' ' || coalesce(type, '')), 'A') || "
+    "setweight(to_tsvector('simple', "
+    "coalesce(assigned_technician, '') || ' ' || coalesce(assigned_to, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
+def _default_projected_due_date(context):
+    # Without a mileage projection an item is expected on its calendar due date
+    return context.get_current_parameters()['due_date']
+
 class MaintenanceItem(db.Model):
     __tablename__ = 'maintenance_items'
+    __table_args__ = (
+        # List ordering / keyset pagination: (status DESC, priority DESC, due_date, id)
+        db.Index('ix_maintenance_items_list_order', db.desc('status'), db.desc('priority'), 'due_date', 'id'),
+        # Overdue list and status filters ordered by due date
+        db.Index('ix_maintenance_items_status_due_date', 'status', 'due_date'),
+        # Upcoming list and bulk status job only touch open items
+        db.Index('ix_maintenance_items_open_due_date', 'due_date',
+                 postgresql_where=db.text("status IN ('scheduled', 'due_soon')"),
+                 sqlite_where=db.text("status IN ('scheduled', 'due_soon')")),
+        db.Index('ix_maintenance_items_vehicle_due_date', 'vehicle_id', 'due_date'),
+        db.Index('ix_maintenance_items_type_status', 'type', 'status'),
+        db.Index('ix_maintenance_items_created_at', 'created_at'),
+        # Upcoming list and status job by expected due date (calendar or mileage projection)
+        db.Index('ix_maintenance_items_status_projected_due', 'status', 'projected_due_date'),
+        # Batch technician assignment: open items nobody is assigned to, most urgent first
+        db.Index('ix_maintenance_items_unassigned', 'projected_due_date',
+                 postgresql_where=db.text("status IN ('scheduled', 'due_soon', 'overdue') AND assigned_technician IS NULL"),
+                 sqlite_where=db.text("status IN ('scheduled', 'due_soon', 'overdue') AND assigned_technician IS NULL")),
+        # Technician workload (counter reconciliation, unlinking on delete)
+        db.Index('ix_maintenance_items_technician_status', 'technician_id', 'status'),
+        # One item per recurring-schedule occurrence (makes materialization idempotent)
+        db.Index('ux_maintenance_items_schedule_due_date', 'schedule_id', 'due_date', unique=True),
+        # Full-text search (PostgreSQL only, like search_vector)
+        db.Index('ix_maintenance_items_search_vector', 'search_vector',
+                 postgresql_using='gin').ddl_if(dialect='postgresql'),
+    )
+    # search_vector is only read in SQL (app/services/search.py), never loaded into items
+    __mapper_args__ = {'exclude_properties': ['search_vector']}
     
     id = db.Column(db.String(50), primary_key=True)
     vehicle_id = db.Column(db.String(50), nullable=False, index=True)
@@ -46,6 +102,8 @@ class MaintenanceItem(db.Model):
     completed_date = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # Earlier of due_date and the date the vehicle is projected to reach due_mileage
+    projected_due_date = db.Column(db.Date, nullable=False, default=_default_projected_due_date)
     
     # Mileage
     current_mileage = db.Column(db.Integer, nullable=False)
@@ -57,13 +115,21 @@ class MaintenanceItem(db.Model):
     
     # Assignment
     assigned_to = db.Column(db.String(200))
-    assigned_technician = db.Column(db.String(100))
+    assigned_technician = db.Column(db.String(100))  # display name; technician_id is the link
+    technician_id = db.Column(db.String(50), db.ForeignKey('technicians.id', name='fk_maintenance_items_technician_id', ondelete='SET NULL'))
     
     # Additional info
     notes = db.Column(db.Text)
     parts_needed = db.Column(db.JSON)
     attachments = db.Column(db.JSON)
     
+    # Recurring schedule this item was generated from
+    schedule_id = db.Column(db.String(50))
+    
+    # Generated by PostgreSQL from the columns above; not created on SQLite
+    search_vector = db.Column(TSVECTOR, db.Computed(SEARCH_VECTOR_EXPRESSION, persisted=True),
+                              info={'postgresql_only': True})
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -75,15 +141,18 @@ class MaintenanceItem(db.Model):
             'due_date': self.due_date.isoformat() if self.due_date else None,
             'scheduled_date': self.scheduled_date.isoformat() if self.scheduled_date else None,
             'completed_date': self.completed_date.isoformat() if self.completed_date else None,
+            'projected_due_date': self.projected_due_date.isoformat() if self.projected_due_date else None,
             'current_mileage': self.current_mileage,
             'due_mileage': self.due_mileage,
             'estimated_cost': self.estimated_cost,
             'actual_cost': self.actual_cost,
             'assigned_to': self.assigned_to,
             'assigned_technician': self.assigned_technician,
+            'technician_id': self.technician_id,
             'notes': self.notes,
             'parts_needed': self.parts_needed,
             'attachments': self.attachments,
+            'schedule_id': self.schedule_id,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -129,12 +198,16 @@ class Technician(db.Model):
 
 class Part(db.Model):
     __tablename__ = 'parts'
+    __table_args__ = (
+        db.CheckConstraint('reserved_quantity >= 0 AND reserved_quantity <= quantity', name='ck_parts_reserved_quantity'),
+    )
 
     id = db.Column(db.String(50), primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     part_number = db.Column(db.String(50), unique=True, nullable=False)
     category = db.Column(db.String(50), nullable=False)
     quantity = db.Column(db.Integer, default=0, nullable=False)
+    reserved_quantity = db.Column(db.Integer, default=0, nullable=False)  # Held by open maintenance items
     min_quantity = db.Column(db.Integer, default=0, nullable=False)
     unit_cost = db.Column(db.Float, default=0.0, nullable=False)
     supplier = db.Column(db.String(100))
@@ -151,6 +224,8 @@ class Part(db.Model):
             'part_number': self.part_number,
             'category': self.category,
             'quantity': self.quantity,
+            'reserved_quantity': self.reserved_quantity,
+            'available_quantity': self.quantity - (self.reserved_quantity or 0),
             'min_quantity': self.min_quantity,
             'unit_cost': self.unit_cost,
             'supplier': self.supplier,
@@ -163,6 +238,14 @@ class Part(db.Model):
 
 class RecurringSchedule(db.Model):
     __tablename__ = 'recurring_schedules'
+    __table_args__ = (
+        # Due active schedules for materialization
+        db.Index('ix_recurring_schedules_active_next', 'next_scheduled',
+                 postgresql_where=db.text('is_active'),
+                 sqlite_where=db.text('is_active')),
+        # Mileage-based schedules of a vehicle, re-projected when readings arrive
+        db.Index('ix_recurring_schedules_vehicle_frequency', 'vehicle_id', 'frequency'),
+    )
 
     id = db.Column(db.String(50), primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -177,6 +260,8 @@ class RecurringSchedule(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     last_executed = db.Column(db.DateTime)
     next_scheduled = db.Column(db.DateTime)
+    # Mileage-based schedules: odometer reading at which the next occurrence is due
+    next_due_mileage = db.Column(db.Integer)
     total_executions = db.Column(db.Integer, default=0)
     created_date = db.Column(db.Date, default=datetime.utcnow)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -197,8 +282,111 @@ class RecurringSchedule(db.Model):
             'is_active': self.is_active,
             'last_executed': self.last_executed.isoformat() if self.last_executed else None,
             'next_scheduled': self.next_scheduled.isoformat() if self.next_scheduled else None,
+            'next_due_mileage': self.next_due_mileage,
             'total_executions': self.total_executions,
             'created_date': self.created_date.isoformat() if self.created_date else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+
+class OdometerReading(db.Model):
+    """Odometer time series, compacted to one reading per vehicle per day"""
+    __tablename__ = 'odometer_readings'
+    __table_args__ = (
+        db.UniqueConstraint('vehicle_id', 'reading_date', name='uq_odometer_readings_vehicle_date'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    vehicle_id = db.Column(db.String(50), nullable=False)
+    reading_date = db.Column(db.Date, nullable=False)
+    odometer = db.Column(db.Integer, nullable=False)
+    recorded_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def to_dict(self):
+        return {
+            'vehicle_id': self.vehicle_id,
+            'reading_date': self.reading_date.isoformat() if self.reading_date else None,
+            'odometer': self.odometer,
+            'recorded_at': self.recorded_at.isoformat() if self.recorded_at else None
+        }
+
+class VehicleMileage(db.Model):
+    """Latest odometer and fitted daily distance per vehicle"""
+    __tablename__ = 'vehicle_mileage'
+
+    vehicle_id = db.Column(db.String(50), primary_key=True)
+    odometer = db.Column(db.Integer, nullable=False)
+    odometer_date = db.Column(db.Date, nullable=False)
+    daily_rate = db.Column(db.Float)  # km/day; NULL until enough readings span at least a day
+    sample_count = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def to_dict(self):
+        return {
+            'vehicle_id': self.vehicle_id,
+            'odometer': self.odometer,
+            'odometer_date': self.odometer_date.isoformat() if self.odometer_date else None,
+            'daily_rate': self.daily_rate,
+            'sample_count': self.sample_count,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class PartReservation(db.Model):
+    """Parts held for a maintenance item: reserved while it is open, consumed when it is completed"""
+    __tablename__ = 'part_reservations'
+    __table_args__ = (
+        db.Index('ix_part_reservations_item_status', 'item_id', 'status'),
+        db.Index('ix_part_reservations_part_status', 'part_id', 'status'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    item_id = db.Column(db.String(50), db.ForeignKey('maintenance_items.id', ondelete='CASCADE'), nullable=False)
+    part_id = db.Column(db.String(50), db.ForeignKey('parts.id', ondelete='CASCADE'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.Enum(ReservationStatus, name='reservationstatus', values_callable=lambda x: [e.value for e in x]), default=ReservationStatus.RESERVED, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'item_id': self.item_id,
+            'part_id': self.part_id,
+            'quantity': self.quantity,
+            'status': self.status.value if self.status else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class PartMovement(db.Model):
+    """Stock ledger: one row per change to Part.quantity"""
+    __tablename__ = 'part_movements'
+    __table_args__ = (
+        db.Index('ix_part_movements_part_created', 'part_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    part_id = db.Column(db.String(50), db.ForeignKey('parts.id', ondelete='CASCADE'), nullable=False)
+    item_id = db.Column(db.String(50))  # Consuming maintenance item; kept after the item is deleted
+    delta = db.Column(db.Integer, nullable=False)
+    reason = db.Column(db.String(20), nullable=False)  # restock, use, adjust, consume
+    quantity_after = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'part_id': self.part_id,
+            'item_id': self.item_id,
+            'delta': self.delta,
+            'reason': self.reason,
+            'quantity_after': self.quantity_after,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class IdSequence(db.Model):
+    """Per-prefix counter backing the table-based ID allocator"""
+    __tablename__ = 'id_sequences'
+
+    prefix = db.Column(db.String(20), primary_key=True)
+    next_value = db.Column(db.BigInteger, nullable=False, default=1)
@@ -116,10 +116,11 @@ def get_vehicle_history(vehicle_id):
 def update_statuses_bulk():
     """Background job endpoint to update maintenance statuses"""
     try:
-        updated = MaintenanceService.update_maintenance_status_bulk()
+        result = MaintenanceService.update_maintenance_status_bulk()
         return jsonify({
-            'message': f'Updated {updated} maintenance items',
-            'updated_count': updated
+            'message': f"Updated {result['updated_count']} maintenance items",
+            'updated_count': result['updated_count'],
+            'transitions': result['transitions']
         }), 200
     
     except Exception as e:
@@ -3,10 +3,19 @@ Flask-RESTX API Routes with Swagger Documentation
 Provides OpenAPI/Swagger UI for the Maintenance Service
 """
 
-from flask import request
+import json
+
+from flask import request, current_app, Response, stream_with_context
 from flask_restx import Namespace, Resource, fields
-from app.utils.auth import require_auth
+from app.utils.auth import require_auth, get_token_cache
+from app.utils.cache import get_cache
+from app.utils.conditional import is_fresh, item_validators, page_validators, table_validators, validator_headers
+from app.utils.engine import pool_stats
+from app.utils.pagination import InvalidCursor
+from app.utils.serializer import InvalidFields, json_response, iter_ndjson, iter_csv
+from app.models.maintainance import Technician, Part, RecurringSchedule
 from app.services.maintainance_service import MaintenanceService
+from app.services.inventory import InsufficientStock, StockConflict
 from app.schemas.maintainance_schema import (
     MaintenanceItemCreateSchema,
     MaintenanceItemUpdateSchema,
@@ -16,9 +25,13 @@ from app.schemas.maintainance_schema import (
     PartSchema,
     PartCreateSchema,
     PartUpdateSchema,
+    PartStockAdjustSchema,
     RecurringScheduleSchema,
     RecurringScheduleCreateSchema,
-    RecurringScheduleUpdateSchema
+    RecurringScheduleUpdateSchema,
+    TechnicianAssignSchema,
+    OdometerReadingSchema,
+    OdometerReadingBatchSchema
 )
 from marshmallow import ValidationError
 
@@ -42,19 +55,30 @@ maintenance_item_model = api.model('MaintenanceItem', {
     'due_date': fields.Date(required=True, description='Due date', example='2024-12-31'),
     'scheduled_date': fields.DateTime(description='Scheduled date and time'),
     'completed_date': fields.DateTime(description='Completion date and time'),
+    'projected_due_date': fields.Date(description='Earlier of due_date and the date due_mileage is projected to be reached'),
     'current_mileage': fields.Integer(required=True, description='Current vehicle mileage', example=45000),
     'due_mileage': fields.Integer(required=True, description='Mileage when maintenance is due', example=50000),
     'estimated_cost': fields.Float(description='Estimated cost', example=150.50),
     'actual_cost': fields.Float(description='Actual cost after completion', example=175.00),
     'assigned_to': fields.String(description='Service center or technician', example='Service Center A'),
     'assigned_technician': fields.String(description='Assigned technician name'),
+    'technician_id': fields.String(description='Assigned technician ID'),
     'notes': fields.String(description='Additional notes'),
     'parts_needed': fields.Raw(description='JSON list of required parts'),
     'attachments': fields.Raw(description='JSON list of attachment URLs'),
+    'schedule_id': fields.String(description='Recurring schedule that generated this item', example='RS001'),
     'created_at': fields.DateTime(description='Creation timestamp'),
     'updated_at': fields.DateTime(description='Last update timestamp'),
 })
 
+# Returned by create/update: the item plus the parts stock could not cover
+maintenance_item_write_model = api.inherit('MaintenanceItemWrite', maintenance_item_model, {
+    'part_shortages': fields.Raw(description='{part_id: units} of parts_needed that stock could not cover. '
+                                             'The item is saved anyway and these units are held as short '
+                                             'reservations, retried on the next update or '
+                                             'POST /<id>/reservations; pass ?strict_stock=true to get 409 instead'),
+})
+
 # Create Model (for POST requests)
 maintenance_create_model = api.model('MaintenanceCreate', {
     'id': fields.String(required=True, description='Unique maintenance item ID', example='M006'),
@@ -69,7 +93,11 @@ maintenance_create_model = api.model('MaintenanceCreate', {
     'estimated_cost': fields.Float(description='Estimated cost', example=150.50),
     'assigned_to': fields.String(description='Service center', example='Service Center A'),
     'assigned_technician': fields.String(description='Technician name'),
+    'technician_id': fields.String(description='Technician ID (sets assigned_technician to their name; empty to unassign)'),
     'notes': fields.String(description='Additional notes'),
+    'parts_needed': fields.List(fields.Raw, description='Required parts: {part_id, name, quantity}; entries with a part_id are reserved from stock. '
+                                                  'A shortage no longer rejects the item: the missing units are reserved '
+                                                  'short (see part_shortages) unless ?strict_stock=true'),
 })
 
 # Update Model (for PUT/PATCH requests)
@@ -87,8 +115,11 @@ maintenance_update_model = api.model('MaintenanceUpdate', {
     'actual_cost': fields.Float(description='Actual cost'),
     'assigned_to': fields.String(description='Service center'),
     'assigned_technician': fields.String(description='Technician name'),
+    'technician_id': fields.String(description='Technician ID (sets assigned_technician to their name; empty to unassign)'),
     'notes': fields.String(description='Additional notes'),
-    'parts_needed': fields.Raw(description='Required parts'),
+    'parts_needed': fields.List(fields.Raw, description='Required parts: {part_id, name, quantity}; entries with a part_id are reserved from stock. '
+                                                  'A shortage no longer rejects the item: the missing units are reserved '
+                                                  'short (see part_shortages) unless ?strict_stock=true'),
     'attachments': fields.Raw(description='Attachments'),
 })
 
@@ -99,6 +130,7 @@ pagination_model = api.model('PaginatedMaintenanceItems', {
     'page': fields.Integer(description='Current page number'),
     'per_page': fields.Integer(description='Items per page'),
     'pages': fields.Integer(description='Total number of pages'),
+    'next_cursor': fields.String(description='Cursor for the next page (cursor mode only, null on the last page)'),
 })
 
 # Summary Model
@@ -127,8 +159,8 @@ technician_model = api.model('Technician', {
     'specialization': fields.List(fields.String, description='List of specializations'),
     'status': fields.String(description='Status'),
     'rating': fields.Float(description='Rating'),
-    'completed_jobs': fields.Integer(description='Completed Jobs Count'),
-    'active_jobs': fields.Integer(description='Active Jobs Count'),
+    'completed_jobs': fields.Integer(description='Jobs completed (counted when an item is completed, kept when it is deleted)'),
+    'active_jobs': fields.Integer(description='Open and in-progress items assigned (kept in step with item status)'),
     'certifications': fields.List(fields.String, description='Certifications'),
     'hourly_rate': fields.Float(description='Hourly Rate'),
     'join_date': fields.String(description='Join Date'),
@@ -154,12 +186,35 @@ technician_update_model = api.model('TechnicianUpdate', {
     'specialization': fields.List(fields.String),
     'status': fields.String(),
     'rating': fields.Float(),
-    'completed_jobs': fields.Integer(),
-    'active_jobs': fields.Integer(),
     'certifications': fields.List(fields.String),
     'hourly_rate': fields.Float(),
 })
 
+technician_assign_model = api.model('TechnicianAssign', {
+    'item_ids': fields.List(fields.String, description='Items to assign (default: all open unassigned items)'),
+    'limit': fields.Integer(description='Most items assigned per call (default: ASSIGNMENT_BATCH_LIMIT)'),
+    'max_active_jobs': fields.Integer(description='Active job cap per technician (default: ASSIGNMENT_MAX_ACTIVE_JOBS)'),
+    'require_skill': fields.Boolean(description='Leave items no technician has a matching skill for unassigned', default=False),
+    'dry_run': fields.Boolean(description='Return the plan without saving it', default=False),
+})
+
+technician_assignment_model = api.model('TechnicianAssignment', {
+    'item_id': fields.String(description='Maintenance item ID'),
+    'technician_id': fields.String(description='Technician ID'),
+    'technician_name': fields.String(description='Technician Name'),
+    'skill_match': fields.Float(description='Share of the job type\'s skill terms the technician covers (0-1)'),
+})
+
+technician_assign_result_model = api.model('TechnicianAssignResult', {
+    'assigned': fields.Integer(description='Items assigned'),
+    'unassigned': fields.Integer(description='Items left unassigned (no capacity or no skill match)'),
+    'dry_run': fields.Boolean(description='Whether the plan was saved'),
+    'assignments': fields.List(fields.Nested(technician_assignment_model)),
+    'unassigned_items': fields.List(fields.String, description='IDs of items left unassigned'),
+    'skipped': fields.Integer(description='Items another caller assigned first, or whose technician became unavailable (left as they were)'),
+    'skipped_items': fields.List(fields.String, description='IDs of skipped items'),
+})
+
 # Part Model
 part_model = api.model('Part', {
     'id': fields.String(description='Part ID'),
@@ -167,6 +222,8 @@ part_model = api.model('Part', {
     'part_number': fields.String(description='Part Number'),
     'category': fields.String(description='Category'),
     'quantity': fields.Integer(description='Quantity in stock'),
+    'reserved_quantity': fields.Integer(description='Units held by open maintenance items'),
+    'available_quantity': fields.Integer(description='Units not yet reserved (quantity - reserved_quantity)'),
     'min_quantity': fields.Integer(description='Minimum quantity'),
     'unit_cost': fields.Float(description='Unit cost'),
     'supplier': fields.String(description='Supplier'),
@@ -191,7 +248,9 @@ part_update_model = api.model('PartUpdate', {
     'name': fields.String(),
     'part_number': fields.String(),
     'category': fields.String(),
-    'quantity': fields.Integer(),
+    'quantity': fields.Integer(description='Stock count; set atomically and recorded in the stock ledger. '
+                                           'A count below reserved_quantity is accepted: the newest '
+                                           'reservations that no longer fit become short'),
     'min_quantity': fields.Integer(),
     'unit_cost': fields.Float(),
     'supplier': fields.String(),
@@ -199,6 +258,33 @@ part_update_model = api.model('PartUpdate', {
     'used_in': fields.List(fields.String),
 })
 
+part_stock_adjust_model = api.model('PartStockAdjust', {
+    'delta': fields.Integer(required=True, description='Units to add (restock) or take out (negative); taking out '
+                                                       'reserved units makes the newest reservations short'),
+    'reason': fields.String(enum=['restock', 'use', 'adjust'], description='Ledger reason (default: restock)'),
+    'item_id': fields.String(description='Maintenance item the units were used for'),
+})
+
+part_movement_model = api.model('PartMovement', {
+    'id': fields.Integer(description='Ledger entry ID'),
+    'part_id': fields.String(description='Part ID'),
+    'item_id': fields.String(description='Maintenance item, if any'),
+    'delta': fields.Integer(description='Change in quantity'),
+    'reason': fields.String(description='restock, use, adjust or consume'),
+    'quantity_after': fields.Integer(description='Quantity after the change'),
+    'created_at': fields.String(description='Timestamp'),
+})
+
+part_reservation_model = api.model('PartReservation', {
+    'id': fields.Integer(description='Reservation ID'),
+    'item_id': fields.String(description='Maintenance item ID'),
+    'part_id': fields.String(description='Part ID'),
+    'quantity': fields.Integer(description='Units'),
+    'status': fields.String(description='reserved, consumed, released or short (units stock could not cover)'),
+    'created_at': fields.String(description='Created timestamp'),
+    'updated_at': fields.String(description='Updated timestamp'),
+})
+
 # Recurring Schedule Model
 recurring_schedule_model = api.model('RecurringSchedule', {
     'id': fields.String(description='Schedule ID'),
@@ -214,6 +300,7 @@ recurring_schedule_model = api.model('RecurringSchedule', {
     'is_active': fields.Boolean(description='Is Active'),
     'last_executed': fields.String(description='Last Executed'),
     'next_scheduled': fields.String(description='Next Scheduled'),
+    'next_due_mileage': fields.Integer(description='Odometer reading the next occurrence is due at (mileage-based)'),
     'total_executions': fields.Integer(description='Total Executions'),
     'created_date': fields.String(description='Created Date'),
 })
@@ -242,6 +329,99 @@ recurring_schedule_update_model = api.model('RecurringScheduleUpdate', {
     'is_active': fields.Boolean(),
 })
 
+# Odometer / Vehicle Mileage Models
+odometer_reading_model = api.model('OdometerReading', {
+    'vehicle_id': fields.String(description='Vehicle ID (batch endpoint only)', example='VH-001'),
+    'odometer': fields.Integer(required=True, description='Odometer reading', example=45230),
+    'reading_date': fields.Date(readonly=True, description='Day the reading is stored under'),
+    'recorded_at': fields.DateTime(description='When the reading was taken (default: now)'),
+})
+
+odometer_batch_model = api.model('OdometerReadingBatch', {
+    'readings': fields.List(fields.Nested(odometer_reading_model), required=True),
+})
+
+vehicle_mileage_model = api.model('VehicleMileage', {
+    'vehicle_id': fields.String(description='Vehicle ID'),
+    'odometer': fields.Integer(description='Latest odometer reading'),
+    'odometer_date': fields.Date(description='Date of the latest reading'),
+    'daily_rate': fields.Float(description='Fitted distance per day; null until readings span a day'),
+    'sample_count': fields.Integer(description='Readings in the fitting window'),
+    'updated_at': fields.DateTime(description='Last refit'),
+    'readings': fields.List(fields.Nested(odometer_reading_model), description='Most recent daily readings'),
+})
+
+# ==================== Helpers ====================
+
+def _stream_cost_analytics(analytics):
+    """Write the cost analytics document, emitting by_vehicle one entry at a time"""
+    yield json.dumps(analytics)[:-1] + ', "by_vehicle": {'
+    separator = ''
+    for vehicle_id, costs in MaintenanceService.iter_vehicle_costs():
+        yield f'{separator}{json.dumps(vehicle_id)}: {json.dumps(costs)}'
+        separator = ', '
+    yield '}}'
+
+def _list_filters():
+    """Filters shared by the list and export endpoints"""
+    filters = {}
+    if request.args.get('vehicle'):
+        filters['vehicle'] = request.args.get('vehicle')
+    if request.args.get('status'):
+        filters['status'] = request.args.getlist('status')
+    if request.args.get('priority'):
+        filters['priority'] = request.args.getlist('priority')
+    if request.args.get('assignedTo'):
+        filters['assignedTo'] = request.args.get('assignedTo')
+    return filters
+
+def _requested_fields():
+    """Sparse fieldset from ?fields=id,status,due_date (None = all fields)"""
+    fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()]
+    return fields or None
+
+def _conditional_page_response(result, serializer):
+    """
+    Serialize a page of Rows from get_maintenance_page/search_maintenance_page,
+    or answer 304 when the client's ETag still matches (checked before serializing)
+    """
+    etag, last_modified = page_validators(
+        result['items'], serializer.fields, result.get('total'), result.get('pages'), result.get('next_cursor')
+    )
+    headers = validator_headers(etag, last_modified)
+    # Pages are validated by ETag only: their newest updated_at does not move when a row leaves the page
+    if is_fresh(etag):
+        return Response(status=304, headers=headers)
+    
+    result['items'] = serializer.to_dicts(result['items'])
+    response = _page_response(result)
+    response.headers.update(headers)
+    return response
+
+def _strict_stock():
+    """?strict_stock=true: fail with 409 instead of saving an item whose parts are short"""
+    return request.args.get('strict_stock', 'false').lower() == 'true'
+
+def _item_write_response(item):
+    """An item returned by create/update, with the parts stock could not cover"""
+    return {**item.to_dict(), 'part_shortages': MaintenanceService.get_item_shortages(item.id)}
+
+def _conditional_table(model):
+    """(fresh, headers) for an endpoint listing `model` rows"""
+    etag, last_modified = table_validators(model)
+    return is_fresh(etag), validator_headers(etag, last_modified)
+
+def _page_response(result):
+    """Encode a page in pagination_model's shape without marshalling every item"""
+    return json_response({
+        'items': result['items'],
+        'total': result.get('total'),
+        'page': result.get('page'),
+        'per_page': result.get('per_page'),
+        'pages': result.get('pages'),
+        'next_cursor': result.get('next_cursor'),
+    })
+
 # ==================== API Resources ====================
 
 @api.route('/')
@@ -253,9 +433,13 @@ class MaintenanceList(Resource):
                  'vehicle': 'Filter by vehicle ID',
                  'status': 'Filter by status (can specify multiple)',
                  'priority': 'Filter by priority (can specify multiple)',
-                 'assignedTo': 'Filter by assignment'
+                 'assignedTo': 'Filter by assignment',
+                 'cursor': 'Keyset pagination cursor; pass empty for the first page, then next_cursor',
+                 'count': 'Total in cursor mode: none (default), estimate or exact',
+                 'fields': 'Comma-separated fields to return, e.g. id,vehicle_id,status,priority,due_date (id is always included)'
              })
-    @api.marshal_with(pagination_model, code=200, description='Success')
+    @api.response(200, 'Success', pagination_model)
+    @api.response(304, 'Not Modified (If-None-Match / If-Modified-Since matched)')
     @api.response(500, 'Internal Server Error', error_model)
     @api.response(401, 'Unauthorized')
     @require_auth
@@ -263,29 +447,28 @@ class MaintenanceList(Resource):
         """List all maintenance items with optional filtering and pagination"""
         try:
             # Get query parameters
-            page = request.args.get('page', 1, type=int)
-            per_page = request.args.get('per_page', 10, type=int)
+            page = max(request.args.get('page', 1, type=int), 1)
+            per_page = max(request.args.get('per_page', 10, type=int), 1)
+            filters = _list_filters()
             
-            filters = {}
-            if request.args.get('vehicle'):
-                filters['vehicle'] = request.args.get('vehicle')
-            if request.args.get('status'):
-                filters['status'] = request.args.getlist('status')
-            if request.args.get('priority'):
-                filters['priority'] = request.args.getlist('priority')
-            if request.args.get('assignedTo'):
-                filters['assignedTo'] = request.args.get('assignedTo')
+            cursor = request.args.get('cursor')
+            count = request.args.get('count', 'none')
             
-            result = MaintenanceService.get_all_maintenance_items(filters, page, per_page)
-            return result, 200
+            result, serializer = MaintenanceService.get_maintenance_page(
+                filters, page, per_page, cursor, count, _requested_fields()
+            )
+            return _conditional_page_response(result, serializer)
         
+        except (InvalidCursor, InvalidFields) as e:
+            api.abort(400, str(e))
         except Exception as e:
             api.abort(500, f'Internal server error: {str(e)}')
     
-    @api.doc('create_maintenance_item')
+    @api.doc('create_maintenance_item', params={'strict_stock': 'true to reject the request with 409 if stock cannot cover parts_needed'})
     @api.expect(maintenance_create_model, validate=True)
-    @api.marshal_with(maintenance_item_model, code=201, description='Created')
+    @api.marshal_with(maintenance_item_write_model, code=201, description='Created')
     @api.response(400, 'Validation Error', error_model)
+    @api.response(409, 'Not enough stock to reserve parts_needed (strict_stock=true)', error_model)
     @api.response(500, 'Internal Server Error', error_model)
     @api.response(401, 'Unauthorized')
     @require_auth
@@ -295,11 +478,59 @@ class MaintenanceList(Resource):
             schema = MaintenanceItemCreateSchema()
             data = schema.load(request.json)
             
-            item = MaintenanceService.create_maintenance_item(data)
-            return item.to_dict(), 201
+            item = MaintenanceService.create_maintenance_item(data, _strict_stock())
+            return _item_write_response(item), 201
         
         except ValidationError as e:
             api.abort(400, f'Validation error', errors=e.messages)
+        except InsufficientStock as e:
+            api.abort(409, str(e), shortages=e.shortages)
+        except Exception as e:
+            api.abort(500, f'Internal server error: {str(e)}')
+
+
+@api.route('/export')
+class MaintenanceExport(Resource):
+    @api.doc('export_maintenance_items',
+             params={
+                 'format': 'ndjson (default) or csv',
+                 'vehicle': 'Filter by vehicle ID',
+                 'status': 'Filter by status (can specify multiple)',
+                 'priority': 'Filter by priority (can specify multiple)',
+                 'assignedTo': 'Filter by assignment',
+                 'fields': 'Comma-separated fields to export (id is always included)',
+                 'batch_size': 'Rows fetched and written per chunk (default: EXPORT_BATCH_SIZE)'
+             })
+    @api.response(200, 'Streamed NDJSON or CSV')
+    @api.response(400, 'Invalid format or field', error_model)
+    @api.response(500, 'Internal Server Error', error_model)
+    @api.response(401, 'Unauthorized')
+    @require_auth
+    def get(self):
+        """Stream all matching maintenance items as NDJSON or CSV"""
+        try:
+            export_format = request.args.get('format', 'ndjson').lower()
+            if export_format not in ('ndjson', 'csv'):
+                raise ValueError(f"Unknown format '{export_format}', expected ndjson or csv")
+            
+            batch_size = request.args.get('batch_size', current_app.config.get('EXPORT_BATCH_SIZE', 1000), type=int)
+            # Resolve the fieldset up front so a bad name fails before streaming starts
+            export_fields = MaintenanceService.ITEM_ROWS.project(_requested_fields()).fields
+            batches = MaintenanceService.iter_maintenance_batches(_list_filters(), export_fields, max(batch_size, 1))
+            
+            if export_format == 'csv':
+                body, mimetype = iter_csv(batches, export_fields), 'text/csv'
+            else:
+                body, mimetype = iter_ndjson(batches), 'application/x-ndjson'
+            
+            return Response(
+                stream_with_context(body),
+                mimetype=mimetype,
+                headers={'Content-Disposition': f'attachment; filename=maintenance_items.{export_format}'}
+            )
+        
+        except ValueError as e:
+            api.abort(400, str(e))
         except Exception as e:
             api.abort(500, f'Internal server error: {str(e)}')
 
@@ -310,6 +541,7 @@ class MaintenanceItem(Resource):
     @api.doc('get_maintenance_item')
     @api.marshal_with(maintenance_item_model, code=200, description='Success')
     @api.response(404, 'Maintenance item not found', error_model)
+    @api.response(304, 'Not Modified (If-None-Match / If-Modified-Since matched)')
     @api.response(500, 'Internal Server Error', error_model)
     @api.response(401, 'Unauthorized')
     @require_auth
@@ -320,16 +552,22 @@ class MaintenanceItem(Resource):
             if not item:
                 api.abort(404, f'Maintenance item {item_id} not found')
             
-            return item.to_dict(), 200
+            etag, last_modified = item_validators(item)
+            headers = validator_headers(etag, last_modified)
+            if is_fresh(etag, last_modified):
+                return None, 304, headers
+            
+            return item.to_dict(), 200, headers
         
         except Exception as e:
             api.abort(500, f'Internal server error: {str(e)}')
     
-    @api.doc('update_maintenance_item')
+    @api.doc('update_maintenance_item', params={'strict_stock': 'true to reject the request with 409 if stock cannot cover parts_needed'})
     @api.expect(maintenance_update_model, validate=True)
-    @api.marshal_with(maintenance_item_model, code=200, description='Success')
+    @api.marshal_with(maintenance_item_write_model, code=200, description='Success')
     @api.response(400, 'Validation Error', error_model)
     @api.response(404, 'Maintenance item not found', error_model)
+    @api.response(409, 'Not enough stock to reserve parts_needed (strict_stock=true)', error_model)
     @api.response(500, 'Internal Server Error', error_model)
     @api.response(401, 'Unauthorized')
     @require_auth
@@ -339,22 +577,25 @@ class MaintenanceItem(Resource):
             schema = MaintenanceItemUpdateSchema()
             data = schema.load(request.json, partial=False)
             
-            item = MaintenanceService.update_maintenance_item(item_id, data)
+            item = MaintenanceService.update_maintenance_item(item_id, data, _strict_stock())
             if not item:
                 api.abort(404, f'Maintenance item {item_id} not found')
             
-            return item.to_dict(), 200
+            return _item_write_response(item), 200
         
         except ValidationError as e:
             api.abort(400, f'Validation error', errors=e.messages)
+        except InsufficientStock as e:
+            api.abort(409, str(e), shortages=e.shortages)
         except Exception as e:
             api.abort(500, f'Internal server error: {str(e)}')
     
-    @api.doc('partial_update_maintenance_item')
+    @api.doc('partial_update_maintenance_item', params={'strict_stock': 'true to reject the request with 409 if stock cannot cover parts_needed'})
     @api.expect(maintenance_update_model, validate=True)
-    @api.marshal_with(maintenance_item_model, code=200, description='Success')
+    @api.marshal_with(maintenance_item_write_model, code=200, description='Success')
     @api.response(400, 'Validation Error', error_model)
     @api.response(404, 'Maintenance item not found', error_model)
+    @api.response(409, 'Not enough stock to reserve parts_needed (strict_stock=true)', error_model)
     @api.response(500, 'Internal Server Error', error_model)
     @api.response(401, 'Unauthorized')
     @require_auth
@@ -364,14 +605,16 @@ class MaintenanceItem(Resource):
             schema = MaintenanceItemUpdateSchema()
             data = schema.load(request.json, partial=True)
             
-            item = MaintenanceService.update_maintenance_item(item_id, data)
+            item = MaintenanceService.update_maintenance_item(item_id, data, _strict_stock())
             if not item:
                 api.abort(404, f'Maintenance item {item_id} not found')
             
-            return item.to_dict(), 200
+            return _item_write_response(item), 200
         
         except ValidationError as e:
             api.abort(400, f'Validation error', errors=e.messages)
+        except InsufficientStock as e:
+            api.abort(409, str(e), shortages=e.shortages)
         except Exception as e:
             api.abort(500, f'Internal server error: {str(e)}')
     
@@ -394,6 +637,48 @@ class MaintenanceItem(Resource):
             api.abort(500, f'Internal server error: {str(e)}')
 
 
+@api.route('/<string:item_id>/reservations')
+@api.param('item_id', 'The maintenance item identifier')
+class MaintenanceItemReservations(Resource):
+    @api.doc('get_item_reservations')
+    @api.marshal_list_with(part_reservation_model, code=200)
+    @api.response(404, 'Maintenance item not found', error_model)
+    @api.response(500, 'Internal Server Error', error_model)
+    @api.response(401, 'Unauthorized')
+    @require_auth
+    def get(self, item_id):
+        """Get the parts reserved, consumed, released and short for a maintenance item"""
+        try:
+            reservations = MaintenanceService.get_item_reservations(item_id)
+        except Exception as e:
+            api.abort(500, f'Internal server error: {str(e)}')
+        if reservations is None:
+            api.abort(404, f'Maintenance item {item_id} not found')
+        return reservations, 200
+
+    @api.doc('reserve_item_parts', params={'strict_stock': 'true to reject the request with 409 if stock cannot cover parts_needed'})
+    @api.marshal_list_with(part_reservation_model, code=200)
+    @api.response(400, 'Item is not open or parts_needed is invalid', error_model)
+    @api.response(404, 'Maintenance item not found', error_model)
+    @api.response(409, 'Not enough stock (strict_stock=true)', error_model)
+    @api.response(500, 'Internal Server Error', error_model)
+    @api.response(401, 'Unauthorized')
+    @require_auth
+    def post(self, item_id):
+        """Reserve an open item's parts_needed again (e.g. after a restock)"""
+        try:
+            reservations = MaintenanceService.reserve_item_parts(item_id, _strict_stock())
+        except ValidationError as e:
+            api.abort(400, f'Validation error', errors=e.messages)
+        except InsufficientStock as e:
+            api.abort(409, str(e), shortages=e.shortages)
+        except Exception as e:
+            api.abort(500, f'Internal server error: {str(e)}')
+        if reservations is None:
+            api.abort(404, f'Maintenance item {item_id} not found')
+        return reservations, 200
+
+
 @api.route('/summary')
 class MaintenanceSummary(Resource):
     @api.doc('get_maintenance_summary')
@@ -412,31 +697,108 @@ class MaintenanceSummary(Resource):
 @api.route('/vehicle/<string:vehicle_id>/history')
 @api.param('vehicle_id', 'The vehicle identifier')
 class VehicleHistory(Resource):
-    @api.doc('get_vehicle_maintenance_history')
-    @api.marshal_list_with(maintenance_item_model, code=200, description='Success')
+    @api.doc('get_vehicle_maintenance_history',
+             params={
+                 'fields': 'Comma-separated fields to return, e.g. id,vehicle_id,status,priority,due_date (id is always included)'
+             })
+    @api.response(200, 'Success', [maintenance_item_model])
+    @api.response(400, 'Unknown field', error_model)
     @api.response(500, 'Internal Server Error', error_model)
     def get(self, vehicle_id):
         """Get maintenance history for a specific vehicle"""
         try:
-            history = MaintenanceService.get_vehicle_maintenance_history(vehicle_id)
-            return history, 200
+            history = MaintenanceService.get_vehicle_maintenance_history(vehicle_id, _requested_fields())
+            return json_response(history)
         
+        except InvalidFields as e:
+            api.abort(400, str(e))
+        except Exception as e:
+            api.abort(500, f'Internal server error: {str(e)}')
+
+
+@api.route('/vehicle/<string:vehicle_id>/mileage')
+@api.param('vehicle_id', 'The vehicle identifier')
+class VehicleMileage(Resource):
+    @api.doc('get_vehicle_mileage')
+    @api.marshal_with(vehicle_mileage_model, code=200, description='Success')
+    @api.response(404, 'No odometer readings for this vehicle', error_model)
+    @api.response(401, 'Unauthorized')
+    @require_auth
+    def get(self, vehicle_id):
+        """Get a vehicle's odometer, fitted daily distance and recent readings"""
+        mileage = MaintenanceService.get_vehicle_mileage(vehicle_id)
+        if mileage is None:
+            api.abort(404, f'No odometer readings for vehicle {vehicle_id}')
+        return mileage, 200
+
+    @api.doc('record_odometer_reading')
+    @api.expect(odometer_reading_model, validate=True)
+    @api.marshal_with(vehicle_mileage_model, code=201, description='Reading recorded')
+    @api.response(400, 'Validation Error', error_model)
+    @api.response(500, 'Internal Server Error', error_model)
+    @api.response(401, 'Unauthorized')
+    @require_auth
+    def post(self, vehicle_id):
+        """Record an odometer reading and re-project the vehicle's open items and mileage-based schedules"""
+        try:
+            schema = OdometerReadingSchema()
+            data = schema.load(request.json)
+            data['vehicle_id'] = vehicle_id
+
+            mileage = MaintenanceService.record_odometer_readings([data])
+            return mileage[vehicle_id], 201
+
+        except ValidationError as e:
+            api.abort(400, f'Validation error', errors=e.messages)
+        except Exception as e:
+            api.abort(500, f'Internal server error: {str(e)}')
+
+
+@api.route('/odometer-readings')
+class OdometerReadingBatch(Resource):
+    @api.doc('record_odometer_readings')
+    @api.expect(odometer_batch_model, validate=True)
+    @api.response(200, 'Success')
+    @api.response(400, 'Validation Error', error_model)
+    @api.response(500, 'Internal Server Error', error_model)
+    @api.response(401, 'Unauthorized')
+    @require_auth
+    def post(self):
+        """Record odometer readings for many vehicles at once (e.g. a telematics export)"""
+        try:
+            schema = OdometerReadingBatchSchema()
+            data = schema.load(request.json)
+            missing = {str(i): {'vehicle_id': ['Missing data for required field.']}
+                       for i, reading in enumerate(data['readings']) if not reading.get('vehicle_id')}
+            if missing:
+                raise ValidationError({'readings': missing})
+
+            mileage = MaintenanceService.record_odometer_readings(data['readings'])
+            return {'vehicles': len(mileage), 'readings': len(data['readings'])}, 200
+
+        except ValidationError as e:
+            api.abort(400, f'Validation error', errors=e.messages)
         except Exception as e:
             api.abort(500, f'Internal server error: {str(e)}')
 
 
 @api.route('/status/update-bulk')
 class BulkStatusUpdate(Resource):
-    @api.doc('update_statuses_bulk')
+    @api.doc('update_statuses_bulk',
+             params={
+                 'batch_size': 'Process rows in batches of this size, one transaction each (default: STATUS_UPDATE_BATCH_SIZE)'
+             })
     @api.response(200, 'Success')
     @api.response(500, 'Internal Server Error', error_model)
     def post(self):
         """Background job endpoint to update maintenance statuses based on due dates"""
         try:
-            updated = MaintenanceService.update_maintenance_status_bulk()
+            batch_size = request.args.get('batch_size', current_app.config.get('STATUS_UPDATE_BATCH_SIZE'), type=int)
+            result = MaintenanceService.update_maintenance_status_bulk(batch_size)
             return {
-                'message': f'Updated {updated} maintenance items',
-                'updated_count': updated
+                'message': f"Updated {result['updated_count']} maintenance items",
+                'updated_count': result['updated_count'],
+                'transitions': result['transitions']
             }, 200
         
         except Exception as e:
@@ -445,12 +807,22 @@ class BulkStatusUpdate(Resource):
 
 @api.route('/analytics/costs')
 class MaintenanceCostAnalytics(Resource):
-    @api.doc('get_cost_analytics')
+    @api.doc('get_cost_analytics',
+             params={
+                 'stream': 'Stream the by_vehicle map instead of building it in memory (default: false)'
+             })
     @api.response(200, 'Success')
     @api.response(500, 'Internal Server Error', error_model)
     def get(self):
         """Get detailed cost analytics for maintenance"""
         try:
+            if request.args.get('stream', 'false').lower() == 'true':
+                analytics = MaintenanceService.get_cost_analytics(include_by_vehicle=False)
+                return Response(
+                    stream_with_context(_stream_cost_analytics(analytics)),
+                    mimetype='application/json'
+                )
+            
             analytics = MaintenanceService.get_cost_analytics()
             return analytics, 200
         
@@ -482,15 +854,21 @@ class MaintenanceTrends(Resource):
 
 @api.route('/overdue')
 class OverdueMaintenanceList(Resource):
-    @api.doc('list_overdue_maintenance')
-    @api.marshal_list_with(maintenance_item_model, code=200, description='Success')
+    @api.doc('list_overdue_maintenance',
+             params={
+                 'fields': 'Comma-separated fields to return, e.g. id,vehicle_id,status,priority,due_date (id is always included)'
+             })
+    @api.response(200, 'Success', [maintenance_item_model])
+    @api.response(400, 'Unknown field', error_model)
     @api.response(500, 'Internal Server Error', error_model)
     def get(self):
         """Get all overdue maintenance items"""
         try:
-            items = MaintenanceService.get_overdue_items()
-            return items, 200
+            items = MaintenanceService.get_overdue_items(_requested_fields())
+            return json_response(items)
         
+        except InvalidFields as e:
+            api.abort(400, str(e))
         except Exception as e:
             api.abort(500, f'Internal server error: {str(e)}')
 
@@ -499,17 +877,21 @@ class OverdueMaintenanceList(Resource):
 class UpcomingMaintenanceList(Resource):
     @api.doc('list_upcoming_maintenance',
              params={
-                 'days': 'Number of days to look ahead (default: 30)'
+                 'days': 'Number of days to look ahead (default: 30)',
+                 'fields': 'Comma-separated fields to return, e.g. id,vehicle_id,status,priority,due_date (id is always included)'
              })
-    @api.marshal_list_with(maintenance_item_model, code=200, description='Success')
+    @api.response(200, 'Success', [maintenance_item_model])
+    @api.response(400, 'Unknown field', error_model)
     @api.response(500, 'Internal Server Error', error_model)
     def get(self):
         """Get upcoming maintenance items"""
         try:
             days = request.args.get('days', 30, type=int)
-            items = MaintenanceService.get_upcoming_items(days)
-            return items, 200
+            items = MaintenanceService.get_upcoming_items(days, _requested_fields())
+            return json_response(items)
         
+        except InvalidFields as e:
+            api.abort(400, str(e))
         except Exception as e:
             api.abort(500, f'Internal server error: {str(e)}')
 
@@ -520,36 +902,74 @@ class MaintenanceSearch(Resource):
              params={
                  'q': 'Search query (searches type, description, vehicle_id)',
                  'page': 'Page number (default: 1)',
-                 'per_page': 'Items per page (default: 10)'
+                 'per_page': 'Items per page (default: 10)',
+                 'cursor': 'Keyset pagination cursor; pass empty for the first page, then next_cursor',
+                 'count': 'Total in cursor mode: none (default), estimate or exact',
+                 'fields': 'Comma-separated fields to return, e.g. id,vehicle_id,status,priority,due_date (id is always included)'
              })
-    @api.marshal_with(pagination_model, code=200, description='Success')
+    @api.response(200, 'Success', pagination_model)
+    @api.response(304, 'Not Modified (If-None-Match / If-Modified-Since matched)')
     @api.response(500, 'Internal Server Error', error_model)
     def get(self):
         """Search maintenance items by query"""
         try:
             query = request.args.get('q', '')
-            page = request.args.get('page', 1, type=int)
-            per_page = request.args.get('per_page', 10, type=int)
+            page = max(request.args.get('page', 1, type=int), 1)
+            per_page = max(request.args.get('per_page', 10, type=int), 1)
             
-            result = MaintenanceService.search_maintenance(query, page, per_page)
-            return result, 200
+            cursor = request.args.get('cursor')
+            count = request.args.get('count', 'none')
+            
+            result, serializer = MaintenanceService.search_maintenance_page(
+                query, page, per_page, cursor, count, _requested_fields()
+            )
+            return _conditional_page_response(result, serializer)
         
+        except (InvalidCursor, InvalidFields) as e:
+            api.abort(400, str(e))
         except Exception as e:
             api.abort(500, f'Internal server error: {str(e)}')
 
+@api.route('/cache/stats')
+class CacheStats(Resource):
+    @api.doc('get_cache_stats')
+    @api.response(200, 'Success')
+    def get(self):
+        """Get read-cache and verified-token-cache hit/miss statistics for this worker"""
+        cache = get_cache()
+        stats = cache.stats() if cache else {'backend': 'null'}
+        token_cache = get_token_cache()
+        if token_cache is not None:
+            stats['token_cache'] = token_cache.stats()
+        return stats, 200
+
+@api.route('/admin/pool')
+class PoolStats(Resource):
+    @api.doc('get_pool_stats')
+    @api.response(200, 'Success')
+    @api.response(401, 'Unauthorized')
+    @require_auth
+    def get(self):
+        """Get database connection pool statistics for this worker process"""
+        return pool_stats(), 200
+
 # ==================== Technician Resources ====================
 @api.route('/technicians')
 class TechnicianList(Resource):
     @api.doc('list_technicians')
     @api.marshal_list_with(technician_model, code=200)
+    @api.response(304, 'Not Modified (If-None-Match / If-Modified-Since matched)')
     @api.response(500, 'Internal Server Error', error_model)
     @api.response(401, 'Unauthorized')
     @require_auth
     def get(self):
         """Get all technicians"""
         try:
+            fresh, headers = _conditional_table(Technician)
+            if fresh:
+                return [], 304, headers
             technicians = MaintenanceService.get_all_technicians()
-            return technicians, 200
+            return technicians, 200, headers
         except Exception as e:
             api.abort(500, f'Internal server error: {str(e)}')
 
@@ -572,6 +992,49 @@ class TechnicianList(Resource):
         except Exception as e:
             api.abort(500, f'Internal server error: {str(e)}')
 
+@api.route('/technicians/assign')
+class TechnicianAssign(Resource):
+    @api.doc('assign_technicians')
+    @api.expect(technician_assign_model, validate=True)
+    @api.marshal_with(technician_assign_result_model, code=200)
+    @api.response(400, 'Validation Error', error_model)
+    @api.response(500, 'Internal Server Error', error_model)
+    @api.response(401, 'Unauthorized')
+    @require_auth
+    def post(self):
+        """Assign open, unassigned items to available technicians by priority, due date, skill, load and rate"""
+        try:
+            schema = TechnicianAssignSchema()
+            data = schema.load(request.json or {})
+            config = current_app.config
+            result = MaintenanceService.assign_technicians(
+                data.get('item_ids'),
+                data.get('limit', config.get('ASSIGNMENT_BATCH_LIMIT', 2000)),
+                data.get('max_active_jobs', config.get('ASSIGNMENT_MAX_ACTIVE_JOBS', 10)),
+                data.get('require_skill', False),
+                data.get('dry_run', False)
+            )
+            return result, 200
+        except ValidationError as e:
+            api.abort(400, f'Validation error', errors=e.messages)
+        except Exception as e:
+            api.abort(500, f'Internal server error: {str(e)}')
+
+@api.route('/technicians/reconcile')
+class TechnicianReconcile(Resource):
+    @api.doc('reconcile_technician_counters')
+    @api.response(200, 'Success')
+    @api.response(500, 'Internal Server Error', error_model)
+    @api.response(401, 'Unauthorized')
+    @require_auth
+    def post(self):
+        """Recount technicians' active jobs from their items and correct any drift"""
+        try:
+            result = MaintenanceService.reconcile_technician_counters()
+            return dict(result, message=f"Corrected {result['corrected']} technicians"), 200
+        except Exception as e:
+            api.abort(500, f'Internal server error: {str(e)}')
+
 @api.route('/technicians/<string:tech_id>')
 @api.param('tech_id', 'The technician ID')
 class TechnicianItem(Resource):
@@ -618,15 +1081,19 @@ class TechnicianItem(Resource):
 class PartList(Resource):
     @api.doc('list_parts', params={'q': 'Search query'})
     @api.marshal_list_with(part_model, code=200)
+    @api.response(304, 'Not Modified (If-None-Match / If-Modified-Since matched)')
     @api.response(500, 'Internal Server Error', error_model)
     @api.response(401, 'Unauthorized')
     @require_auth
     def get(self):
         """Get all parts"""
         try:
+            fresh, headers = _conditional_table(Part)
+            if fresh:
+                return [], 304, headers
             query = request.args.get('q')
             parts = MaintenanceService.get_all_parts(query)
-            return parts, 200
+            return parts, 200, headers
         except Exception as e:
             api.abort(500, f'Internal server error: {str(e)}')
 
@@ -657,6 +1124,7 @@ class PartItem(Resource):
     @api.marshal_with(part_model, code=200)
     @api.response(400, 'Validation Error', error_model)
     @api.response(404, 'Part not found', error_model)
+    @api.response(409, 'Stock changed concurrently', error_model)
     @api.response(500, 'Internal Server Error', error_model)
     @api.response(401, 'Unauthorized')
     @require_auth
@@ -671,6 +1139,8 @@ class PartItem(Resource):
             return part.to_dict(), 200
         except ValidationError as e:
             api.abort(400, f'Validation error', errors=e.messages)
+        except StockConflict as e:
+            api.abort(409, str(e))
         except Exception as e:
             api.abort(500, f'Internal server error: {str(e)}')
 
@@ -690,19 +1160,73 @@ class PartItem(Resource):
         except Exception as e:
             api.abort(500, f'Internal server error: {str(e)}')
 
+@api.route('/parts/<string:part_id>/stock')
+@api.param('part_id', 'The part ID')
+class PartStock(Resource):
+    @api.doc('adjust_part_stock')
+    @api.expect(part_stock_adjust_model, validate=True)
+    @api.marshal_with(part_model, code=200)
+    @api.response(400, 'Validation Error', error_model)
+    @api.response(404, 'Part not found', error_model)
+    @api.response(409, 'Fewer units in stock than taken out, or stock changed concurrently', error_model)
+    @api.response(500, 'Internal Server Error', error_model)
+    @api.response(401, 'Unauthorized')
+    @require_auth
+    def post(self, part_id):
+        """Restock or take out units of a part (relative to the current stock, recorded in the ledger)"""
+        try:
+            schema = PartStockAdjustSchema()
+            data = schema.load(request.json)
+            part = MaintenanceService.adjust_part_stock(part_id, data)
+        except ValidationError as e:
+            api.abort(400, f'Validation error', errors=e.messages)
+        except InsufficientStock as e:
+            api.abort(409, str(e), shortages=e.shortages)
+        except StockConflict as e:
+            api.abort(409, str(e))
+        except Exception as e:
+            api.abort(500, f'Internal server error: {str(e)}')
+        if not part:
+            api.abort(404, f'Part {part_id} not found')
+        return part.to_dict(), 200
+
+@api.route('/parts/<string:part_id>/movements')
+@api.param('part_id', 'The part ID')
+class PartMovements(Resource):
+    @api.doc('get_part_movements', params={'limit': 'Number of entries (default: 50)'})
+    @api.marshal_list_with(part_movement_model, code=200)
+    @api.response(404, 'Part not found', error_model)
+    @api.response(500, 'Internal Server Error', error_model)
+    @api.response(401, 'Unauthorized')
+    @require_auth
+    def get(self, part_id):
+        """Get the most recent stock ledger entries of a part"""
+        try:
+            limit = max(1, min(request.args.get('limit', 50, type=int), 1000))
+            movements = MaintenanceService.get_part_movements(part_id, limit)
+        except Exception as e:
+            api.abort(500, f'Internal server error: {str(e)}')
+        if movements is None:
+            api.abort(404, f'Part {part_id} not found')
+        return movements, 200
+
 # ==================== Recurring Schedule Resources ====================
 @api.route('/recurring-schedules')
 class RecurringScheduleList(Resource):
     @api.doc('list_recurring_schedules')
     @api.marshal_list_with(recurring_schedule_model, code=200)
+    @api.response(304, 'Not Modified (If-None-Match / If-Modified-Since matched)')
     @api.response(500, 'Internal Server Error', error_model)
     @api.response(401, 'Unauthorized')
     @require_auth
     def get(self):
         """Get all recurring schedules"""
         try:
+            fresh, headers = _conditional_table(RecurringSchedule)
+            if fresh:
+                return [], 304, headers
             schedules = MaintenanceService.get_all_recurring_schedules()
-            return schedules, 200
+            return schedules, 200, headers
         except Exception as e:
             api.abort(500, f'Internal server error: {str(e)}')
 
@@ -725,6 +1249,30 @@ class RecurringScheduleList(Resource):
         except Exception as e:
             api.abort(500, f'Internal server error: {str(e)}')
 
+@api.route('/recurring-schedules/materialize')
+class RecurringScheduleMaterialize(Resource):
+    @api.doc('materialize_recurring_schedules',
+             params={
+                 'batch_size': 'Schedules per transaction (default: SCHEDULE_MATERIALIZE_BATCH_SIZE)',
+                 'lead_days': 'Create items due within this many days (default: SCHEDULE_LEAD_DAYS)'
+             })
+    @api.response(200, 'Success')
+    @api.response(500, 'Internal Server Error', error_model)
+    @api.response(401, 'Unauthorized')
+    @require_auth
+    def post(self):
+        """Generate maintenance items for all due recurring schedules (idempotent)"""
+        try:
+            config = current_app.config
+            result = MaintenanceService.materialize_recurring_schedules(
+                request.args.get('batch_size', config.get('SCHEDULE_MATERIALIZE_BATCH_SIZE'), type=int),
+                request.args.get('lead_days', config.get('SCHEDULE_LEAD_DAYS', 0), type=int),
+                config.get('SCHEDULE_MAX_CATCHUP', 0)
+            )
+            return dict(result, message=f"Created {result['items_created']} maintenance items"), 200
+        except Exception as e:
+            api.abort(500, f'Internal server error: {str(e)}')
+
 @api.route('/recurring-schedules/<string:schedule_id>')
 @api.param('schedule_id', 'The schedule ID')
 class RecurringScheduleItem(Resource):
@@ -44,6 +44,7 @@ class MaintenanceItemCreateSchema(Schema):
     estimated_cost = fields.Float(validate=validate.Range(min=0))
     assigned_to = fields.Str()
     assigned_technician = fields.Str()
+    technician_id = fields.Str()
     notes = fields.Str()
     parts_needed = fields.List(fields.Dict())
 
@@ -65,6 +66,7 @@ class MaintenanceItemUpdateSchema(Schema):
     actual_cost = fields.Float(validate=validate.Range(min=0))
     assigned_to = fields.Str()
     assigned_technician = fields.Str()
+    technician_id = fields.Str()
     notes = fields.Str()
     parts_needed = fields.List(fields.Dict())
     attachments = fields.List(fields.Dict())
@@ -101,11 +103,16 @@ class TechnicianUpdateSchema(Schema):
     specialization = fields.List(fields.Str())
     status = fields.Str(validate=validate.OneOf(['available', 'busy', 'off-duty']))
     rating = fields.Float()
-    completed_jobs = fields.Int()
-    active_jobs = fields.Int()
     certifications = fields.List(fields.Str())
     hourly_rate = fields.Float()
 
+class TechnicianAssignSchema(Schema):
+    item_ids = fields.List(fields.Str(), validate=validate.Length(max=10000))
+    limit = fields.Int(validate=validate.Range(min=1, max=10000))
+    max_active_jobs = fields.Int(validate=validate.Range(min=1))
+    require_skill = fields.Bool()
+    dry_run = fields.Bool()
+
 # Part Schemas
 class PartSchema(Schema):
     id = fields.Str(dump_only=True)
@@ -113,6 +120,7 @@ class PartSchema(Schema):
     part_number = fields.Str(required=True)
     category = fields.Str(required=True)
     quantity = fields.Int(required=True)
+    reserved_quantity = fields.Int(dump_only=True)
     min_quantity = fields.Int(required=True)
     unit_cost = fields.Float(required=True)
     supplier = fields.Str()
@@ -143,6 +151,11 @@ class PartUpdateSchema(Schema):
     last_restocked = fields.Date()
     used_in = fields.List(fields.Str())
 
+class PartStockAdjustSchema(Schema):
+    delta = fields.Int(required=True, validate=validate.NoneOf([0], error='Must not be 0.'))
+    reason = fields.Str(validate=validate.OneOf(['restock', 'use', 'adjust']))
+    item_id = fields.Str()
+
 # Recurring Schedule Schemas
 class RecurringScheduleSchema(Schema):
     id = fields.Str(dump_only=True)
@@ -184,3 +197,12 @@ class RecurringScheduleUpdateSchema(Schema):
     is_active = fields.Bool()
     last_executed = fields.DateTime()
     next_scheduled = fields.DateTime()
+
+# Odometer Reading Schemas
+class OdometerReadingSchema(Schema):
+    vehicle_id = fields.Str()
+    odometer = fields.Int(required=True, validate=validate.Range(min=0))
+    recorded_at = fields.DateTime()
+
+class OdometerReadingBatchSchema(Schema):
+    readings = fields.List(fields.Nested(OdometerReadingSchema), required=True, validate=validate.Length(min=1, max=10000))
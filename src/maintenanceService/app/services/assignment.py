@@ -0,0 +1,322 @@
+"""
+Technician Assignment
+Assigns batches of unassigned maintenance items to available technicians.
+
+- Skill index: an in-memory inverted index from skill term (from each technician's
+  specialization and certifications) to available technicians, built on first use
+  and kept up to date from committed ORM changes, like the SQLite search index.
+  Other workers' changes are picked up at the start of every batch: the available
+  technicians' updated_at is read fresh, and profiles that changed (or became
+  unavailable) are reloaded or dropped.
+- Planner: items are taken most urgent first (priority, then projected due date).
+  Each one goes to the candidate with the best score, trading off skill match, current
+  load, hourly rate and rating, while staying under a per-technician active job cap.
+  Loads are read fresh from the database for every batch, so several workers can
+  share the index without drifting apart.
+"""
+
+import heapq
+import logging
+import threading
+from collections import namedtuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models.maintainance import MaintenancePriority, Technician, TechnicianStatus
+from app.services.search import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Words that say nothing about the skill a job needs ("Brake Service", "ASE Certified")
+GENERIC_TERMS = frozenset({
+    'and', 'of', 'the', 'general', 'maintenance', 'service', 'check', 'system', 'repair',
+    'certified', 'certification', 'specialist', 'technician', 'master', 'ase',
+})
+
+PRIORITY_RANK = {
+    MaintenancePriority.CRITICAL: 0,
+    MaintenancePriority.HIGH: 1,
+    MaintenancePriority.MEDIUM: 2,
+    MaintenancePriority.LOW: 3,
+}
+
+# Score weights: a full skill match outweighs an idle technician, which outweighs cost
+SKILL_WEIGHT = 4.0
+LOAD_WEIGHT = 2.0
+RATE_WEIGHT = 1.0
+RATING_WEIGHT = 0.5
+
+# Urgent work goes to the best-suited technician regardless of hourly rate
+PRIORITY_RATE_FACTOR = {
+    MaintenancePriority.CRITICAL: 0.0,
+    MaintenancePriority.HIGH: 0.5,
+    MaintenancePriority.MEDIUM: 1.0,
+    MaintenancePriority.LOW: 1.5,
+}
+
+TechnicianProfile = namedtuple('TechnicianProfile', 'id name skills hourly_rate rating')
+
+
+def skill_terms(*values):
+    """Normalized skill terms of job types / specializations ('Oil Changes' -> {'oil', 'change'})"""
+    terms = set()
+    for value in values:
+        for token in tokenize(value):
+            if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+                token = token[:-1]
+            if token not in GENERIC_TERMS:
+                terms.add(token)
+    return frozenset(terms)
+
+
+def technician_profile(technician):
+    """TechnicianProfile of a Technician (or a row with the same attributes)"""
+    return TechnicianProfile(
+        technician.id,
+        technician.name,
+        skill_terms(*(technician.specialization or []), *(technician.certifications or [])),
+        technician.hourly_rate or 0.0,
+        technician.rating if technician.rating is not None else 5.0,
+    )
+
+
+def _priority(value):
+    return MaintenancePriority(value) if value else MaintenancePriority.MEDIUM
+
+
+class SkillIndex:
+    """skill term -> {technician_id} over available technicians"""
+
+    def __init__(self):
+        self.postings = {}
+        self.profiles = {}
+        self.versions = {}  # technician_id -> updated_at the profile was built from
+        self.lock = threading.RLock()
+
+    def add(self, profile, version=None):
+        with self.lock:
+            self.remove(profile.id)
+            for term in profile.skills:
+                self.postings.setdefault(term, set()).add(profile.id)
+            self.profiles[profile.id] = profile
+            self.versions[profile.id] = version
+
+    def remove(self, technician_id):
+        with self.lock:
+            self.versions.pop(technician_id, None)
+            profile = self.profiles.pop(technician_id, None)
+            if profile is None:
+                return
+            for term in profile.skills:
+                posting = self.postings.get(term)
+                if posting is None:
+                    continue
+                posting.discard(technician_id)
+                if not posting:
+                    del self.postings[term]
+
+    def matches(self, terms):
+        """{technician_id: fraction of `terms` the technician covers} for technicians covering any"""
+        if not terms:
+            return {}
+        counts = {}
+        with self.lock:
+            for term in terms:
+                for technician_id in self.postings.get(term, ()):
+                    counts[technician_id] = counts.get(technician_id, 0) + 1
+        return {technician_id: count / len(terms) for technician_id, count in counts.items()}
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.profiles)
+
+    def stale(self, available):
+        """(ids to drop, ids to reload) against `available` ({technician_id: updated_at})"""
+        with self.lock:
+            return ([technician_id for technician_id in self.profiles if technician_id not in available],
+                    [technician_id for technician_id, version in available.items()
+                     if self.versions.get(technician_id, False) != version])
+
+
+class AssignmentEngine:
+    def __init__(self):
+        self.index = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.extensions['assignment'] = self
+
+    def _ensure_index(self):
+        if self.index is not None:
+            return self.index
+
+        with self._lock:
+            if self.index is None:
+                index = SkillIndex()
+                for row in self._profile_rows().filter(Technician.status == TechnicianStatus.AVAILABLE):
+                    index.add(technician_profile(row), row.updated_at)
+                self.index = index
+                logger.info(f"Built skill index for {len(index.profiles)} available technicians")
+        return self.index
+
+    @staticmethod
+    def _profile_rows():
+        return db.session.query(
+            Technician.id, Technician.name, Technician.specialization, Technician.certifications,
+            Technician.hourly_rate, Technician.rating, Technician.updated_at
+        )
+
+    def sync(self, available):
+        """
+        Bring the index in line with `available` ({technician_id: updated_at} of the
+        technicians currently AVAILABLE, read in the caller's transaction): drop the
+        others and reload profiles that are new or changed since they were indexed
+        """
+        index = self._ensure_index()
+        dropped, changed = index.stale(available)
+        for technician_id in dropped:
+            index.remove(technician_id)
+        if changed:
+            for row in self._profile_rows().filter(Technician.id.in_(changed)):
+                index.add(technician_profile(row), available[row.id])
+        return index
+
+    def plan(self, items, loads, max_active_jobs, require_skill=False):
+        """
+        Assign `items` (rows with id, type, priority, projected_due_date) given current
+        `loads` ({technician_id: active_jobs} of the AVAILABLE technicians - nobody else is
+        a candidate). Returns (assignments, unassigned) where assignments are
+        (item_id, TechnicianProfile, skill_match) tuples.
+        """
+        index = self._ensure_index()
+        profiles = {technician_id: profile for technician_id, profile in index.snapshot().items()
+                    if technician_id in loads}
+        loads = {technician_id: loads[technician_id] for technician_id in profiles}
+        open_slots = {technician_id for technician_id, load in loads.items() if load < max_active_jobs}
+        max_rate = max((profile.hourly_rate for profile in profiles.values()), default=0.0) or 1.0
+
+        def build_heap(candidates, matches, rate_factor):
+            # Everything but the load term is fixed for a (type, priority); loads only grow,
+            # so stale entries are re-scored when they reach the top (lazy deletion)
+            fixed = {}
+            for technician_id in candidates:
+                profile = profiles[technician_id]
+                fixed[technician_id] = (SKILL_WEIGHT * matches.get(technician_id, 0.0)
+                                        - RATE_WEIGHT * rate_factor * profile.hourly_rate / max_rate
+                                        + RATING_WEIGHT * profile.rating / 5.0)
+            heap = [(-(score - LOAD_WEIGHT * loads[technician_id] / max_active_jobs), technician_id, loads[technician_id])
+                    for technician_id, score in fixed.items()]
+            heapq.heapify(heap)
+            return heap, fixed
+
+        def pop_best(heap, fixed):
+            while heap:
+                _, technician_id, load = heap[0]
+                if technician_id not in open_slots:
+                    heapq.heappop(heap)
+                elif load != loads[technician_id]:
+                    current = loads[technician_id]
+                    heapq.heapreplace(heap, (-(fixed[technician_id] - LOAD_WEIGHT * current / max_active_jobs),
+                                             technician_id, current))
+                else:
+                    return technician_id
+            return None
+
+        ordered = sorted(items, key=lambda item: (
+            PRIORITY_RANK[_priority(item.priority)], item.projected_due_date, item.id
+        ))
+
+        # Items share a handful of types and priorities: one candidate heap per combination
+        matches_by_type, heaps = {}, {}
+        assignments, unassigned = [], []
+        for item in ordered:
+            if not open_slots:
+                unassigned.append(item.id)
+                continue
+
+            matches = matches_by_type.get(item.type)
+            if matches is None:
+                matches = matches_by_type[item.type] = {
+                    technician_id: match for technician_id, match in index.matches(skill_terms(item.type)).items()
+                    if technician_id in profiles
+                }
+            rate_factor = PRIORITY_RATE_FACTOR[_priority(item.priority)]
+
+            best = None
+            if matches:
+                key = (item.type, rate_factor)
+                if key not in heaps:
+                    heaps[key] = build_heap([t for t in matches if t in open_slots], matches, rate_factor)
+                best = pop_best(*heaps[key])
+            if best is None and not require_skill:
+                # No (free) technician with the skill: best of everyone with capacity
+                key = (None, rate_factor)
+                if key not in heaps:
+                    heaps[key] = build_heap(open_slots, {}, rate_factor)
+                best = pop_best(*heaps[key])
+            if best is None:
+                unassigned.append(item.id)
+                continue
+
+            loads[best] += 1
+            if loads[best] >= max_active_jobs:
+                open_slots.discard(best)
+            assignments.append((item.id, profiles[best], matches.get(best, 0.0)))
+
+        return assignments, unassigned
+
+    # ---------- in-memory index maintenance ----------
+
+    def track_flush(self, session):
+        if self.index is None:
+            return
+        pending = session.info.setdefault('skill_index_changes', {})
+        for obj in list(session.new) + list(session.dirty):
+            if isinstance(obj, Technician):
+                # The version is unknown until the flush sets updated_at, so the next sync re-reads it
+                pending[obj.id] = technician_profile(obj) if obj.status == TechnicianStatus.AVAILABLE else None
+        for obj in session.deleted:
+            if isinstance(obj, Technician):
+                pending[obj.id] = None
+
+    def apply_commit(self, session):
+        changes = session.info.pop('skill_index_changes', None)
+        if not changes or self.index is None:
+            return
+        for technician_id, profile in changes.items():
+            if profile is None:
+                self.index.remove(technician_id)
+            else:
+                self.index.add(profile)
+
+
+def get_assignment_engine():
+    return current_app.extensions['assignment']
+
+
+def _engine_for_events():
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('assignment')
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_technician_changes(session, flush_context, instances):
+    engine = _engine_for_events()
+    if engine is not None:
+        engine.track_flush(session)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_technician_changes(session):
+    engine = _engine_for_events()
+    if engine is not None:
+        engine.apply_commit(session)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_technician_changes(session):
+    session.info.pop('skill_index_changes', None)
@@ -0,0 +1,272 @@
+"""
+ID Allocator for Maintenance Service
+Hands out prefixed IDs (M001, T001, P001, RS001) from a per-prefix counter held
+in the database. Values are reserved in blocks, so most allocations are served
+from memory and concurrent workers never receive the same value; bulk callers
+take any number of IDs with one counter round trip (next_ids). Client-supplied
+IDs in a prefix's space (e.g. M250) move its counter past them.
+"""
+
+import logging
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+
+from flask import current_app
+from sqlalchemy import insert, select, text, update
+from sqlalchemy.exc import IntegrityError, ProgrammingError
+
+from app import db
+from app.models.maintainance import IdSequence
+
+logger = logging.getLogger(__name__)
+
+# IDs per existence check in next_ids (SQLite allows 999 bound parameters)
+ID_CHECK_BATCH_SIZE = 500
+
+
+class IdAllocator(ABC):
+    """Base allocator - caches one reserved block of values per prefix"""
+
+    def __init__(self, block_size=1):
+        self.block_size = max(1, int(block_size))
+        self._blocks = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def init_app(self, app):
+        app.extensions['id_allocator'] = self
+
+    def next_id(self, prefix, model):
+        """Return the next formatted ID for `prefix`, e.g. M001, M1000"""
+        while True:
+            item_id = f'{prefix}{self.next_value(prefix, model):03d}'
+            # A client-supplied ID can still sit inside a block this process reserved before it
+            if db.session.get(model, item_id) is None:
+                return item_id
+
+    def next_ids(self, prefix, model, count):
+        """Return `count` formatted IDs for `prefix`, reserving whatever is missing at once"""
+        ids = []
+        while len(ids) < count:
+            candidates = [f'{prefix}{value:03d}' for value in self.next_values(prefix, model, count - len(ids))]
+            taken = set()
+            for start in range(0, len(candidates), ID_CHECK_BATCH_SIZE):
+                batch = candidates[start:start + ID_CHECK_BATCH_SIZE]
+                taken.update(db.session.scalars(select(model.id).where(model.id.in_(batch))))
+            ids.extend(item_id for item_id in candidates if item_id not in taken)
+        return ids
+
+    def next_value(self, prefix, model):
+        """Return the next numeric value for `prefix`"""
+        return self.next_values(prefix, model, 1)[0]
+
+    def next_values(self, prefix, model, count):
+        """
+        Return `count` numeric values for `prefix`: the rest of the cached block, then
+        as many new blocks as needed from a single reservation
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked worker (gunicorn --preload): never reuse the parent's blocks
+                self._blocks = {}
+                self._pid = os.getpid()
+
+            current, limit = self._blocks.get(prefix, (0, 0))
+            taken = min(count, limit - current)
+            values = list(range(current, current + taken))
+            current += taken
+
+            missing = count - taken
+            if missing:
+                size = self._block_size(prefix, model)
+                firsts = self._reserve_blocks(prefix, model, -(-missing // size))
+                fresh = [value for first in firsts for value in range(first, first + size)]
+                values.extend(fresh[:missing])
+                # Only the last block can have values left over
+                current, limit = (fresh[missing], firsts[-1] + size) if len(fresh) > missing else (0, 0)
+
+            self._blocks[prefix] = (current, limit)
+            return values
+
+    def reset(self):
+        """Drop all cached blocks (unused values are skipped, never reissued)"""
+        with self._lock:
+            self._blocks = {}
+
+    def advance(self, prefix, item_id):
+        """
+        Make sure `prefix` never hands out a value at or below a client-supplied ID
+        (call once the row holding it is committed). IDs outside the prefix's space are ignored.
+        """
+        match = re.fullmatch(rf'{re.escape(prefix)}(\d+)', item_id or '')
+        if not match:
+            return
+        # Blocks already handed out are covered by the existence check in next_id
+        self._advance_counter(prefix, int(match.group(1)))
+
+    def _block_size(self, prefix, model):
+        """Values per reserved block of `prefix`"""
+        return self.block_size
+
+    @abstractmethod
+    def _reserve_blocks(self, prefix, model, blocks):
+        """Reserve `blocks` blocks of _block_size values for `prefix`; the first value of each, ascending"""
+
+    @abstractmethod
+    def _advance_counter(self, prefix, value):
+        """Move the shared counter of `prefix` past `value` (if it exists and is behind)"""
+
+    @staticmethod
+    def _max_existing_value(connection, prefix, model):
+        """Highest numeric suffix already used with `prefix` (run once, when a counter is created)"""
+        pattern = re.compile(rf'^{re.escape(prefix)}(\d+)$')
+        rows = connection.execute(select(model.id).where(model.id.like(f'{prefix}%')))
+        values = [int(match.group(1)) for (item_id,) in rows if (match := pattern.match(item_id))]
+        return max(values, default=0)
+
+
+class TableIdAllocator(IdAllocator):
+    """Counter rows in the `id_sequences` table - works on every supported database"""
+
+    def _reserve_blocks(self, prefix, model, blocks):
+        # The blocks are one consecutive range
+        size = blocks * self.block_size
+        first = self._reserve_range(prefix, model, size)
+        return [first + n * self.block_size for n in range(blocks)]
+
+    def _reserve_range(self, prefix, model, size):
+        """Reserve `size` consecutive values for `prefix` and return the first one"""
+        table = IdSequence.__table__
+
+        while True:
+            # The UPDATE row lock serializes concurrent reservations for the same prefix
+            with db.engine.begin() as conn:
+                result = conn.execute(
+                    update(table)
+                    .where(table.c.prefix == prefix)
+                    .values(next_value=table.c.next_value + size)
+                )
+                if result.rowcount:
+                    next_value = conn.execute(
+                        select(table.c.next_value).where(table.c.prefix == prefix)
+                    ).scalar_one()
+                    return next_value - size
+
+            # First allocation for this prefix - start after any existing IDs
+            try:
+                with db.engine.begin() as conn:
+                    start = self._max_existing_value(conn, prefix, model) + 1
+                    conn.execute(insert(table).values(prefix=prefix, next_value=start + size))
+                logger.info(f"Created ID counter for prefix '{prefix}' starting at {start}")
+                return start
+            except IntegrityError:
+                # Another worker created the counter first; reserve from it instead
+                continue
+
+    def _advance_counter(self, prefix, value):
+        # A counter created later starts after the highest existing ID anyway
+        table = IdSequence.__table__
+        with db.engine.begin() as conn:
+            conn.execute(
+                update(table)
+                .where(table.c.prefix == prefix, table.c.next_value <= value)
+                .values(next_value=value + 1)
+            )
+
+
+class SequenceIdAllocator(IdAllocator):
+    """
+    Native PostgreSQL sequences (one per prefix) - a single nextval() per block.
+    A sequence's INCREMENT BY is its block size: fixed when it is created (from ID_BLOCK_SIZE)
+    and read back from the database afterwards, so workers with a different ID_BLOCK_SIZE
+    still reserve the same non-overlapping blocks.
+    """
+
+    def __init__(self, block_size=1):
+        super().__init__(block_size)
+        self._increments = {}
+
+    @staticmethod
+    def _sequence_name(prefix):
+        if not re.fullmatch(r'[A-Za-z]+', prefix):
+            raise ValueError(f'Invalid ID prefix: {prefix!r}')
+        return f'id_seq_{prefix.lower()}'
+
+    def _block_size(self, prefix, model):
+        if prefix not in self._increments:
+            self._increments[prefix] = self._ensure_sequence(self._sequence_name(prefix), prefix, model)
+        return self._increments[prefix]
+
+    def _reserve_blocks(self, prefix, model, blocks):
+        name = self._sequence_name(prefix)
+        # Each nextval() is a block (INCREMENT BY); other workers may interleave
+        with db.engine.begin() as conn:
+            return sorted(conn.execute(
+                text(f"SELECT nextval('{name}') FROM generate_series(1, :blocks)"), {'blocks': blocks}
+            ).scalars())
+
+    def _advance_counter(self, prefix, value):
+        name = f'id_seq_{prefix.lower()}'
+        with db.engine.begin() as conn:
+            if not conn.execute(text('SELECT to_regclass(:name)'), {'name': name}).scalar():
+                return  # created from the highest existing ID on first use
+            # Forward only; the next nextval() returns value + block size
+            conn.execute(text(f'SELECT setval(:name, :value) FROM {name} WHERE last_value < :value'),
+                         {'name': name, 'value': value})
+
+    @staticmethod
+    def _increment(name):
+        """INCREMENT BY of sequence `name`, None if it does not exist"""
+        with db.engine.begin() as conn:
+            return conn.execute(text(
+                'SELECT increment_by FROM pg_sequences WHERE schemaname = current_schema() AND sequencename = :name'
+            ), {'name': name}).scalar()
+
+    def _ensure_sequence(self, name, prefix, model):
+        """Create the sequence if needed (never alter an existing one); its INCREMENT BY"""
+        increment = self._increment(name)
+        if increment is None:
+            try:
+                with db.engine.begin() as conn:
+                    start = self._max_existing_value(conn, prefix, model) + 1
+                    conn.execute(text(
+                        f'CREATE SEQUENCE IF NOT EXISTS {name} START WITH {start} INCREMENT BY {self.block_size}'
+                    ))
+                logger.info(f"Created sequence {name} starting at {start}")
+            except (IntegrityError, ProgrammingError):
+                # Lost a creation race with another worker - the sequence exists now
+                pass
+            increment = self._increment(name)
+
+        if increment != self.block_size:
+            logger.warning(f"Sequence {name} was created with INCREMENT BY {increment}; using that as the "
+                           f"block size instead of ID_BLOCK_SIZE={self.block_size}")
+        return int(increment)
+
+
+ALLOCATORS = {
+    'table': TableIdAllocator,
+    'sequence': SequenceIdAllocator,
+}
+
+
+def init_id_allocator(app):
+    """Create the allocator selected by ID_ALLOCATOR and register it on the app"""
+    kind = app.config.get('ID_ALLOCATOR', 'table')
+    if kind not in ALLOCATORS:
+        raise ValueError(f"Unknown ID_ALLOCATOR '{kind}', expected one of {sorted(ALLOCATORS)}")
+
+    if kind == 'sequence' and not app.config['SQLALCHEMY_DATABASE_URI'].startswith('postgresql'):
+        logger.warning("ID_ALLOCATOR=sequence requires PostgreSQL; falling back to 'table'")
+        kind = 'table'
+
+    allocator = ALLOCATORS[kind](block_size=app.config.get('ID_BLOCK_SIZE', 1))
+    allocator.init_app(app)
+    return allocator
+
+
+def get_id_allocator():
+    """Allocator registered on the current app"""
+    return current_app.extensions['id_allocator']
@@ -0,0 +1,371 @@
+"""
+Parts Inventory
+Ties maintenance items' parts_needed to Part stock through a reservation ledger:
+
+- Open items hold their parts: Part.reserved_quantity counts the units promised to
+  them (one PartReservation row per item and part), so quantity - reserved_quantity
+  is what can still be promised.
+- What stock cannot cover is recorded as a short reservation (status SHORT) instead of
+  failing the item; it is not counted in reserved_quantity and is retried when the item's
+  parts are synced again. Callers that prefer a hard failure pass strict=True.
+- Completing an item consumes its reservations; quantity and reserved_quantity drop
+  together. Cancelling or deleting it releases them.
+- A stock count or write-off below reserved_quantity is accepted: the newest reservations
+  give up the missing units, which become short.
+- Every change to quantity is written to the PartMovement ledger with the balance after it.
+
+Stock is only changed by relative, guarded UPDATEs (SET quantity = quantity - n WHERE
+quantity >= n), never read into Python and written back, so concurrent workers cannot
+lose each other's updates. All parts of an item move in a single statement (the per-part
+amount is a CASE on the part id) and RETURNING tells which rows passed their guard.
+Callers commit; after an exception they must roll back.
+"""
+
+import logging
+from datetime import date, datetime
+
+from marshmallow import ValidationError
+from sqlalchemy import func, insert, select, update
+
+from app import db
+from app.models.maintainance import Part, PartMovement, PartReservation, ReservationStatus
+
+logger = logging.getLogger(__name__)
+
+# PartMovement.reason
+RESTOCK = 'restock'
+USE = 'use'
+ADJUST = 'adjust'
+CONSUME = 'consume'
+
+# Compare-and-set attempts when setting an absolute stock count or partly holding a part
+SET_STOCK_ATTEMPTS = 10
+
+
+class InsufficientStock(ValueError):
+    """Not enough unreserved stock; `shortages` is {part_id: {'requested': n, 'available': m}}"""
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        super().__init__(f"Insufficient stock for part(s) {', '.join(sorted(shortages))}")
+
+
+class StockConflict(RuntimeError):
+    """A part's stock or reservations kept changing while an absolute count was being set"""
+
+
+def required_parts(parts_needed):
+    """{part_id: quantity} from an item's parts_needed; entries without a part_id are free text"""
+    required = {}
+    for entry in parts_needed or ():
+        if not isinstance(entry, dict) or not entry.get('part_id'):
+            continue
+        quantity = entry.get('quantity', 1)
+        if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity < 0:
+            raise ValidationError({'parts_needed': [f"Invalid quantity for part {entry['part_id']}: {quantity!r}"]})
+        if quantity:
+            required[entry['part_id']] = required.get(entry['part_id'], 0) + quantity
+    return required
+
+
+def _shift_parts(amounts, values, *conditions):
+    """
+    One UPDATE over the parts in `amounts` ({part_id: n}). `values(amount)` builds the SET
+    clause from the per-row amount expression; `conditions(amount)` are extra guards.
+    Returns {part_id: (id, quantity, reserved_quantity)} of the rows that were updated.
+    """
+    amount = db.case(amounts, value=Part.id)
+    stmt = (
+        update(Part)
+        .where(Part.id.in_(list(amounts)), *(condition(amount) for condition in conditions))
+        .values(updated_at=datetime.utcnow(), **values(amount))
+        .returning(Part.id, Part.quantity, Part.reserved_quantity)
+        .execution_options(synchronize_session=False)
+    )
+    return {row.id: row for row in db.session.execute(stmt)}
+
+
+def _shift_stock(part_id, delta, *conditions):
+    """Add `delta` to one part's quantity if `conditions` hold; the new quantity, or None"""
+    values = {'quantity': Part.quantity + delta, 'updated_at': datetime.utcnow()}
+    if delta > 0:
+        values['last_restocked'] = date.today()
+    return db.session.execute(
+        update(Part)
+        .where(Part.id == part_id, *conditions)
+        .values(values)
+        .returning(Part.quantity)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+
+
+def _stock(part_id):
+    return db.session.execute(
+        select(Part.quantity, Part.reserved_quantity).where(Part.id == part_id)
+    ).first()
+
+
+def _record(movements):
+    db.session.execute(insert(PartMovement), [
+        {'part_id': part_id, 'item_id': item_id, 'delta': delta, 'reason': reason, 'quantity_after': quantity_after}
+        for part_id, item_id, delta, reason, quantity_after in movements
+    ])
+
+
+def _shortages(requested):
+    rows = db.session.execute(
+        select(Part.id, Part.quantity, Part.reserved_quantity).where(Part.id.in_(list(requested)))
+    )
+    available = {row.id: row.quantity - row.reserved_quantity for row in rows}
+    unknown = sorted(set(requested) - set(available))
+    if unknown:
+        raise ValidationError({'parts_needed': [f"Unknown part(s): {', '.join(unknown)}"]})
+    return {part_id: {'requested': quantity, 'available': available[part_id]}
+            for part_id, quantity in requested.items()}
+
+
+# ---------- reservations ----------
+
+def _hold_available(part_id, wanted):
+    """Reserve as much of `wanted` as is unreserved (guarded, retried if it shrinks); units held"""
+    for _ in range(SET_STOCK_ATTEMPTS):
+        current = _stock(part_id)
+        amount = min(wanted, current.quantity - current.reserved_quantity)
+        if amount <= 0:
+            return 0
+        if _shift_parts({part_id: amount},
+                        lambda amount: {'reserved_quantity': Part.reserved_quantity + amount},
+                        lambda amount: Part.quantity - Part.reserved_quantity >= amount):
+            return amount
+    return 0
+
+
+def reserve(item_id, required, strict=False):
+    """
+    Hold `required` ({part_id: quantity}) for an item. The stock check and hold for every
+    part is one UPDATE. Parts it could not cover are held as far as stock goes and the
+    rest is recorded short; with `strict` the others are put back and InsufficientStock
+    is raised instead. Returns {part_id: quantity} held.
+    """
+    if not required:
+        return {}
+
+    held = _shift_parts(required,
+                        lambda amount: {'reserved_quantity': Part.reserved_quantity + amount},
+                        lambda amount: Part.quantity - Part.reserved_quantity >= amount)
+    held = {part_id: required[part_id] for part_id in held}
+    missing = {part_id: quantity for part_id, quantity in required.items() if part_id not in held}
+    if missing:
+        shortages = _shortages(missing)
+        if strict:
+            if held:
+                _shift_parts(held, lambda amount: {'reserved_quantity': Part.reserved_quantity - amount})
+            raise InsufficientStock(shortages)
+        for part_id, quantity in missing.items():
+            held[part_id] = _hold_available(part_id, quantity)
+
+    rows = [{'item_id': item_id, 'part_id': part_id, 'quantity': quantity, 'status': ReservationStatus.RESERVED}
+            for part_id, quantity in held.items() if quantity]
+    rows += [{'item_id': item_id, 'part_id': part_id, 'quantity': quantity - held[part_id],
+              'status': ReservationStatus.SHORT}
+             for part_id, quantity in missing.items() if quantity > held[part_id]]
+    db.session.execute(insert(PartReservation), rows)
+    return {part_id: quantity for part_id, quantity in held.items() if quantity}
+
+
+def _close_reservations(item_id, status):
+    """
+    Move the item's open reservations to `status` (short ones are released, they hold no
+    stock); {part_id: quantity} they held
+    """
+    db.session.execute(
+        update(PartReservation)
+        .where(PartReservation.item_id == item_id, PartReservation.status == ReservationStatus.SHORT)
+        .values(status=ReservationStatus.RELEASED, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    rows = db.session.execute(
+        update(PartReservation)
+        .where(PartReservation.item_id == item_id, PartReservation.status == ReservationStatus.RESERVED)
+        .values(status=status, updated_at=datetime.utcnow())
+        .returning(PartReservation.part_id, PartReservation.quantity)
+        .execution_options(synchronize_session=False)
+    )
+    held = {}
+    for part_id, quantity in rows:
+        held[part_id] = held.get(part_id, 0) + quantity
+    return held
+
+
+def release(item_id):
+    """Give back everything the item holds (cancelled / deleted); {part_id: quantity} released"""
+    held = _close_reservations(item_id, ReservationStatus.RELEASED)
+    if held:
+        _shift_parts(held, lambda amount: {'reserved_quantity': Part.reserved_quantity - amount})
+    return held
+
+
+def consume(item_id):
+    """Take the item's reserved parts out of stock (completed); {part_id: quantity} consumed"""
+    held = _close_reservations(item_id, ReservationStatus.CONSUMED)
+    if not held:
+        return {}
+
+    updated = _shift_parts(held,
+                           lambda amount: {'quantity': Part.quantity - amount,
+                                           'reserved_quantity': Part.reserved_quantity - amount},
+                           lambda amount: Part.quantity >= amount)
+    if len(updated) < len(held):
+        # Reserved units are always in stock; this only happens if stock was changed behind our back
+        raise InsufficientStock(_shortages({part_id: quantity for part_id, quantity in held.items()
+                                            if part_id not in updated}))
+
+    _record((part_id, item_id, -quantity, CONSUME, updated[part_id].quantity) for part_id, quantity in held.items())
+    return held
+
+
+def held_parts(item_id, status=ReservationStatus.RESERVED):
+    """{part_id: quantity} the item currently holds (or is short of, with status=SHORT)"""
+    rows = db.session.execute(
+        select(PartReservation.part_id, func.sum(PartReservation.quantity))
+        .where(PartReservation.item_id == item_id, PartReservation.status == status)
+        .group_by(PartReservation.part_id)
+    )
+    return {part_id: int(quantity) for part_id, quantity in rows}
+
+
+def short_parts(item_id):
+    """{part_id: quantity} the item needs but stock could not cover"""
+    return held_parts(item_id, ReservationStatus.SHORT)
+
+
+def sync(item_id, parts_needed, strict=False):
+    """
+    Make the item's reservations match its parts_needed; {part_id: quantity} held afterwards.
+    Short parts are retried on every call.
+    """
+    required = required_parts(parts_needed)
+    if held_parts(item_id) == required:
+        return required
+    release(item_id)
+    return reserve(item_id, required, strict)
+
+
+def get_reservations(item_id):
+    return PartReservation.query.filter_by(item_id=item_id).order_by(PartReservation.id).all()
+
+
+# ---------- stock ----------
+
+def _short_reservations(part_id, units):
+    """
+    Take `units` back from the part's newest reservations and record them as short. Rows are
+    changed with guards on the values read; StockConflict if another worker got there first.
+    Returns [(item_id, units)] shorted.
+    """
+    rows = db.session.execute(
+        select(PartReservation.id, PartReservation.item_id, PartReservation.quantity)
+        .where(PartReservation.part_id == part_id, PartReservation.status == ReservationStatus.RESERVED)
+        .order_by(PartReservation.id.desc())
+    ).all()
+    shorted = []
+    for row in rows:
+        if units <= 0:
+            break
+        cut = min(units, row.quantity)
+        values = {'status': ReservationStatus.SHORT} if cut == row.quantity else {'quantity': row.quantity - cut}
+        changed = db.session.execute(
+            update(PartReservation)
+            .where(PartReservation.id == row.id, PartReservation.status == ReservationStatus.RESERVED,
+                   PartReservation.quantity == row.quantity)
+            .values(updated_at=datetime.utcnow(), **values)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not changed:
+            raise StockConflict(f'Reservations of part {part_id} changed concurrently, retry the update')
+        shorted.append((row.item_id, cut))
+        units -= cut
+    if units > 0:
+        raise StockConflict(f'Reservations of part {part_id} changed concurrently, retry the update')
+
+    partial = [{'item_id': item_id, 'part_id': part_id, 'quantity': cut, 'status': ReservationStatus.SHORT}
+               for (item_id, cut), row in zip(shorted, rows) if cut < row.quantity]
+    if partial:
+        db.session.execute(insert(PartReservation), partial)
+    logger.warning('Stock of part %s fell below its reservations; short: %s', part_id,
+                   ', '.join(f'{item_id} ({cut})' for item_id, cut in shorted))
+    return shorted
+
+
+def _write_down(part_id, current, quantity):
+    """
+    Compare-and-set a part from `current` to a `quantity` below its reserved units, shorting
+    the reservations that no longer fit. False if the part changed since it was read.
+    """
+    changed = db.session.execute(
+        update(Part)
+        .where(Part.id == part_id, Part.quantity == current.quantity,
+               Part.reserved_quantity == current.reserved_quantity)
+        .values(quantity=quantity, reserved_quantity=quantity, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not changed:
+        return False
+    _short_reservations(part_id, current.reserved_quantity - quantity)
+    return True
+
+
+def adjust_stock(part_id, delta, reason, item_id=None):
+    """
+    Add `delta` units to a part (negative to take some out). Taking out reserved units (a
+    write-off) is accepted: the reservations that no longer fit become short.
+    Returns the new quantity, None if the part does not exist.
+    """
+    for _ in range(SET_STOCK_ATTEMPTS):
+        quantity = _shift_stock(part_id, delta, Part.quantity + delta >= Part.reserved_quantity)
+        if quantity is not None:
+            break
+        current = _stock(part_id)
+        if current is None:
+            return None
+        quantity = current.quantity + delta
+        if quantity < 0:
+            raise InsufficientStock({part_id: {'requested': -delta, 'available': current.quantity}})
+        if quantity < current.reserved_quantity and _write_down(part_id, current, quantity):
+            break
+    else:
+        raise StockConflict(f'Stock of part {part_id} kept changing, retry the update')
+
+    _record([(part_id, item_id, delta, reason, quantity)])
+    return quantity
+
+
+def set_stock(part_id, quantity, reason=ADJUST):
+    """
+    Set a part's quantity from a stock count, ledgered as the difference. A compare-and-set
+    on the quantity read, retried if another worker moved stock in between. A count below
+    the reserved units is accepted; the reservations that no longer fit become short.
+    Returns the quantity, None if the part does not exist.
+    """
+    for _ in range(SET_STOCK_ATTEMPTS):
+        current = _stock(part_id)
+        if current is None:
+            return None
+        delta = quantity - current.quantity
+        if delta == 0:
+            return quantity
+        if quantity < current.reserved_quantity:
+            written = _write_down(part_id, current, quantity)
+        else:
+            written = _shift_stock(part_id, delta, Part.quantity == current.quantity,
+                                   Part.reserved_quantity <= quantity) is not None
+        if written:
+            _record([(part_id, None, delta, reason, quantity)])
+            return quantity
+    raise StockConflict(f'Stock of part {part_id} kept changing, retry the update')
+
+
+def get_movements(part_id, limit=50):
+    return (PartMovement.query.filter_by(part_id=part_id)
+            .order_by(PartMovement.created_at.desc(), PartMovement.id.desc())
+            .limit(limit).all())
@@ -1,41 +1,87 @@
 from app import db
-from app.models.maintainance import MaintenanceItem, MaintenanceStatus, MaintenancePriority, Technician, TechnicianStatus, Part, RecurringSchedule, FrequencyType
+from app.models.maintainance import MaintenanceItem, MaintenanceStatus, MaintenancePriority, Technician, TechnicianStatus, Part, RecurringSchedule, FrequencyType, OdometerReading, PartMovement
 from datetime import datetime, date, timedelta
-from sqlalchemy import or_, and_
+from marshmallow import ValidationError
+from sqlalchemy import or_, and_, bindparam, select, update
+from app.services.id_allocator import get_id_allocator
+from app.services import inventory, mileage as vehicle_mileage
+from app.services.assignment import get_assignment_engine
+from app.services.recurring import materialize_due_schedules, next_occurrence
+from app.services.search import get_search_engine
+from app.utils.cache import cached
+from app.utils.pagination import keyset_paginate
+from app.utils.serializer import RowSerializer
+
+# Maintenance item fields in to_dict() order, read as plain rows by the list endpoints
+ITEM_FIELDS = (
+    'id', 'vehicle_id', 'type', 'description', 'status', 'priority',
+    'due_date', 'scheduled_date', 'completed_date', 'projected_due_date', 'current_mileage', 'due_mileage',
+    'estimated_cost', 'actual_cost', 'assigned_to', 'assigned_technician', 'technician_id',
+    'notes', 'parts_needed', 'attachments', 'schedule_id', 'created_at', 'updated_at'
+)
 
 class MaintenanceService:
     
+    # Thresholds for automatic DUE_SOON status
+    DUE_SOON_DAYS = 7
+    DUE_SOON_MILEAGE = 500
+    
+    # Sort keys for keyset pagination: (column, descending), ending with the unique id
+    LIST_ORDER = [
+        (MaintenanceItem.status, True),
+        (MaintenanceItem.priority, True),
+        (MaintenanceItem.due_date, False),
+        (MaintenanceItem.id, False)
+    ]
+    SEARCH_ORDER = [
+        (MaintenanceItem.due_date, True),
+        (MaintenanceItem.id, True)
+    ]
+    
+    ITEM_ROWS = RowSerializer(MaintenanceItem, ITEM_FIELDS)
+    
+    @staticmethod
+    def _item_rows(fields=None, order_by=()):
+        """Row serializer for a sparse fieldset, also selecting updated_at (ETags) and the sort keys a cursor needs"""
+        required = ['id', 'updated_at'] + [column.key for column, _ in order_by]
+        return MaintenanceService.ITEM_ROWS.project(fields, required)
+    
     @staticmethod
     def generate_id(prefix, model):
         """Generate unique ID with prefix"""
-        last_item = model.query.order_by(model.id.desc()).first()
-        new_num = 1
-        
-        if last_item and last_item.id.startswith(prefix):
-            try:
-                new_num = int(last_item.id[len(prefix):]) + 1
-            except ValueError:
-                pass
-                
-        return f'{prefix}{new_num:03d}'
+        return get_id_allocator().next_id(prefix, model)
     
     @staticmethod
     def generate_maintenance_id():
         return MaintenanceService.generate_id('M', MaintenanceItem)
+    
+    @staticmethod
+    def generate_maintenance_ids(count):
+        """`count` maintenance item IDs from one allocator reservation"""
+        return get_id_allocator().next_ids('M', MaintenanceItem, count)
 
     @staticmethod
-    def create_maintenance_item(data):
+    def create_maintenance_item(data, strict_stock=False):
         """Create a new maintenance item"""
         # Use provided ID or generate one
         maintenance_id = data.get('id') or MaintenanceService.generate_maintenance_id()
+        technician_id, technician_name = MaintenanceService._resolve_technician(data)
+        
+        # The item's current mileage is an odometer reading: it refines the vehicle's rate
+        mileage = vehicle_mileage.record_readings([
+            {'vehicle_id': data['vehicle_id'], 'odometer': data['current_mileage']}
+        ]).get(data['vehicle_id'])
+        current_mileage = max(data['current_mileage'], mileage.odometer) if mileage else data['current_mileage']
+        projected = vehicle_mileage.projected_due_date(data['due_date'], data['due_mileage'], mileage)
         
         # Determine status if not provided
         status = data.get('status')
         if not status:
             status = MaintenanceService._determine_status(
                 data['due_date'], 
-                data['current_mileage'], 
-                data['due_mileage']
+                current_mileage, 
+                data['due_mileage'],
+                projected
             ).value
         
         maintenance_item = MaintenanceItem(
@@ -46,23 +92,32 @@ class MaintenanceService:
             priority=MaintenancePriority(data['priority']),
             status=MaintenanceStatus(status),
             due_date=data['due_date'],
-            current_mileage=data['current_mileage'],
+            projected_due_date=projected,
+            current_mileage=current_mileage,
             due_mileage=data['due_mileage'],
             estimated_cost=data.get('estimated_cost', 0.0),
             assigned_to=data.get('assigned_to'),
-            assigned_technician=data.get('assigned_technician'),
+            assigned_technician=technician_name,
+            technician_id=technician_id,
             notes=data.get('notes'),
             parts_needed=data.get('parts_needed')
         )
         
         db.session.add(maintenance_item)
+        MaintenanceService._adjust_technician_counters((None, None), (technician_id, maintenance_item.status))
+        MaintenanceService._update_part_reservations(maintenance_item, None, parts_changed=True, strict=strict_stock)
         db.session.commit()
+        if data.get('id'):
+            # Generated IDs must not collide with this one later
+            get_id_allocator().advance('M', maintenance_id)
         return maintenance_item
     
     @staticmethod
-    def _determine_status(due_date, current_mileage, due_mileage):
-        """Automatically determine maintenance status"""
+    def _determine_status(due_date, current_mileage, due_mileage, projected_due_date=None):
+        """Automatically determine maintenance status (projected_due_date: see app.services.mileage)"""
         today = date.today()
+        if projected_due_date is not None:
+            due_date = min(due_date, projected_due_date)
         days_until_due = (due_date - today).days
         mileage_diff = due_mileage - current_mileage
         
@@ -71,14 +126,14 @@ class MaintenanceService:
             return MaintenanceStatus.OVERDUE
         
         # Due soon if within 7 days or within 500 km
-        if days_until_due <= 7 or mileage_diff <= 500:
+        if days_until_due <= MaintenanceService.DUE_SOON_DAYS or mileage_diff <= MaintenanceService.DUE_SOON_MILEAGE:
             return MaintenanceStatus.DUE_SOON
         
         return MaintenanceStatus.SCHEDULED
     
     @staticmethod
-    def get_all_maintenance_items(filters=None, page=1, per_page=10):
-        """Get all maintenance items with optional filtering and pagination"""
+    def _filtered_items_query(filters=None):
+        """MaintenanceItem query with the list endpoint filters applied"""
         query = MaintenanceItem.query
         
         if filters:
@@ -102,22 +157,63 @@ class MaintenanceService:
             if 'dueDateTo' in filters:
                 query = query.filter(MaintenanceItem.due_date <= filters['dueDateTo'])
         
+        return query
+    
+    @staticmethod
+    def get_all_maintenance_items(filters=None, page=1, per_page=10, cursor=None, count='none', fields=None):
+        """
+        Get all maintenance items with optional filtering and pagination.
+        Passing `cursor` (empty string for the first page) switches to keyset pagination.
+        `fields` limits the selected and returned columns (id is always included).
+        """
+        result, serializer = MaintenanceService.get_maintenance_page(filters, page, per_page, cursor, count, fields)
+        result['items'] = serializer.to_dicts(result['items'])
+        return result
+    
+    @staticmethod
+    def get_maintenance_page(filters=None, page=1, per_page=10, cursor=None, count='none', fields=None):
+        """
+        get_all_maintenance_items without the serialization step: returns (result, serializer)
+        with result['items'] as Rows (always carrying id and updated_at).
+        """
+        serializer = MaintenanceService._item_rows(fields, MaintenanceService.LIST_ORDER)
+        query = MaintenanceService._filtered_items_query(filters).with_entities(*serializer.columns)
+        
+        if cursor is not None:
+            return keyset_paginate(query, MaintenanceService.LIST_ORDER, cursor, per_page, count), serializer
+        
         # Order by priority and due date
         query = query.order_by(
             MaintenanceItem.status.desc(),
             MaintenanceItem.priority.desc(),
-            MaintenanceItem.due_date.asc()
+            MaintenanceItem.due_date.asc(),
+            MaintenanceItem.id.asc()
         )
         
         pagination = query.paginate(page=page, per_page=per_page, error_out=False)
         
         return {
-            'items': [item.to_dict() for item in pagination.items],
+            'items': pagination.items,
             'total': pagination.total,
             'pages': pagination.pages,
             'page': page,
             'per_page': per_page
-        }
+        }, serializer
+    
+    @staticmethod
+    def iter_maintenance_batches(filters=None, fields=None, batch_size=1000):
+        """
+        Yield every matching item as lists of up to `batch_size` dicts, in id order.
+        Rows are streamed from a server-side cursor, so memory stays flat for any table size.
+        """
+        serializer = MaintenanceService._item_rows(fields)
+        query = MaintenanceService._filtered_items_query(filters).with_entities(*serializer.columns)
+        result = db.session.execute(
+            query.order_by(MaintenanceItem.id).statement,
+            execution_options={'yield_per': batch_size}
+        )
+        for rows in result.partitions():
+            yield serializer.to_dicts(rows)
     
     @staticmethod
     def get_maintenance_item(item_id):
@@ -125,11 +221,13 @@ class MaintenanceService:
         return MaintenanceItem.query.get(item_id)
     
     @staticmethod
-    def update_maintenance_item(item_id, data):
+    def update_maintenance_item(item_id, data, strict_stock=False):
         """Update a maintenance item"""
-        item = MaintenanceItem.query.get(item_id)
+        # Row lock (PostgreSQL): concurrent updates must see each other's status for the counters
+        item = db.session.get(MaintenanceItem, item_id, with_for_update=True)
         if not item:
             return None
+        before = (item.technician_id, item.status)
         
         # Handle special fields
         if data.get('status'):
@@ -159,6 +257,19 @@ class MaintenanceService:
                     continue
                 setattr(item, field, value)
         
+        if 'technician_id' in data or 'assigned_technician' in data:
+            item.technician_id, item.assigned_technician = MaintenanceService._resolve_technician(data)
+        MaintenanceService._adjust_technician_counters(before, (item.technician_id, item.status))
+        MaintenanceService._update_part_reservations(item, before[1], parts_changed='parts_needed' in data,
+                                                     strict=strict_stock)
+        
+        if data.get('current_mileage') is not None:
+            vehicle_mileage.record_readings([{'vehicle_id': item.vehicle_id, 'odometer': data['current_mileage']}])
+        if any(data.get(field) is not None for field in ('due_date', 'due_mileage', 'current_mileage')):
+            item.projected_due_date = vehicle_mileage.projected_due_date(
+                item.due_date, item.due_mileage, vehicle_mileage.get_vehicle_mileage(item.vehicle_id)
+            )
+        
         item.updated_at = datetime.utcnow()
         db.session.commit()
         return item
@@ -166,57 +277,53 @@ class MaintenanceService:
     @staticmethod
     def delete_maintenance_item(item_id):
         """Delete a maintenance item"""
-        item = MaintenanceItem.query.get(item_id)
+        item = db.session.get(MaintenanceItem, item_id, with_for_update=True)
         if not item:
             return False
         
+        # A completed job stays in the technician's completed_jobs history
+        if item.status != MaintenanceStatus.COMPLETED:
+            MaintenanceService._adjust_technician_counters((item.technician_id, item.status), (None, None))
+        inventory.release(item.id)
         db.session.delete(item)
         db.session.commit()
         return True
     
     @staticmethod
+    @cached('maintenance')
     def get_maintenance_summary():
-        """Get summary statistics for maintenance items"""
-        total = MaintenanceItem.query.count()
-        
-        # Count by status
-        by_status = {}
-        for status in MaintenanceStatus:
-            count = MaintenanceItem.query.filter(MaintenanceItem.status == status).count()
-            by_status[status.value] = count
-        
-        # Count by priority
-        by_priority = {}
-        for priority in MaintenancePriority:
-            count = MaintenanceItem.query.filter(MaintenanceItem.priority == priority).count()
-            by_priority[priority.value] = count
-        
-        overdue_count = MaintenanceItem.query.filter(
-            MaintenanceItem.status == MaintenanceStatus.OVERDUE
-        ).count()
+        """Get summary statistics for maintenance items (single grouped query)"""
+        rows = db.session.query(
+            MaintenanceItem.status,
+            MaintenanceItem.priority,
+            db.func.count(MaintenanceItem.id),
+            db.func.sum(MaintenanceItem.estimated_cost),
+            db.func.sum(MaintenanceItem.actual_cost)
+        ).group_by(MaintenanceItem.status, MaintenanceItem.priority).all()
         
-        due_soon_count = MaintenanceItem.query.filter(
-            MaintenanceItem.status == MaintenanceStatus.DUE_SOON
-        ).count()
+        active_statuses = {
+            MaintenanceStatus.SCHEDULED,
+            MaintenanceStatus.IN_PROGRESS,
+            MaintenanceStatus.DUE_SOON,
+            MaintenanceStatus.OVERDUE
+        }
         
-        # Calculate total estimated cost for active maintenance
-        total_estimated_cost = db.session.query(
-            db.func.sum(MaintenanceItem.estimated_cost)
-        ).filter(
-            MaintenanceItem.status.in_([
-                MaintenanceStatus.SCHEDULED, 
-                MaintenanceStatus.IN_PROGRESS,
-                MaintenanceStatus.DUE_SOON,
-                MaintenanceStatus.OVERDUE
-            ])
-        ).scalar() or 0.0
+        total = 0
+        by_status = {status.value: 0 for status in MaintenanceStatus}
+        by_priority = {priority.value: 0 for priority in MaintenancePriority}
+        total_estimated_cost = 0.0
+        total_actual_cost = 0.0
         
-        # Calculate total actual cost for completed maintenance
-        total_actual_cost = db.session.query(
-            db.func.sum(MaintenanceItem.actual_cost)
-        ).filter(
-            MaintenanceItem.status == MaintenanceStatus.COMPLETED
-        ).scalar() or 0.0
+        for status, priority, count, estimated, actual in rows:
+            total += count
+            by_status[status.value] += count
+            by_priority[priority.value] += count
+            
+            # Estimated cost for active maintenance, actual cost for completed
+            if status in active_statuses:
+                total_estimated_cost += estimated or 0.0
+            elif status == MaintenanceStatus.COMPLETED:
+                total_actual_cost += actual or 0.0
         
         return {
             'total_items': total,
@@ -224,126 +331,223 @@ class MaintenanceService:
             'by_priority': by_priority,
             'total_estimated_cost': float(total_estimated_cost),
             'total_actual_cost': float(total_actual_cost),
-            'overdue_count': overdue_count,
-            'due_soon_count': due_soon_count
+            'overdue_count': by_status[MaintenanceStatus.OVERDUE.value],
+            'due_soon_count': by_status[MaintenanceStatus.DUE_SOON.value]
         }
     
     @staticmethod
-    def get_vehicle_maintenance_history(vehicle_id):
+    def get_vehicle_maintenance_history(vehicle_id, fields=None):
         """Get maintenance history for a specific vehicle"""
-        items = MaintenanceItem.query.filter(
+        serializer = MaintenanceService._item_rows(fields)
+        rows = MaintenanceItem.query.with_entities(*serializer.columns).filter(
             MaintenanceItem.vehicle_id == vehicle_id
         ).order_by(MaintenanceItem.due_date.desc()).all()
         
-        return [item.to_dict() for item in items]
+        return serializer.to_dicts(rows)
     
     @staticmethod
-    def update_maintenance_status_bulk():
-        """Background job to update maintenance statuses based on current date and mileage"""
-        items = MaintenanceItem.query.filter(
-            MaintenanceItem.status.in_([MaintenanceStatus.SCHEDULED, MaintenanceStatus.DUE_SOON])
-        ).all()
+    def _status_conditions(today):
+        """SQL equivalents of the _determine_status rules: (overdue, due_soon)"""
+        overdue = or_(
+            MaintenanceItem.projected_due_date < today,
+            MaintenanceItem.current_mileage >= MaintenanceItem.due_mileage
+        )
+        due_soon = or_(
+            MaintenanceItem.projected_due_date <= today + timedelta(days=MaintenanceService.DUE_SOON_DAYS),
+            MaintenanceItem.due_mileage - MaintenanceItem.current_mileage <= MaintenanceService.DUE_SOON_MILEAGE
+        )
+        return overdue, due_soon
+    
+    @staticmethod
+    def _apply_status_transitions(today, scope=None):
+        """Run the status transition UPDATEs (optionally limited by `scope`) and return per-transition counts"""
+        overdue, due_soon = MaintenanceService._status_conditions(today)
+        now = datetime.utcnow()
+        
+        # Order matters: rows moved to OVERDUE are no longer candidates for the later transitions
+        transitions = [
+            (MaintenanceStatus.SCHEDULED, MaintenanceStatus.OVERDUE, overdue),
+            (MaintenanceStatus.DUE_SOON, MaintenanceStatus.OVERDUE, overdue),
+            (MaintenanceStatus.SCHEDULED, MaintenanceStatus.DUE_SOON, due_soon),
+            (MaintenanceStatus.DUE_SOON, MaintenanceStatus.SCHEDULED, ~due_soon),
+        ]
         
-        updated_count = 0
-        for item in items:
-            new_status = MaintenanceService._determine_status(
-                item.due_date,
-                item.current_mileage,
-                item.due_mileage
+        counts = {}
+        for from_status, to_status, condition in transitions:
+            statement = db.update(MaintenanceItem).where(
+                MaintenanceItem.status == from_status,
+                condition
+            )
+            if scope is not None:
+                statement = statement.where(scope)
+            
+            result = db.session.execute(
+                statement.values(status=to_status, updated_at=now),
+                execution_options={'synchronize_session': False}
             )
-            if item.status != new_status:
-                item.status = new_status
-                item.updated_at = datetime.utcnow()
-                updated_count += 1
+            counts[f'{from_status.value}->{to_status.value}'] = result.rowcount
         
-        db.session.commit()
-        return updated_count
+        return counts
     
     @staticmethod
-    def get_cost_analytics():
-        """Get detailed cost analytics"""
-        # Total costs
-        total_estimated = db.session.query(
-            db.func.sum(MaintenanceItem.estimated_cost)
-        ).scalar() or 0.0
+    def update_maintenance_status_bulk(batch_size=None):
+        """
+        Background job to update maintenance statuses based on current date and mileage.
+        Runs set-based UPDATEs in one transaction, or in keyset-paginated batches of
+        `batch_size` rows (one transaction each) when a batch size is given.
+        """
+        today = date.today()
         
-        total_actual = db.session.query(
-            db.func.sum(MaintenanceItem.actual_cost)
-        ).filter(
-            MaintenanceItem.actual_cost.isnot(None)
-        ).scalar() or 0.0
+        if not batch_size:
+            transitions = MaintenanceService._apply_status_transitions(today)
+            db.session.commit()
+        else:
+            transitions = {}
+            last_id = None
+            while True:
+                query = db.session.query(MaintenanceItem.id).filter(
+                    MaintenanceItem.status.in_([MaintenanceStatus.SCHEDULED, MaintenanceStatus.DUE_SOON])
+                )
+                if last_id is not None:
+                    query = query.filter(MaintenanceItem.id > last_id)
+                ids = [item_id for (item_id,) in query.order_by(MaintenanceItem.id).limit(batch_size)]
+                if not ids:
+                    break
+                
+                batch = MaintenanceService._apply_status_transitions(today, MaintenanceItem.id.in_(ids))
+                db.session.commit()
+                for transition, count in batch.items():
+                    transitions[transition] = transitions.get(transition, 0) + count
+                last_id = ids[-1]
         
-        # Cost by vehicle
-        by_vehicle = {}
-        vehicles = db.session.query(MaintenanceItem.vehicle_id).distinct().all()
+        return {
+            'updated_count': sum(transitions.values()),
+            'transitions': transitions
+        }
+    
+    @staticmethod
+    @cached('maintenance')
+    def get_cost_analytics(include_by_vehicle=True):
+        """Get detailed cost analytics (constant number of grouped queries)"""
+        pending_statuses = {
+            MaintenanceStatus.SCHEDULED,
+            MaintenanceStatus.DUE_SOON,
+            MaintenanceStatus.OVERDUE,
+            MaintenanceStatus.IN_PROGRESS
+        }
         
-        for (vehicle_id,) in vehicles:
-            vehicle_estimated = db.session.query(
-                db.func.sum(MaintenanceItem.estimated_cost)
-            ).filter(MaintenanceItem.vehicle_id == vehicle_id).scalar() or 0.0
-            
-            vehicle_actual = db.session.query(
-                db.func.sum(MaintenanceItem.actual_cost)
-            ).filter(
-                MaintenanceItem.vehicle_id == vehicle_id,
-                MaintenanceItem.actual_cost.isnot(None)
-            ).scalar() or 0.0
-            
-            by_vehicle[vehicle_id] = {
-                'estimated': float(vehicle_estimated),
-                'actual': float(vehicle_actual),
-                'variance': float(vehicle_actual - vehicle_estimated)
-            }
+        # Cost by maintenance type, split by status so totals and counts come from the same rows
+        rows = db.session.query(
+            MaintenanceItem.type,
+            MaintenanceItem.status,
+            db.func.count(MaintenanceItem.id),
+            db.func.sum(MaintenanceItem.estimated_cost),
+            db.func.sum(MaintenanceItem.actual_cost)
+        ).group_by(MaintenanceItem.type, MaintenanceItem.status).all()
         
-        # Cost by maintenance type
         by_type = {}
-        types = db.session.query(MaintenanceItem.type).distinct().all()
+        total_estimated = 0.0
+        total_actual = 0.0
+        completed_count = 0
+        pending_count = 0
         
-        for (maint_type,) in types:
-            type_estimated = db.session.query(
-                db.func.sum(MaintenanceItem.estimated_cost)
-            ).filter(MaintenanceItem.type == maint_type).scalar() or 0.0
+        for maint_type, status, count, estimated, actual in rows:
+            estimated = float(estimated or 0.0)
+            actual = float(actual or 0.0)
             
-            type_actual = db.session.query(
-                db.func.sum(MaintenanceItem.actual_cost)
-            ).filter(
-                MaintenanceItem.type == maint_type,
-                MaintenanceItem.actual_cost.isnot(None)
-            ).scalar() or 0.0
+            type_costs = by_type.setdefault(maint_type, {'estimated': 0.0, 'actual': 0.0, 'count': 0})
+            type_costs['estimated'] += estimated
+            type_costs['actual'] += actual
+            type_costs['count'] += count
             
-            by_type[maint_type] = {
-                'estimated': float(type_estimated),
-                'actual': float(type_actual),
-                'count': MaintenanceItem.query.filter(MaintenanceItem.type == maint_type).count()
-            }
+            total_estimated += estimated
+            total_actual += actual
+            if status == MaintenanceStatus.COMPLETED:
+                completed_count += count
+            elif status in pending_statuses:
+                pending_count += count
         
         variance = total_actual - total_estimated
         variance_percent = (variance / total_estimated * 100) if total_estimated > 0 else 0
         
-        return {
+        analytics = {
             'total_estimated': float(total_estimated),
             'total_actual': float(total_actual),
             'variance': float(variance),
             'variance_percent': float(variance_percent),
-            'by_vehicle': by_vehicle,
-            'by_type': by_type,
-            'completed_count': MaintenanceItem.query.filter(
-                MaintenanceItem.status == MaintenanceStatus.COMPLETED
-            ).count(),
-            'pending_count': MaintenanceItem.query.filter(
-                MaintenanceItem.status.in_([
-                    MaintenanceStatus.SCHEDULED,
-                    MaintenanceStatus.DUE_SOON,
-                    MaintenanceStatus.OVERDUE,
-                    MaintenanceStatus.IN_PROGRESS
-                ])
-            ).count()
         }
+        if include_by_vehicle:
+            analytics['by_vehicle'] = dict(MaintenanceService.iter_vehicle_costs())
+        analytics.update({
+            'by_type': by_type,
+            'completed_count': completed_count,
+            'pending_count': pending_count
+        })
+        return analytics
+    
+    @staticmethod
+    def iter_vehicle_costs(batch_size=1000):
+        """Yield (vehicle_id, costs) pairs from one grouped query using a server-side cursor"""
+        query = db.session.query(
+            MaintenanceItem.vehicle_id,
+            db.func.sum(MaintenanceItem.estimated_cost),
+            db.func.sum(MaintenanceItem.actual_cost)
+        ).group_by(MaintenanceItem.vehicle_id).order_by(MaintenanceItem.vehicle_id)
+        
+        for vehicle_id, estimated, actual in query.yield_per(batch_size):
+            estimated = float(estimated or 0.0)
+            actual = float(actual or 0.0)
+            yield vehicle_id, {
+                'estimated': estimated,
+                'actual': actual,
+                'variance': actual - estimated
+            }
+    
+    @staticmethod
+    def _period_start(day, period, periods_back=0):
+        """First day of the period containing `day`, shifted back by `periods_back` periods"""
+        if period == 'week':
+            return day - timedelta(days=day.weekday(), weeks=periods_back)
+        if period == 'year':
+            return date(day.year - periods_back, 1, 1)
+        
+        months_per_period = 3 if period == 'quarter' else 1
+        month_index = day.year * 12 + day.month - 1
+        month_index -= month_index % months_per_period + periods_back * months_per_period
+        return date(month_index // 12, month_index % 12 + 1, 1)
+    
+    @staticmethod
+    def _period_label(period_start, period):
+        if period == 'week':
+            return period_start.strftime('%Y-W%W')
+        if period == 'quarter':
+            return f'{period_start.year}-Q{(period_start.month - 1) // 3 + 1}'
+        if period == 'year':
+            return str(period_start.year)
+        return period_start.strftime('%Y-%m')
+    
+    @staticmethod
+    def _period_bucket(column, period):
+        """SQL expression truncating `column` to the start of its period"""
+        if db.engine.dialect.name == 'sqlite':
+            if period == 'week':
+                # Monday-based weeks, matching date_trunc('week', ...)
+                return db.func.date(column, '-6 days', 'weekday 1')
+            if period == 'quarter':
+                months_into_quarter = (db.cast(db.func.strftime('%m', column), db.Integer) - 1) % 3
+                return db.func.date(column, 'start of month', db.func.printf('-%d months', months_into_quarter))
+            if period == 'year':
+                return db.func.date(column, 'start of year')
+            return db.func.date(column, 'start of month')
+        
+        return db.func.date_trunc(period, column)
     
     @staticmethod
+    @cached('maintenance')
     def get_maintenance_trends(period='month', limit=12):
-        """Get maintenance trends over time"""
-        all_items = MaintenanceItem.query.all()
+        """Get maintenance trends over time (bucketed in the database)"""
+        if period not in ('week', 'month', 'quarter', 'year'):
+            period = 'month'
         
         trends = {
             'periods': [],
@@ -352,96 +556,202 @@ class MaintenanceService:
             'estimated_cost': [],
             'actual_cost': [],
         }
+        if limit <= 0:
+            return trends
         
-        # Generate period labels
         today = date.today()
+        first_period = MaintenanceService._period_start(today, period, limit - 1)
+        bucket = MaintenanceService._period_bucket(MaintenanceItem.created_at, period).label('bucket')
+        
+        rows = db.session.query(
+            bucket,
+            db.func.count(MaintenanceItem.id),
+            db.func.sum(db.case((MaintenanceItem.status == MaintenanceStatus.COMPLETED, 1), else_=0)),
+            db.func.sum(MaintenanceItem.estimated_cost),
+            db.func.sum(MaintenanceItem.actual_cost)
+        ).filter(
+            MaintenanceItem.created_at >= datetime.combine(first_period, datetime.min.time())
+        ).group_by(bucket).all()
+        
+        by_bucket = {}
+        for bucket_start, total, completed, estimated, actual in rows:
+            if isinstance(bucket_start, str):
+                bucket_start = date.fromisoformat(bucket_start[:10])
+            elif isinstance(bucket_start, datetime):
+                bucket_start = bucket_start.date()
+            by_bucket[bucket_start] = (total, completed, estimated, actual)
+        
         for i in range(limit - 1, -1, -1):
-            if period == 'week':
-                period_start = today - timedelta(weeks=i)
-                period_label = period_start.strftime('%Y-W%W')
-            elif period == 'quarter':
-                months_back = i * 3
-                period_start = today - timedelta(days=months_back * 30)
-                period_label = f'{period_start.year}-Q{(period_start.month - 1) // 3 + 1}'
-            elif period == 'year':
-                period_start = date(today.year - i, 1, 1)
-                period_label = str(period_start.year)
-            else:  # month (default)
-                months_back = i
-                year = today.year - (today.month - 1 - months_back) // 12
-                month = ((today.month - 1 - months_back) % 12) + 1
-                period_start = date(year, month, 1)
-                period_label = period_start.strftime('%Y-%m')
-            
-            trends['periods'].append(period_label)
+            period_start = MaintenanceService._period_start(today, period, i)
+            total, completed, estimated, actual = by_bucket.get(period_start, (0, 0, 0.0, 0.0))
             
-            # Count items for this period
-            # Note: This is a simplified filtering, in production use DB queries
-            period_items = [item for item in all_items if item.created_at and 
-                          item.created_at.strftime('%Y-%m') == period_start.strftime('%Y-%m')] # Rough approx
-            
-            trends['total_items'].append(len(period_items))
-            trends['completed'].append(
-                len([i for i in period_items if i.status == MaintenanceStatus.COMPLETED])
-            )
-            
-            est_cost = sum(i.estimated_cost or 0 for i in period_items)
-            act_cost = sum(i.actual_cost or 0 for i in period_items if i.actual_cost)
-            
-            trends['estimated_cost'].append(float(est_cost))
-            trends['actual_cost'].append(float(act_cost))
+            trends['periods'].append(MaintenanceService._period_label(period_start, period))
+            trends['total_items'].append(total)
+            trends['completed'].append(int(completed or 0))
+            trends['estimated_cost'].append(float(estimated or 0.0))
+            trends['actual_cost'].append(float(actual or 0.0))
         
         return trends
     
     @staticmethod
-    def get_overdue_items():
+    @cached('maintenance')
+    def get_overdue_items(fields=None):
         """Get all overdue maintenance items"""
-        items = MaintenanceItem.query.filter(
+        serializer = MaintenanceService._item_rows(fields)
+        rows = MaintenanceItem.query.with_entities(*serializer.columns).filter(
             MaintenanceItem.status == MaintenanceStatus.OVERDUE
         ).order_by(MaintenanceItem.due_date.asc()).all()
         
-        return [item.to_dict() for item in items]
+        return serializer.to_dicts(rows)
     
     @staticmethod
-    def get_upcoming_items(days=30):
-        """Get upcoming maintenance items"""
+    @cached('maintenance')
+    def get_upcoming_items(days=30, fields=None):
+        """Get upcoming maintenance items (by calendar or mileage-projected due date)"""
         future_date = date.today() + timedelta(days=days)
+        serializer = MaintenanceService._item_rows(fields)
         
-        items = MaintenanceItem.query.filter(
+        rows = MaintenanceItem.query.with_entities(*serializer.columns).filter(
             MaintenanceItem.status.in_([
                 MaintenanceStatus.SCHEDULED,
                 MaintenanceStatus.DUE_SOON
             ]),
-            MaintenanceItem.due_date <= future_date
-        ).order_by(MaintenanceItem.due_date.asc()).all()
+            MaintenanceItem.projected_due_date <= future_date
+        ).order_by(MaintenanceItem.projected_due_date.asc()).all()
         
-        return [item.to_dict() for item in items]
+        return serializer.to_dicts(rows)
     
     @staticmethod
-    def search_maintenance(query, page=1, per_page=10):
-        """Search maintenance items by query string"""
-        search_query = MaintenanceItem.query.filter(
-            or_(
-                MaintenanceItem.type.ilike(f'%{query}%'),
-                MaintenanceItem.description.ilike(f'%{query}%'),
-                MaintenanceItem.vehicle_id.ilike(f'%{query}%'),
-                MaintenanceItem.id.ilike(f'%{query}%'),
-                MaintenanceItem.assigned_to.ilike(f'%{query}%'),
-                MaintenanceItem.assigned_technician.ilike(f'%{query}%')
-            )
-        ).order_by(MaintenanceItem.due_date.desc())
+    def search_maintenance(query, page=1, per_page=10, cursor=None, count='none', fields=None):
+        """Search maintenance items by query string (ranked, prefix-matching)"""
+        result, serializer = MaintenanceService.search_maintenance_page(query, page, per_page, cursor, count, fields)
+        result['items'] = serializer.to_dicts(result['items'])
+        return result
+    
+    @staticmethod
+    def search_maintenance_page(query, page=1, per_page=10, cursor=None, count='none', fields=None):
+        """search_maintenance without the serialization step: returns (result, serializer)"""
+        search_engine = get_search_engine()
+        serializer = MaintenanceService._item_rows(fields, MaintenanceService.SEARCH_ORDER)
         
-        pagination = search_query.paginate(page=page, per_page=per_page, error_out=False)
+        if cursor is not None:
+            return search_engine.keyset_page(
+                query, MaintenanceService.SEARCH_ORDER, cursor, per_page, count, serializer.columns
+            ), serializer
+        
+        rows, total = search_engine.ranked_page(query, page, per_page, serializer.columns)
         
         return {
-            'items': [item.to_dict() for item in pagination.items],
-            'total': pagination.total,
-            'pages': pagination.pages,
+            'items': rows,
+            'total': total,
+            'pages': (total + per_page - 1) // per_page if per_page > 0 else 0,
             'page': page,
             'per_page': per_page
-        }
+        }, serializer
 
     # ==================== Technician Methods ====================
+    # Items counted in Technician.active_jobs; COMPLETED ones in completed_jobs, CANCELLED in neither.
+    # completed_jobs is a running history: it predates item links and survives item deletion
+    ACTIVE_JOB_STATUSES = (MaintenanceStatus.SCHEDULED, MaintenanceStatus.DUE_SOON,
+                           MaintenanceStatus.OVERDUE, MaintenanceStatus.IN_PROGRESS)
+    # Items per assignment UPDATE (two CASE maps and an IN list of bound parameters each)
+    ASSIGNMENT_UPDATE_BATCH_SIZE = 200
+    
+    @staticmethod
+    def _resolve_technician(data):
+        """
+        (technician_id, assigned_technician) for item `data`: technician_id wins and
+        supplies the name; a bare name is linked when exactly one technician has it.
+        """
+        if data.get('technician_id'):
+            technician = db.session.get(Technician, data['technician_id'])
+            if technician is None:
+                raise ValidationError({'technician_id': [f"Unknown technician {data['technician_id']}"]})
+            return technician.id, technician.name
+        
+        name = data.get('assigned_technician')
+        if 'technician_id' in data or not name:
+            return None, name
+        matches = [technician_id for (technician_id,) in
+                   db.session.query(Technician.id).filter(Technician.name == name).limit(2)]
+        return (matches[0] if len(matches) == 1 else None), name
+    
+    @staticmethod
+    def _job_counts(status):
+        """(active_jobs, completed_jobs) an item in `status` contributes to its technician"""
+        if status is None:
+            return 0, 0
+        status = MaintenanceStatus(status)
+        if status == MaintenanceStatus.COMPLETED:
+            return 0, 1
+        return (1, 0) if status in MaintenanceService.ACTIVE_JOB_STATUSES else (0, 0)
+    
+    @staticmethod
+    def _adjust_technician_counters(before, after):
+        """
+        Move an item's contribution to the technician counters from `before` to `after`
+        ((technician_id, status) pairs) with relative UPDATEs in the caller's transaction
+        """
+        deltas = {}
+        for (technician_id, status), sign in ((before, -1), (after, 1)):
+            if technician_id is None:
+                continue
+            active, completed = MaintenanceService._job_counts(status)
+            delta = deltas.setdefault(technician_id, [0, 0])
+            delta[0] += sign * active
+            delta[1] += sign * completed
+        
+        for technician_id, (active, completed) in deltas.items():
+            if not active and not completed:
+                continue
+            db.session.execute(
+                update(Technician).where(Technician.id == technician_id).values(
+                    active_jobs=db.func.coalesce(Technician.active_jobs, 0) + active,
+                    completed_jobs=db.func.coalesce(Technician.completed_jobs, 0) + completed,
+                    updated_at=datetime.utcnow()
+                ).execution_options(synchronize_session='fetch')
+            )
+    
+    @staticmethod
+    def reconcile_technician_counters():
+        """
+        Background job: recount every technician's active jobs from their items and correct
+        any drift. completed_jobs is history (items may be deleted or predate the link), so
+        it is left alone. Counters and counts are read in one statement and fixed with
+        relative updates, so transactions committing meanwhile are not overwritten.
+        """
+        counts = db.session.query(
+            MaintenanceItem.technician_id.label('technician_id'),
+            db.func.count().label('active')
+        ).filter(
+            MaintenanceItem.technician_id.isnot(None),
+            MaintenanceItem.status.in_(MaintenanceService.ACTIVE_JOB_STATUSES)
+        ).group_by(MaintenanceItem.technician_id).subquery()
+        
+        rows = db.session.query(
+            Technician.id, Technician.active_jobs, db.func.coalesce(counts.c.active, 0)
+        ).outerjoin(counts, counts.c.technician_id == Technician.id).all()
+        
+        corrections = [
+            {'id': technician_id, 'active_delta': active - (active_jobs or 0)}
+            for technician_id, active_jobs, active in rows
+            if active_jobs != active
+        ]
+        if corrections:
+            db.session.execute(
+                update(Technician).values(
+                    active_jobs=db.func.coalesce(Technician.active_jobs, 0) + bindparam('active_delta')
+                ),
+                corrections
+            )
+        db.session.commit()
+        
+        return {
+            'technicians': len(rows),
+            'corrected': len(corrections),
+            'active_drift': sum(abs(correction['active_delta']) for correction in corrections),
+        }
+    
     @staticmethod
     def get_all_technicians():
         """Get all technicians"""
@@ -473,6 +783,7 @@ class MaintenanceService:
         if not tech:
             return None
         
+        renamed = 'name' in data and data['name'] != tech.name
         for key, value in data.items():
             if hasattr(tech, key):
                 if key == 'status':
@@ -480,6 +791,11 @@ class MaintenanceService:
                 else:
                     setattr(tech, key, value)
         
+        if renamed:
+            # Keep the denormalized display name (and the search index) in step
+            for item in MaintenanceItem.query.filter_by(technician_id=tech.id):
+                item.assigned_technician = tech.name
+        
         tech.updated_at = datetime.utcnow()
         db.session.commit()
         return tech
@@ -490,10 +806,112 @@ class MaintenanceService:
         tech = Technician.query.get(tech_id)
         if not tech:
             return False
+        # Items keep the name as history; SQLite does not enforce ON DELETE SET NULL
+        MaintenanceItem.query.filter_by(technician_id=tech.id).update(
+            {'technician_id': None}, synchronize_session=False
+        )
         db.session.delete(tech)
         db.session.commit()
         return True
 
+    @staticmethod
+    def assign_technicians(item_ids=None, limit=2000, max_active_jobs=10, require_skill=False, dry_run=False):
+        """
+        Assign open, unassigned items (all of them, or `item_ids`) to available technicians,
+        at most `limit` items per call, keeping every technician under `max_active_jobs`.
+        With `dry_run` the plan is returned without being saved.
+        """
+        query = db.session.query(
+            MaintenanceItem.id, MaintenanceItem.vehicle_id, MaintenanceItem.type, MaintenanceItem.description,
+            MaintenanceItem.assigned_to, MaintenanceItem.priority, MaintenanceItem.due_date,
+            MaintenanceItem.projected_due_date
+        ).filter(
+            # Spelled exactly like the ix_maintenance_items_unassigned predicate so SQLite can use the index too
+            db.literal_column("maintenance_items.status IN ('scheduled', 'due_soon', 'overdue')"),
+            db.literal_column('maintenance_items.assigned_technician IS NULL')
+        )
+        if item_ids:
+            query = query.filter(MaintenanceItem.id.in_(item_ids))
+        query = query.order_by(MaintenanceItem.projected_due_date).limit(limit)
+        if not dry_run and db.session.get_bind().dialect.name == 'postgresql':
+            # Concurrent callers plan disjoint batches
+            query = query.with_for_update(skip_locked=True)
+        items = query.all()
+        
+        # Who is available (and their skills) may have been changed by another worker
+        available = db.session.query(Technician.id, Technician.active_jobs, Technician.updated_at).filter(
+            Technician.status == TechnicianStatus.AVAILABLE
+        ).all()
+        engine = get_assignment_engine()
+        engine.sync({row.id: row.updated_at for row in available})
+        assignments, unassigned = engine.plan(
+            items, {row.id: row.active_jobs or 0 for row in available}, max_active_jobs, require_skill
+        )
+        
+        skipped = []
+        if not dry_run and assignments:
+            now = datetime.utcnow()
+            # The guards never overwrite a concurrent assignment nor give work to a technician
+            # who stopped being available meanwhile; RETURNING tells which items passed, and
+            # only those are counted and reported
+            applied = set()
+            for start in range(0, len(assignments), MaintenanceService.ASSIGNMENT_UPDATE_BATCH_SIZE):
+                technicians = {item_id: technician for item_id, technician, _ in
+                               assignments[start:start + MaintenanceService.ASSIGNMENT_UPDATE_BATCH_SIZE]}
+                technician_id = db.case({item_id: technician.id for item_id, technician in technicians.items()},
+                                        value=MaintenanceItem.id)
+                applied.update(db.session.execute(
+                    update(MaintenanceItem)
+                    .where(
+                        MaintenanceItem.id.in_(list(technicians)),
+                        MaintenanceItem.assigned_technician.is_(None),
+                        select(Technician.id).where(
+                            Technician.id == technician_id, Technician.status == TechnicianStatus.AVAILABLE
+                        ).exists()
+                    )
+                    .values(
+                        assigned_technician=db.case({item_id: technician.name for item_id, technician in technicians.items()},
+                                                    value=MaintenanceItem.id),
+                        technician_id=technician_id,
+                        updated_at=now
+                    )
+                    .returning(MaintenanceItem.id)
+                    .execution_options(synchronize_session=False)
+                ).scalars())
+            skipped = [item_id for item_id, _, _ in assignments if item_id not in applied]
+            assignments = [assignment for assignment in assignments if assignment[0] in applied]
+            
+            jobs = {}
+            for _, technician, _ in assignments:
+                jobs[technician.id] = jobs.get(technician.id, 0) + 1
+            if jobs:
+                db.session.execute(
+                    update(Technician).values(active_jobs=Technician.active_jobs + bindparam('jobs'), updated_at=now),
+                    [{'id': technician_id, 'jobs': count} for technician_id, count in jobs.items()]
+                )
+            # assigned_technician is searchable; bulk updates bypass the index's flush hook
+            names = {item_id: technician.name for item_id, technician, _ in assignments}
+            get_search_engine().track_rows(db.session, [
+                dict(item._asdict(), assigned_technician=names[item.id]) for item in items if item.id in names
+            ])
+            db.session.commit()
+        else:
+            db.session.rollback()
+        
+        return {
+            'assigned': len(assignments),
+            'unassigned': len(unassigned),
+            'skipped': len(skipped),
+            'dry_run': dry_run,
+            'assignments': [
+                {'item_id': item_id, 'technician_id': technician.id, 'technician_name': technician.name,
+                 'skill_match': round(match, 2)}
+                for item_id, technician, match in assignments
+            ],
+            'unassigned_items': unassigned,
+            'skipped_items': skipped,
+        }
+    
     # ==================== Part Methods ====================
     @staticmethod
     def get_all_parts(search_query=None):
@@ -527,28 +945,87 @@ class MaintenanceService:
             last_restocked=date.today() if data.get('quantity', 0) > 0 else None
         )
         db.session.add(part)
+        if part.quantity:
+            # Opening balance, so the stock ledger sums to the quantity
+            db.session.add(PartMovement(part_id=part.id, delta=part.quantity, reason=inventory.RESTOCK,
+                                        quantity_after=part.quantity))
         db.session.commit()
         return part
 
     @staticmethod
     def update_part(part_id, data):
-        """Update a part"""
-        part = Part.query.get(part_id)
+        """Update a part (a new quantity is a stock count: set atomically and ledgered)"""
+        part = db.session.get(Part, part_id)
         if not part:
             return None
-        
-        # Check if restocking happened
-        if 'quantity' in data and data['quantity'] > part.quantity:
-            part.last_restocked = date.today()
 
         for key, value in data.items():
-            if hasattr(part, key):
+            if key not in ('quantity', 'reserved_quantity') and hasattr(part, key):
                 setattr(part, key, value)
         
         part.updated_at = datetime.utcnow()
+        if data.get('quantity') is not None:
+            inventory.set_stock(part_id, data['quantity'])
         db.session.commit()
         return part
 
+    @staticmethod
+    def adjust_part_stock(part_id, data):
+        """Add (restock) or take out units of a part relative to the current stock"""
+        quantity = inventory.adjust_stock(part_id, data['delta'], data.get('reason', inventory.RESTOCK), data.get('item_id'))
+        if quantity is None:
+            return None
+        db.session.commit()
+        return db.session.get(Part, part_id)
+
+    @staticmethod
+    def get_part_movements(part_id, limit=50):
+        """Most recent stock ledger entries of a part, or None if it does not exist"""
+        if db.session.get(Part, part_id) is None:
+            return None
+        return [movement.to_dict() for movement in inventory.get_movements(part_id, limit)]
+
+    @staticmethod
+    def _update_part_reservations(item, previous_status, parts_changed, strict=False):
+        """
+        Reserve parts while an item is open, consume them on completion, release them on cancellation.
+        Parts stock cannot cover are recorded short; `strict` raises InsufficientStock instead.
+        """
+        open_statuses = MaintenanceService.ACTIVE_JOB_STATUSES
+        if item.status == MaintenanceStatus.COMPLETED:
+            if previous_status != MaintenanceStatus.COMPLETED:
+                inventory.sync(item.id, item.parts_needed, strict)
+                inventory.consume(item.id)
+        elif item.status == MaintenanceStatus.CANCELLED:
+            if previous_status != MaintenanceStatus.CANCELLED:
+                inventory.release(item.id)
+        elif parts_changed or previous_status not in open_statuses:
+            inventory.sync(item.id, item.parts_needed, strict)
+
+    @staticmethod
+    def get_item_reservations(item_id):
+        """Parts reserved / consumed / released for a maintenance item, or None if it does not exist"""
+        if db.session.get(MaintenanceItem, item_id) is None:
+            return None
+        return [reservation.to_dict() for reservation in inventory.get_reservations(item_id)]
+
+    @staticmethod
+    def get_item_shortages(item_id):
+        """{part_id: quantity} an item needs but stock could not cover"""
+        return inventory.short_parts(item_id)
+
+    @staticmethod
+    def reserve_item_parts(item_id, strict_stock=False):
+        """Re-sync an open item's reservations with its parts_needed (e.g. after a restock)"""
+        item = db.session.get(MaintenanceItem, item_id, with_for_update=True)
+        if not item:
+            return None
+        if item.status not in MaintenanceService.ACTIVE_JOB_STATUSES:
+            raise ValidationError({'status': [f'Only open items hold parts (item is {item.status.value})']})
+        inventory.sync(item.id, item.parts_needed, strict_stock)
+        db.session.commit()
+        return MaintenanceService.get_item_reservations(item_id)
+
     @staticmethod
     def delete_part(part_id):
         """Delete a part"""
@@ -559,6 +1036,31 @@ class MaintenanceService:
         db.session.commit()
         return True
 
+    # ==================== Vehicle Mileage Methods ====================
+    @staticmethod
+    def record_odometer_readings(readings):
+        """Store odometer readings and re-project the affected vehicles' items and schedules"""
+        mileage = vehicle_mileage.record_readings(readings)
+        result = {vehicle_id: row.to_dict() for vehicle_id, row in mileage.items()}
+        db.session.commit()
+        return result
+
+    @staticmethod
+    def get_vehicle_mileage(vehicle_id, readings_limit=30):
+        """Get a vehicle's odometer, fitted daily rate and most recent readings"""
+        mileage = vehicle_mileage.get_vehicle_mileage(vehicle_id)
+        if mileage is None:
+            return None
+        readings = OdometerReading.query.filter_by(vehicle_id=vehicle_id).order_by(
+            OdometerReading.reading_date.desc()
+        ).limit(readings_limit).all()
+        return dict(mileage.to_dict(), readings=[reading.to_dict() for reading in readings])
+
+    @staticmethod
+    def refresh_mileage_projections(batch_size=500, history_days=365):
+        """Background job: refit every vehicle's rate and prune old odometer readings"""
+        return vehicle_mileage.refresh_all(batch_size or 500, history_days)
+
     # ==================== Recurring Schedule Methods ====================
     @staticmethod
     def get_all_recurring_schedules():
@@ -569,33 +1071,17 @@ class MaintenanceService:
     @staticmethod
     def create_recurring_schedule(data):
         """Create a new recurring schedule"""
-        # Calculate next scheduled date
-        now = datetime.utcnow()
-        freq_type = data['frequency']
-        freq_val = data['frequency_value']
-        next_date = now
-        
-        if freq_type == 'daily':
-            next_date = now + timedelta(days=freq_val)
-        elif freq_type == 'weekly':
-            next_date = now + timedelta(weeks=freq_val)
-        elif freq_type == 'monthly':
-            # Simplified monthly addition
-            next_month = now.month + freq_val
-            year_add = (next_month - 1) // 12
-            new_month = ((next_month - 1) % 12) + 1
-            next_date = now.replace(year=now.year + year_add, month=new_month)
-        elif freq_type == 'quarterly':
-             # Simplified quarterly addition
-            next_month = now.month + (freq_val * 3)
-            year_add = (next_month - 1) // 12
-            new_month = ((next_month - 1) % 12) + 1
-            next_date = now.replace(year=now.year + year_add, month=new_month)
-        elif freq_type == 'yearly':
-            next_date = now.replace(year=now.year + freq_val)
-        elif freq_type == 'mileage-based':
-            # Default to 30 days for mileage based initial schedule estimate
-            next_date = now + timedelta(days=30)
+        # First occurrence one interval from now (month ends are clamped, e.g. Jan 31 -> Feb 28)
+        next_date = next_occurrence(datetime.utcnow(), data['frequency'], data['frequency_value'])
+        next_due_mileage = None
+        if data['frequency'] == FrequencyType.MILEAGE_BASED.value:
+            # Due frequency_value km from the vehicle's odometer; dated by its fitted rate when known
+            mileage = vehicle_mileage.get_vehicle_mileage(data['vehicle_id'])
+            if mileage is not None:
+                next_due_mileage = mileage.odometer + data['frequency_value']
+                projected = vehicle_mileage.project_date(mileage, next_due_mileage)
+                if projected is not None:
+                    next_date = datetime.combine(projected, datetime.min.time())
 
         schedule = RecurringSchedule(
             id=MaintenanceService.generate_id('RS', RecurringSchedule),
@@ -609,12 +1095,21 @@ class MaintenanceService:
             estimated_duration=data.get('estimated_duration', 0.0),
             assigned_to=data.get('assigned_to'),
             is_active=data.get('is_active', True),
-            next_scheduled=next_date
+            next_scheduled=next_date,
+            next_due_mileage=next_due_mileage
         )
         db.session.add(schedule)
         db.session.commit()
         return schedule
 
+    @staticmethod
+    def materialize_recurring_schedules(batch_size=500, lead_days=0, max_catchup=0):
+        """
+        Background job generating maintenance items for every due active recurring schedule.
+        Processes `batch_size` schedules per transaction; see app.services.recurring.
+        """
+        return materialize_due_schedules(batch_size=batch_size or 500, lead_days=lead_days, max_catchup=max_catchup)
+
     @staticmethod
     def update_recurring_schedule(schedule_id, data):
         """Update a recurring schedule"""
@@ -0,0 +1,248 @@
+"""
+Vehicle Mileage Projection
+Keeps a compact odometer time series per vehicle (one reading per day), fits a
+daily-distance rate to the recent readings and turns mileage targets into dates:
+
+- MaintenanceItem.projected_due_date = min(due_date, date due_mileage is reached)
+- mileage-based RecurringSchedule.next_scheduled = date next_due_mileage is reached
+
+Recording readings refreshes the vehicle's rate, the current_mileage snapshot,
+projection and status of its open items, and its mileage-based schedules in the same
+transaction, so the status job and /upcoming only compare an indexed date.
+"""
+
+import logging
+import math
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import insert, update
+
+from app import db
+from app.models.maintainance import (
+    FrequencyType, MaintenanceItem, MaintenanceStatus, OdometerReading, RecurringSchedule, VehicleMileage
+)
+
+logger = logging.getLogger(__name__)
+
+# Ordered by urgency; reprojection only ever escalates, like the status job
+OPEN_STATUSES = (MaintenanceStatus.SCHEDULED, MaintenanceStatus.DUE_SOON, MaintenanceStatus.OVERDUE)
+
+# Projections further out than this are treated as "not within planning range"
+MAX_PROJECTION_DAYS = 3650
+
+
+def fit_daily_rate(points, min_span_days=1):
+    """
+    Least-squares km/day slope through (date, odometer) points.
+    None when fewer than two readings or they span less than `min_span_days`.
+    """
+    if len(points) < 2:
+        return None
+    origin = points[0][0]
+    xs = [(day - origin).days for day, _ in points]
+    if max(xs) - min(xs) < min_span_days:
+        return None
+
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(odometer for _, odometer in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    covariance = sum((x - mean_x) * (odometer - mean_y) for x, (_, odometer) in zip(xs, points))
+    return max(covariance / variance, 0.0)
+
+
+def project_date(mileage, target):
+    """Date `mileage` (a VehicleMileage) reaches odometer `target`, or None if unknown/out of range"""
+    if mileage is None or target is None:
+        return None
+    remaining = target - mileage.odometer
+    if remaining <= 0:
+        return mileage.odometer_date
+    if not mileage.daily_rate:
+        return None
+    days = math.ceil(remaining / mileage.daily_rate)
+    if days > MAX_PROJECTION_DAYS:
+        return None
+    return mileage.odometer_date + timedelta(days=days)
+
+
+def projected_due_date(due_date, due_mileage, mileage):
+    """Expected due date of an item: its calendar due date, or earlier if mileage gets there first"""
+    projected = project_date(mileage, due_mileage)
+    if projected is None or due_date is None:
+        return due_date or projected
+    return min(due_date, projected)
+
+
+def _fit_settings():
+    """(window_days, min_span_days) for rate fitting"""
+    config = current_app.config
+    return config.get('MILEAGE_RATE_WINDOW_DAYS', 90), config.get('MILEAGE_MIN_SPAN_DAYS', 1)
+
+
+def get_vehicle_mileage(vehicle_id):
+    return db.session.get(VehicleMileage, vehicle_id)
+
+
+def record_readings(readings):
+    """
+    Store odometer readings ({vehicle_id, odometer, recorded_at?}) and refresh the affected
+    vehicles. Readings on the same day collapse into one row holding the highest value.
+    Returns the refreshed {vehicle_id: VehicleMileage}; the caller commits.
+    """
+    latest = {}
+    for reading in readings:
+        recorded_at = reading.get('recorded_at') or datetime.utcnow()
+        key = (reading['vehicle_id'], recorded_at.date())
+        if key not in latest or reading['odometer'] > latest[key][0]:
+            latest[key] = (reading['odometer'], recorded_at)
+    if not latest:
+        return {}
+
+    vehicle_ids = {vehicle_id for vehicle_id, _ in latest}
+    existing = {
+        (row.vehicle_id, row.reading_date): row
+        for row in db.session.query(OdometerReading.id, OdometerReading.vehicle_id,
+                                    OdometerReading.reading_date, OdometerReading.odometer).filter(
+            OdometerReading.vehicle_id.in_(vehicle_ids),
+            OdometerReading.reading_date.in_({day for _, day in latest})
+        )
+    }
+
+    inserts, updates = [], []
+    for (vehicle_id, day), (odometer, recorded_at) in latest.items():
+        row = existing.get((vehicle_id, day))
+        if row is None:
+            inserts.append({'vehicle_id': vehicle_id, 'reading_date': day,
+                            'odometer': odometer, 'recorded_at': recorded_at})
+        elif odometer > row.odometer:
+            updates.append({'id': row.id, 'odometer': odometer, 'recorded_at': recorded_at})
+
+    if inserts:
+        db.session.execute(insert(OdometerReading), inserts)
+    if updates:
+        db.session.execute(update(OdometerReading), updates)
+
+    return refresh_vehicles(vehicle_ids)
+
+
+def refresh_vehicles(vehicle_ids):
+    """Refit the rate of `vehicle_ids` and re-project their open items and mileage-based schedules"""
+    vehicle_ids = list(vehicle_ids)
+    if not vehicle_ids:
+        return {}
+    window_days, min_span_days = _fit_settings()
+
+    # Latest reading per vehicle, then the readings inside each vehicle's fitting window
+    last_dates = dict(db.session.query(
+        OdometerReading.vehicle_id, db.func.max(OdometerReading.reading_date)
+    ).filter(OdometerReading.vehicle_id.in_(vehicle_ids)).group_by(OdometerReading.vehicle_id))
+    if not last_dates:
+        return {}
+
+    cutoff = min(last_dates.values()) - timedelta(days=window_days)
+    series = {}
+    for vehicle_id, day, odometer in db.session.query(
+        OdometerReading.vehicle_id, OdometerReading.reading_date, OdometerReading.odometer
+    ).filter(
+        OdometerReading.vehicle_id.in_(list(last_dates)),
+        OdometerReading.reading_date >= cutoff
+    ).order_by(OdometerReading.vehicle_id, OdometerReading.reading_date):
+        if day >= last_dates[vehicle_id] - timedelta(days=window_days):
+            series.setdefault(vehicle_id, []).append((day, odometer))
+
+    stored = {row.vehicle_id: row for row in VehicleMileage.query.filter(VehicleMileage.vehicle_id.in_(list(series)))}
+    mileage = {}
+    for vehicle_id, points in series.items():
+        # Odometers never run backwards; a lower later value is a typo, not a reset
+        odometer_date, odometer = max(points, key=lambda point: (point[1], point[0]))
+        values = dict(
+            odometer=odometer,
+            odometer_date=odometer_date,
+            daily_rate=fit_daily_rate(points, min_span_days),
+            sample_count=len(points),
+        )
+        row = stored.get(vehicle_id)
+        if row is None:
+            row = VehicleMileage(vehicle_id=vehicle_id, **values)
+            db.session.add(row)
+        else:
+            for key, value in values.items():
+                setattr(row, key, value)
+        mileage[vehicle_id] = row
+
+    _reproject_items(mileage)
+    _reproject_schedules(mileage)
+    return mileage
+
+
+def _reproject_items(mileage):
+    """Bring open items' current_mileage, projected_due_date and status up to date (changed rows only)"""
+    from app.services.maintainance_service import MaintenanceService
+
+    rows = db.session.query(
+        MaintenanceItem.id, MaintenanceItem.vehicle_id, MaintenanceItem.status, MaintenanceItem.due_date,
+        MaintenanceItem.due_mileage, MaintenanceItem.current_mileage, MaintenanceItem.projected_due_date
+    ).filter(
+        MaintenanceItem.vehicle_id.in_(list(mileage)),
+        MaintenanceItem.status.in_(OPEN_STATUSES)
+    )
+
+    now = datetime.utcnow()
+    changes = []
+    for row in rows:
+        vehicle = mileage[row.vehicle_id]
+        current_mileage = max(row.current_mileage, vehicle.odometer)
+        projected = projected_due_date(row.due_date, row.due_mileage, vehicle)
+        status = max(row.status, MaintenanceService._determine_status(row.due_date, current_mileage, row.due_mileage, projected),
+                     key=OPEN_STATUSES.index)
+        if current_mileage != row.current_mileage or projected != row.projected_due_date or status != row.status:
+            changes.append({'id': row.id, 'current_mileage': current_mileage, 'projected_due_date': projected,
+                            'status': status, 'updated_at': now})
+
+    if changes:
+        db.session.execute(update(MaintenanceItem), changes)
+    return len(changes)
+
+
+def _reproject_schedules(mileage):
+    """Move mileage-based schedules' next_scheduled to when next_due_mileage will be reached"""
+    schedules = RecurringSchedule.query.filter(
+        RecurringSchedule.vehicle_id.in_(list(mileage)),
+        RecurringSchedule.frequency == FrequencyType.MILEAGE_BASED
+    )
+    for schedule in schedules:
+        if schedule.next_due_mileage is None:
+            # Created before the vehicle had readings: count the interval from the first known odometer
+            schedule.next_due_mileage = mileage[schedule.vehicle_id].odometer + schedule.frequency_value
+        projected = project_date(mileage[schedule.vehicle_id], schedule.next_due_mileage)
+        if projected is not None:
+            schedule.next_scheduled = datetime.combine(projected, datetime.min.time())
+
+
+def refresh_all(batch_size=500, history_days=365):
+    """
+    Refit every vehicle with readings, `batch_size` vehicles per transaction, and prune
+    readings older than `history_days`. Returns run totals.
+    """
+    pruned = 0
+    if history_days:
+        pruned = OdometerReading.query.filter(
+            OdometerReading.reading_date < date.today() - timedelta(days=history_days)
+        ).delete(synchronize_session=False)
+        db.session.commit()
+
+    refreshed = 0
+    last_id = None
+    while True:
+        query = db.session.query(OdometerReading.vehicle_id).distinct()
+        if last_id is not None:
+            query = query.filter(OdometerReading.vehicle_id > last_id)
+        vehicle_ids = [vehicle_id for (vehicle_id,) in query.order_by(OdometerReading.vehicle_id).limit(batch_size)]
+        if not vehicle_ids:
+            break
+        refreshed += len(refresh_vehicles(vehicle_ids))
+        db.session.commit()
+        last_id = vehicle_ids[-1]
+
+    return {'vehicles': refreshed, 'readings_pruned': pruned}
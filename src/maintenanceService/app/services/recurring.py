@@ -0,0 +1,235 @@
+"""
+Recurring Schedule Materialization
+Turns due RecurringSchedules into MaintenanceItems. Each run selects active
+schedules whose `next_scheduled` falls within the lead window (partial index
+ix_recurring_schedules_active_next), expands every occurrence up to that horizon
+with calendar arithmetic (mileage-based schedules: the vehicle's projected mileage,
+see app.services.mileage), bulk-inserts the items and advances the schedules, one
+transaction per batch.
+
+Runs are idempotent: an occurrence is identified by (schedule_id, due_date), which
+is checked before inserting and enforced by a unique index, and the schedule is
+advanced in the same transaction as its items. On PostgreSQL due schedules are
+claimed with FOR UPDATE SKIP LOCKED, so concurrent runners split the work.
+"""
+
+import calendar
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from app import db
+from app.models.maintainance import (
+    FrequencyType, MaintenanceItem, MaintenancePriority, RecurringSchedule, VehicleMileage
+)
+from app.services.mileage import project_date, projected_due_date
+
+logger = logging.getLogger(__name__)
+
+# Mileage-based schedules of vehicles without a fitted rate fall back to this interval
+MILEAGE_ESTIMATE_DAYS = 30
+
+# Time-based occurrences are also due after this distance, whichever comes first
+SCHEDULED_ITEM_MILEAGE_ALLOWANCE = 10000
+
+
+def add_months(value, months, day=None):
+    """`value` moved by `months` calendar months, keeping `day` (default: value's day) clamped to the month length"""
+    month_index = value.month - 1 + months
+    year = value.year + month_index // 12
+    month = month_index % 12 + 1
+    return value.replace(year=year, month=month, day=min(day or value.day, calendar.monthrange(year, month)[1]))
+
+
+def next_occurrence(value, frequency, frequency_value=1, anchor_day=None):
+    """
+    The occurrence `frequency_value` intervals after `value`.
+    Month-based frequencies land on `anchor_day` (the day the series started on) when
+    the month has it, so Jan 31 -> Feb 28 -> Mar 31 instead of drifting to the 28th.
+    """
+    frequency = FrequencyType(frequency)
+    step = max(int(frequency_value or 1), 1)
+
+    if frequency == FrequencyType.DAILY:
+        return value + timedelta(days=step)
+    if frequency == FrequencyType.WEEKLY:
+        return value + timedelta(weeks=step)
+    if frequency == FrequencyType.MONTHLY:
+        return add_months(value, step, anchor_day)
+    if frequency == FrequencyType.QUARTERLY:
+        return add_months(value, 3 * step, anchor_day)
+    if frequency == FrequencyType.YEARLY:
+        return add_months(value, 12 * step, anchor_day)
+    return value + timedelta(days=MILEAGE_ESTIMATE_DAYS)
+
+
+def anchor_day(schedule):
+    """
+    Day of month a schedule's series is pinned to. `next_scheduled` carries it unless
+    it was clamped to a month end, in which case the creation day recovers it.
+    """
+    current = schedule.next_scheduled
+    day = current.day
+    if day == calendar.monthrange(current.year, current.month)[1] and schedule.created_at is not None:
+        day = max(day, schedule.created_at.day)
+    return day
+
+
+def occurrences_until(schedule, horizon, mileage=None):
+    """
+    (occurrences, following) for `schedule` up to and including `horizon`: each occurrence and
+    the following one are (datetime, due_mileage) pairs; due_mileage is None for time-based schedules.
+    Mileage-based schedules are dated by the vehicle's projected mileage (`mileage`, a VehicleMileage).
+    """
+    if FrequencyType(schedule.frequency) == FrequencyType.MILEAGE_BASED:
+        return _mileage_occurrences_until(schedule, horizon, mileage)
+
+    occurrences = []
+    current = schedule.next_scheduled
+    day = anchor_day(schedule)
+    while current <= horizon:
+        occurrences.append((current, None))
+        current = next_occurrence(current, schedule.frequency, schedule.frequency_value, day)
+    return occurrences, (current, schedule.next_due_mileage)
+
+
+def _mileage_occurrences_until(schedule, horizon, mileage):
+    occurrences = []
+    current, due_mileage = schedule.next_scheduled, schedule.next_due_mileage
+    step = max(int(schedule.frequency_value or 1), 1)
+    while current <= horizon:
+        occurrences.append((current, due_mileage))
+        estimate = current + timedelta(days=MILEAGE_ESTIMATE_DAYS)
+        if due_mileage is None:
+            current = estimate
+            continue
+        due_mileage += step
+        projected = project_date(mileage, due_mileage)
+        # At most one occurrence per day, so (schedule_id, due_date) stays unique
+        current = max(datetime.combine(projected, current.time()), current + timedelta(days=1)) if projected else estimate
+    return occurrences, (current, due_mileage)
+
+
+def _due_schedules(horizon, batch_size):
+    query = RecurringSchedule.query.filter(
+        # Spelled exactly like the partial index predicate so SQLite can use the index too
+        db.literal_column('recurring_schedules.is_active'),
+        RecurringSchedule.next_scheduled <= horizon
+    ).order_by(RecurringSchedule.next_scheduled).limit(batch_size)
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        query = query.with_for_update(skip_locked=True)
+    return query.all()
+
+
+def _latest_mileage(vehicle_ids):
+    """vehicle_id -> highest recorded current_mileage among its maintenance items (no odometer readings)"""
+    if not vehicle_ids:
+        return {}
+    rows = db.session.query(
+        MaintenanceItem.vehicle_id, db.func.max(MaintenanceItem.current_mileage)
+    ).filter(MaintenanceItem.vehicle_id.in_(vehicle_ids)).group_by(MaintenanceItem.vehicle_id)
+    return {vehicle_id: mileage or 0 for vehicle_id, mileage in rows}
+
+
+def _existing_occurrences(schedule_ids, since):
+    rows = db.session.query(MaintenanceItem.schedule_id, MaintenanceItem.due_date).filter(
+        MaintenanceItem.schedule_id.in_(schedule_ids),
+        MaintenanceItem.due_date >= since
+    )
+    return set(rows)
+
+
+def materialize_batch(schedules, now, horizon, max_catchup):
+    """Insert the items for one batch of due schedules and advance them; returns (created, skipped)"""
+    from app.services.maintainance_service import MaintenanceService
+    from app.services.search import get_search_engine
+
+    vehicle_ids = {schedule.vehicle_id for schedule in schedules}
+    vehicles = {row.vehicle_id: row for row in VehicleMileage.query.filter(VehicleMileage.vehicle_id.in_(vehicle_ids))}
+    item_mileage = _latest_mileage(vehicle_ids - set(vehicles))
+
+    plans = []
+    skipped = 0
+    for schedule in schedules:
+        occurrences, following = occurrences_until(schedule, horizon, vehicles.get(schedule.vehicle_id))
+        if max_catchup and len(occurrences) > max_catchup:
+            # Long downtime: only the most recent occurrences are still actionable
+            skipped += len(occurrences) - max_catchup
+            occurrences = occurrences[-max_catchup:]
+        plans.append((schedule, occurrences, following))
+
+    earliest = min((occurrence.date() for _, occurrences, _ in plans for occurrence, _ in occurrences),
+                   default=horizon.date())
+    existing = _existing_occurrences([schedule.id for schedule in schedules], earliest)
+
+    rows = []
+    for schedule, occurrences, (following, following_mileage) in plans:
+        vehicle = vehicles.get(schedule.vehicle_id)
+        current_mileage = vehicle.odometer if vehicle else item_mileage.get(schedule.vehicle_id, 0)
+        created = 0
+        for occurrence, occurrence_mileage in occurrences:
+            due_date = occurrence.date()
+            if (schedule.id, due_date) in existing:
+                continue
+            existing.add((schedule.id, due_date))
+            due_mileage = occurrence_mileage or current_mileage + SCHEDULED_ITEM_MILEAGE_ALLOWANCE
+            projected = projected_due_date(due_date, due_mileage, vehicle)
+            rows.append({
+                'vehicle_id': schedule.vehicle_id,
+                'type': schedule.maintenance_type,
+                'description': schedule.description or schedule.name,
+                'status': MaintenanceService._determine_status(due_date, current_mileage, due_mileage, projected),
+                'priority': MaintenancePriority.MEDIUM,
+                'due_date': due_date,
+                'projected_due_date': projected,
+                'scheduled_date': occurrence,
+                'current_mileage': current_mileage,
+                'due_mileage': due_mileage,
+                'estimated_cost': schedule.estimated_cost or 0.0,
+                'assigned_to': schedule.assigned_to,
+                'notes': f'Generated from recurring schedule {schedule.id} ({schedule.name})',
+                'schedule_id': schedule.id,
+            })
+            created += 1
+
+        schedule.next_scheduled = following
+        schedule.next_due_mileage = following_mileage
+        schedule.total_executions = (schedule.total_executions or 0) + created
+        if created:
+            schedule.last_executed = now
+
+    if rows:
+        # One allocator reservation for the whole batch
+        for row, item_id in zip(rows, MaintenanceService.generate_maintenance_ids(len(rows))):
+            row['id'] = item_id
+        db.session.execute(insert(MaintenanceItem), rows)
+        get_search_engine().track_rows(db.session, rows)
+    return len(rows), skipped
+
+
+def materialize_due_schedules(now=None, batch_size=500, lead_days=0, max_catchup=0):
+    """
+    Materialize every occurrence due up to `now + lead_days`, `batch_size` schedules per
+    transaction. `max_catchup` (0 = unlimited) caps the occurrences generated per schedule
+    after downtime; older ones are skipped. Returns run totals.
+    """
+    now = now or datetime.utcnow()
+    horizon = now + timedelta(days=lead_days)
+    totals = {'schedules': 0, 'items_created': 0, 'occurrences_skipped': 0, 'batches': 0}
+
+    while True:
+        schedules = _due_schedules(horizon, batch_size)
+        if not schedules:
+            break
+
+        created, skipped = materialize_batch(schedules, now, horizon, max_catchup)
+        db.session.commit()
+
+        totals['schedules'] += len(schedules)
+        totals['items_created'] += created
+        totals['occurrences_skipped'] += skipped
+        totals['batches'] += 1
+
+    return totals
@@ -0,0 +1,341 @@
+"""
+Maintenance Item Search
+Ranked, prefix-matching search over id, vehicle, type, technician, service
+center and description. Every word of the query must start a word of the item:
+unlike the old ILIKE scan, "oil" no longer matches inside "coils".
+
+- PostgreSQL: weighted `search_vector` tsvector column with a GIN index
+  (MaintenanceItem.search_vector), queried with to_tsquery prefix terms and ts_rank_cd.
+- SQLite / tests: a pure-Python inverted index built on first use and kept up
+  to date from committed ORM changes. It also orders and pages the results, so
+  the database is only asked for one page of ids at a time.
+- Anything else (or PostgreSQL before the migration ran): ILIKE scan.
+"""
+
+import bisect
+import heapq
+import logging
+import re
+import threading
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, or_
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models.maintainance import MaintenanceItem
+from app.utils.pagination import decode_cursor, encode_cursor, keyset_paginate
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# Ids per IN (...) when fetching a page from the in-memory index (SQLite allows 999 parameters)
+ID_BATCH_SIZE = 500
+
+SEARCH_VECTOR = MaintenanceItem.__table__.c.search_vector
+
+# Same weights as PostgreSQL's default ts_rank weights for A, B and C
+FIELD_WEIGHTS = {
+    'id': 1.0,
+    'vehicle_id': 1.0,
+    'type': 1.0,
+    'assigned_technician': 0.4,
+    'assigned_to': 0.4,
+    'description': 0.2,
+}
+
+
+def tokenize(value):
+    return TOKEN_PATTERN.findall(value.lower()) if value else []
+
+
+class InvertedIndex:
+    """token -> {item_id: weight} map with a sorted token list for prefix lookups"""
+
+    def __init__(self):
+        self.postings = {}
+        self.tokens = []
+        self.documents = {}  # item_id -> (tokens, due_date)
+        self.lock = threading.RLock()
+
+    def add(self, item_id, fields, due_date):
+        with self.lock:
+            self.remove(item_id)
+            weights = {}
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(fields.get(field)):
+                    weights[token] = max(weights.get(token, 0.0), weight)
+
+            for token, weight in weights.items():
+                if token not in self.postings:
+                    self.postings[token] = {}
+                    bisect.insort(self.tokens, token)
+                self.postings[token][item_id] = weight
+            self.documents[item_id] = (list(weights), due_date)
+
+    def remove(self, item_id):
+        with self.lock:
+            document = self.documents.pop(item_id, None)
+            if document is None:
+                return
+            for token in document[0]:
+                posting = self.postings.get(token)
+                if posting is None:
+                    continue
+                posting.pop(item_id, None)
+                if not posting:
+                    del self.postings[token]
+                    del self.tokens[bisect.bisect_left(self.tokens, token)]
+
+    def _prefix_scores(self, term):
+        """Best weight per item over all tokens starting with `term`"""
+        scores = {}
+        start = bisect.bisect_left(self.tokens, term)
+        for token in self.tokens[start:]:
+            if not token.startswith(term):
+                break
+            for item_id, weight in self.postings[token].items():
+                if weight > scores.get(item_id, 0.0):
+                    scores[item_id] = weight
+        return scores
+
+    def _matches(self, terms):
+        """{item_id: (score, due_date)} of the items matching every term as a prefix"""
+        with self.lock:
+            scores = None
+            for term in terms:
+                term_scores = self._prefix_scores(term)
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {item_id: score + term_scores[item_id]
+                              for item_id, score in scores.items() if item_id in term_scores}
+                if not scores:
+                    return {}
+
+            return {item_id: (score, self.documents[item_id][1]) for item_id, score in scores.items()}
+
+    def search(self, text):
+        """Ranked item ids matching every term of `text` as a prefix"""
+        terms = tokenize(text)
+        if not terms:
+            return []
+
+        matches = self._matches(terms)
+        # Best score first, then latest due date, then id (descending)
+        return sorted(matches, key=lambda item_id: (*matches[item_id], item_id), reverse=True)
+
+    def page_after(self, text, after, limit):
+        """
+        (ids, total): up to `limit` matching ids by due date then id, both descending,
+        that sort after the (due_date, id) key `after` (None for the first page)
+        """
+        terms = tokenize(text)
+        if not terms:
+            return [], 0
+
+        matches = self._matches(terms)
+        keys = ((due_date, item_id) for item_id, (_, due_date) in matches.items())
+        if after is not None:
+            after = tuple(after)
+            keys = (key for key in keys if key < after)
+        return [item_id for _, item_id in heapq.nlargest(limit, keys)], len(matches)
+
+
+class SearchEngine:
+    """Picks the best available backend for the bound database on first use"""
+
+    def __init__(self):
+        self.backend = None
+        self.index = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.extensions['search'] = self
+
+    def _resolve_backend(self):
+        if self.backend is not None:
+            return self.backend
+
+        with self._lock:
+            if self.backend is None:
+                dialect = db.engine.dialect.name
+                if dialect == 'postgresql':
+                    columns = {column['name'] for column in inspect(db.engine).get_columns('maintenance_items')}
+                    if 'search_vector' in columns:
+                        self.backend = 'fulltext'
+                    else:
+                        logger.warning("maintenance_items.search_vector missing (run 'flask db upgrade'); using ILIKE search")
+                        self.backend = 'like'
+                elif dialect == 'sqlite':
+                    self.backend = 'inverted_index'
+                else:
+                    self.backend = 'like'
+        return self.backend
+
+    def _ensure_index(self):
+        if self.index is not None:
+            return self.index
+
+        with self._lock:
+            if self.index is None:
+                index = InvertedIndex()
+                columns = [getattr(MaintenanceItem, field) for field in FIELD_WEIGHTS]
+                for row in db.session.query(*columns, MaintenanceItem.due_date).yield_per(1000):
+                    fields = dict(zip(FIELD_WEIGHTS, row))
+                    index.add(fields['id'], fields, row[-1])
+                self.index = index
+                logger.info(f"Built in-memory search index for {len(index.documents)} maintenance items")
+        return self.index
+
+    @staticmethod
+    def _tsquery(text):
+        terms = tokenize(text)
+        if not terms:
+            return None
+        return db.func.to_tsquery('simple', ' & '.join(f'{term}:*' for term in terms))
+
+    @staticmethod
+    def _rows_by_id(base, ids):
+        """Rows of `base` for `ids`, in that order, fetched ID_BATCH_SIZE ids at a time"""
+        rows = []
+        for start in range(0, len(ids), ID_BATCH_SIZE):
+            rows.extend(base.filter(MaintenanceItem.id.in_(ids[start:start + ID_BATCH_SIZE])).all())
+        position = {item_id: i for i, item_id in enumerate(ids)}
+        rows.sort(key=lambda row: position[row.id])
+        return rows
+
+    @staticmethod
+    def _like_filter(text):
+        pattern = f'%{text}%'
+        return or_(
+            MaintenanceItem.type.ilike(pattern),
+            MaintenanceItem.description.ilike(pattern),
+            MaintenanceItem.vehicle_id.ilike(pattern),
+            MaintenanceItem.id.ilike(pattern),
+            MaintenanceItem.assigned_to.ilike(pattern),
+            MaintenanceItem.assigned_technician.ilike(pattern)
+        )
+
+    def filter(self, text):
+        """
+        WHERE clause matching `text` (unranked). The in-memory index has no SQL form:
+        it pages itself in keyset_page(), and falls back to ILIKE here.
+        """
+        if not tokenize(text):
+            # An empty search lists everything, as the ILIKE version did
+            return db.true()
+
+        if self._resolve_backend() == 'fulltext':
+            return SEARCH_VECTOR.op('@@')(self._tsquery(text))
+        return self._like_filter(text)
+
+    def keyset_page(self, text, order_by, cursor, per_page, count='none', columns=None):
+        """
+        One keyset page of results (see keyset_paginate) in `order_by` - due date then
+        id, both descending. `columns` (which must include the order_by columns) as in ranked_page.
+        """
+        base = MaintenanceItem.query.with_entities(*columns) if columns else MaintenanceItem.query
+        if not tokenize(text) or self._resolve_backend() != 'inverted_index':
+            return keyset_paginate(base.filter(self.filter(text)), order_by, cursor, per_page, count)
+
+        per_page = max(per_page, 1)
+        after = decode_cursor(cursor, order_by) if cursor else None
+        page_ids, total = self._ensure_index().page_after(text, after, per_page + 1)
+        rows = self._rows_by_id(base, page_ids[:per_page])
+
+        return {
+            'items': rows,
+            'next_cursor': encode_cursor(rows[-1], order_by) if len(page_ids) > per_page and rows else None,
+            'total': total if count != 'none' else None,
+            'per_page': per_page
+        }
+
+    def ranked_page(self, text, page, per_page, columns=None):
+        """
+        Return (items, total) for one page of results, best match first.
+        With `columns` (which must include id) the items are Rows of those columns.
+        """
+        backend = self._resolve_backend() if tokenize(text) else 'like'
+        offset = (max(page, 1) - 1) * per_page
+        base = MaintenanceItem.query.with_entities(*columns) if columns else MaintenanceItem.query
+
+        if backend == 'inverted_index':
+            ranked_ids = self._ensure_index().search(text)
+            return self._rows_by_id(base, ranked_ids[offset:offset + per_page]), len(ranked_ids)
+
+        query = base.filter(self.filter(text))
+        total = query.order_by(None).count()
+
+        if backend == 'fulltext':
+            rank = db.func.ts_rank_cd(SEARCH_VECTOR, self._tsquery(text))
+            query = query.order_by(rank.desc(), MaintenanceItem.due_date.desc(), MaintenanceItem.id.desc())
+        else:
+            query = query.order_by(MaintenanceItem.due_date.desc(), MaintenanceItem.id.desc())
+
+        return query.offset(offset).limit(per_page).all(), total
+
+    # ---------- in-memory index maintenance ----------
+
+    def _pending(self, session):
+        return session.info.setdefault('search_index_changes', {})
+
+    def track_flush(self, session):
+        if self.index is None:
+            return
+        pending = self._pending(session)
+        for obj in list(session.new) + list(session.dirty):
+            if isinstance(obj, MaintenanceItem):
+                fields = {field: getattr(obj, field) for field in FIELD_WEIGHTS}
+                pending[obj.id] = (fields, obj.due_date)
+        for obj in session.deleted:
+            if isinstance(obj, MaintenanceItem):
+                pending[obj.id] = None
+
+    def track_rows(self, session, rows):
+        """Queue bulk-inserted item rows (dicts), which bypass the flush hooks"""
+        if self.index is None:
+            return
+        pending = self._pending(session)
+        for row in rows:
+            pending[row['id']] = ({field: row.get(field) for field in FIELD_WEIGHTS}, row['due_date'])
+
+    def apply_commit(self, session):
+        changes = session.info.pop('search_index_changes', None)
+        if not changes or self.index is None:
+            return
+        for item_id, document in changes.items():
+            if document is None:
+                self.index.remove(item_id)
+            else:
+                self.index.add(item_id, document[0], document[1])
+
+
+def get_search_engine():
+    return current_app.extensions['search']
+
+
+def _engine_for_events():
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('search')
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_search_changes(session, flush_context, instances):
+    engine = _engine_for_events()
+    if engine is not None:
+        engine.track_flush(session)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_search_changes(session):
+    engine = _engine_for_events()
+    if engine is not None:
+        engine.apply_commit(session)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_search_changes(session):
+    session.info.pop('search_index_changes', None)
@@ -1,28 +1,127 @@
-import os
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from functools import wraps
 from flask import request, current_app, g
 import jwt
-import requests
 from flask_restx import abort
+from app.utils.jwks import JWKSKeyStore
 
-def get_public_keys():
+class TokenCache:
     """
-    Fetch public keys from the OIDC issuer.
-    In production, cache this result.
+    Bounded LRU of already-verified tokens: sha256(token) -> claims, valid until the
+    token's `exp`. Cleared whenever the signing key set changes, so a token is never
+    trusted on the strength of a key that has been rotated out.
     """
-    issuer = current_app.config.get('OIDC_ISSUER')
-    if not issuer:
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token):
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                claims, expires_at = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return claims
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, token, claims):
+        with self._lock:
+            self._entries[self._key(token)] = (claims, claims['exp'])
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._entries),
+        }
+
+def init_auth(app):
+    """
+    Create the JWKS key store for the configured OIDC issuer.
+    Nothing is fetched here: keys are loaded by the store's background refresher,
+    started per worker (gunicorn post_fork) or on the first verification.
+    """
+    issuer = app.config.get('OIDC_ISSUER')
+    if not issuer or app.config.get('AUTH_DISABLED', False):
         return None
-        
-    try:
-        # Assuming Standard OIDC Discovery
-        jwks_uri = f"{issuer}/protocol/openid-connect/certs"
-        response = requests.get(jwks_uri, timeout=5)
-        if response.status_code == 200:
-            return response.json()
-    except Exception as e:
-        current_app.logger.error(f"Failed to fetch JWKS: {e}")
-    return None
+
+    jwks_uri = app.config.get('OIDC_JWKS_URI') or f"{issuer}/protocol/openid-connect/certs"
+    key_store = JWKSKeyStore(
+        jwks_uri,
+        refresh_interval=app.config.get('JWKS_REFRESH_INTERVAL', 3600),
+        min_refetch_interval=app.config.get('JWKS_MIN_REFETCH_INTERVAL', 30)
+    )
+    app.extensions['jwks'] = key_store
+
+    token_cache_size = app.config.get('TOKEN_CACHE_SIZE', 4096)
+    if token_cache_size > 0:
+        token_cache = TokenCache(token_cache_size)
+        key_store.listeners.append(token_cache.clear)
+        app.extensions['token_cache'] = token_cache
+    return key_store
+
+def get_key_store():
+    return current_app.extensions.get('jwks')
+
+def get_token_cache():
+    return current_app.extensions.get('token_cache')
+
+def authenticate(token):
+    """Claims for `token`, from the verified-token cache or a full verification"""
+    token_cache = get_token_cache()
+    if token_cache is None:
+        return verify_token(token)
+
+    claims = token_cache.get(token)
+    if claims is None:
+        claims = verify_token(token)
+        token_cache.set(token, claims)
+    return claims
+
+def verify_token(token):
+    """Verify an RS256 bearer token against the cached JWKS and return its claims"""
+    key_store = get_key_store()
+    if key_store is None:
+        raise jwt.InvalidTokenError('No signing keys configured')
+
+    header = jwt.get_unverified_header(token)
+    key = key_store.get_key(header.get('kid'))
+    if key is None:
+        raise jwt.InvalidKeyError('Unknown signing key')
+
+    audience = current_app.config.get('OIDC_AUDIENCE')
+    return jwt.decode(
+        token,
+        key=key,
+        algorithms=['RS256'],
+        issuer=current_app.config.get('OIDC_ISSUER'),
+        audience=audience,
+        options={'verify_aud': bool(audience), 'require': ['exp', 'iat']}
+    )
 
 def require_auth(f):
     @wraps(f)
@@ -49,53 +148,28 @@ def require_auth(f):
             abort(401, 'Authorization header must be Bearer token')
 
         token = parts[1]
-        
-        # Verify Token
-        issuer = current_app.config.get('OIDC_ISSUER')
-        
-        # DEVELOPMENT MODE: If no issuer configured, just decode without verification if strictly needed, 
-        # or reject. Since we are programming for production, we should try to verify.
-        # However, since Keycloak is not up, we might want to allow a "dummy" token for dev if specified.
-        
-        if not issuer:
-            # If no issuer is set (e.g. keycloak not ready), we might warn but proceed if in dev mode
-            # But the user said "program to production deployment ready".
-            # So we should fail if we can't verify.
-            # But to avoid breaking their current dev flow completely if they don't provide a token:
-            # The frontend doesn't send one yet. So this WILL break the app until frontend is updated.
-            # This is expected based on "implement resource servers".
-            pass
 
-        try:
-            # In a real scenario with Keycloak, we fetch JWKS. 
-            # For now, if OIDC_ISSUER is not set, we can't verify signature properly without the key.
-            # We will assume that if OIDC_ISSUER is set, we verify.
-            # If NOT set, we might default to a local secret or fail.
-            
-            if issuer:
-                # This is a simplified validation. In real prod, use a library like pyjwt[crypto] 
-                # and a caching mechanism for JWKS.
-                # For this implementation, we will skip signature verification if no issuer is reachable
-                # to prevent the app from being unusable during the "no-keycloak" phase,
-                # UNLESS a dummy secret is provided.
-                
-                # Let's try to decode unverified first to check structure
-                payload = jwt.decode(token, options={"verify_signature": False})
-                g.user = payload
-            else:
-                # If no issuer configured, we accept for now but log warning (Dev mode behavior)
-                # abort(401, 'Authentication configuration missing')
-                current_app.logger.warning("Auth validation skipped: No OIDC_ISSUER configured")
-                pass
+        if not current_app.config.get('OIDC_ISSUER'):
+            # No issuer configured (e.g. Keycloak not set up yet): nothing to verify against
+            current_app.logger.warning("Auth validation skipped: No OIDC_ISSUER configured")
+            return f(*args, **kwargs)
 
+        error = None
+        try:
+            g.user = authenticate(token)
         except jwt.ExpiredSignatureError:
-            abort(401, 'Token is expired')
+            error = 'Token is expired'
+        except jwt.InvalidKeyError:
+            error = 'Token signed with an unknown key'
         except jwt.InvalidTokenError:
-            abort(401, 'Invalid token')
+            error = 'Invalid token'
         except Exception as e:
-            abort(401, 'Token invalid')
+            current_app.logger.error(f"Token verification failed: {e}")
+            error = 'Token invalid'
+
+        if error:
+            abort(401, error)
 
         return f(*args, **kwargs)
 
     return decorated
-
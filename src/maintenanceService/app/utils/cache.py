@@ -0,0 +1,263 @@
+"""
+Read-through cache for expensive service reads
+Results are cached per namespace with a TTL. Committed writes invalidate
+their namespace automatically: ORM inserts/updates/deletes and bulk INSERT/UPDATE/DELETE
+statements on a model bump that model's namespace version, which orphans
+every cached entry built from it.
+
+Backends:
+- memory: per-process LRU (CACHE_MAX_ENTRIES), for a single process only
+- redis:  shared Redis-compatible store (CACHE_REDIS_URL, needs the `redis` package)
+- null:   caching disabled
+"""
+
+import inspect
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# Model class name -> cache namespace its writes invalidate
+MODEL_NAMESPACES = {
+    'MaintenanceItem': 'maintenance',
+    'Technician': 'technicians',
+    'Part': 'parts',
+    'RecurringSchedule': 'schedules',
+}
+
+
+class MemoryBackend:
+    """Thread-safe LRU with per-entry expiry"""
+
+    shared = False
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def version(self, namespace):
+        return self._versions.get(namespace, 0)
+
+    def bump(self, namespace):
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+
+    def size(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Redis-compatible store; values are stored as JSON"""
+
+    shared = True
+
+    def __init__(self, url, prefix='maintenance-cache:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package (pip install redis)")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return _MISSING if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl):
+        self.client.setex(self.prefix + key, int(ttl), json.dumps(value))
+
+    def version(self, namespace):
+        return int(self.client.get(f'{self.prefix}version:{namespace}') or 0)
+
+    def bump(self, namespace):
+        self.client.incr(f'{self.prefix}version:{namespace}')
+
+    def size(self):
+        return None
+
+
+class ResponseCache:
+    def __init__(self, app=None):
+        self.backend = None
+        self.default_ttl = 60
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        kind = app.config.get('CACHE_BACKEND', 'memory')
+        if kind == 'memory':
+            self.backend = MemoryBackend(app.config.get('CACHE_MAX_ENTRIES', 1024))
+        elif kind == 'redis':
+            self.backend = RedisBackend(app.config['CACHE_REDIS_URL'])
+        elif kind != 'null':
+            raise ValueError(f"Unknown CACHE_BACKEND '{kind}', expected memory, redis or null")
+        self.default_ttl = app.config.get('CACHE_DEFAULT_TTL', 60)
+        app.extensions['cache'] = self
+
+    @property
+    def shared(self):
+        """Whether all processes see the same entries"""
+        return self.backend is not None and self.backend.shared
+
+    def _key(self, namespace, name, args, kwargs):
+        version = self.backend.version(namespace)
+        return f'{namespace}:v{version}:{name}:{json.dumps([args, kwargs], default=str, sort_keys=True)}'
+
+    def get_or_compute(self, namespace, name, compute, args, kwargs, ttl=None, refresh=False):
+        if self.backend is None:
+            return compute()
+
+        try:
+            key = self._key(namespace, name, args, kwargs)
+            value = _MISSING if refresh else self.backend.get(key)
+        except Exception as e:
+            # A cache outage must never take the endpoint down
+            self.errors += 1
+            logger.warning(f"Cache read failed, computing directly: {e}")
+            return compute()
+
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = compute()
+        try:
+            self.backend.set(key, value, ttl or self.default_ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache write failed: {e}")
+        return value
+
+    def invalidate(self, *namespaces):
+        if self.backend is None:
+            return
+        for namespace in namespaces:
+            try:
+                self.backend.bump(namespace)
+                self.invalidations += 1
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Cache invalidation of '{namespace}' failed: {e}")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__ if self.backend else 'null',
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'invalidations': self.invalidations,
+            'errors': self.errors,
+            'entries': self.backend.size() if self.backend else 0,
+        }
+
+
+def get_cache():
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('cache')
+
+
+def cached(namespace, ttl=None):
+    """
+    Cache the (JSON-serializable) return value of a service function.
+    Callers must treat the returned object as read-only. The wrapped function
+    gains a `.refresh(*args, **kwargs)` that recomputes and stores the result.
+    """
+    def decorator(func):
+        name = func.__qualname__
+        signature = inspect.signature(func)
+
+        def call_args(args, kwargs):
+            # f(30), f(days=30) and f(30, None) share one entry
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return list(bound.arguments.values())
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            if cache is None:
+                return func(*args, **kwargs)
+            return cache.get_or_compute(namespace, name, lambda: func(*args, **kwargs), call_args(args, kwargs), {}, ttl)
+
+        def refresh(*args, **kwargs):
+            cache = get_cache()
+            if cache is None:
+                return func(*args, **kwargs)
+            return cache.get_or_compute(namespace, name, lambda: func(*args, **kwargs), call_args(args, kwargs), {}, ttl,
+                                        refresh=True)
+
+        wrapper.refresh = refresh
+        return wrapper
+    return decorator
+
+
+# ---------- write-through invalidation from committed sessions ----------
+
+def _mark(session, cls):
+    namespace = MODEL_NAMESPACES.get(cls.__name__)
+    if namespace:
+        session.info.setdefault('cache_namespaces', set()).add(namespace)
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_flush(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        _mark(session, type(obj))
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_bulk_statement(orm_execute_state):
+    is_write = orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete
+    if is_write and orm_execute_state.bind_mapper is not None:
+        _mark(orm_execute_state.session, orm_execute_state.bind_mapper.class_)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    namespaces = session.info.pop('cache_namespaces', None)
+    cache = get_cache()
+    if namespaces and cache is not None:
+        cache.invalidate(*namespaces)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('cache_namespaces', None)
@@ -0,0 +1,187 @@
+"""
+Response compression
+Compresses text/JSON responses above COMPRESS_MIN_SIZE with the best encoding
+both sides support (COMPRESS_ALGORITHMS order, filtered by Accept-Encoding).
+Streamed responses (exports, streamed analytics) are compressed incrementally and
+flushed every COMPRESS_STREAM_FLUSH_SIZE input bytes, so clients keep receiving
+data as it is produced without the compression ratio collapsing on tiny chunks.
+
+gzip is always available; brotli (`br`) and zstd are used when the `brotli`
+and `zstandard` packages are installed.
+"""
+
+import logging
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIMETYPES = (
+    'application/json',
+    'application/x-ndjson',
+    'text/csv',
+    'text/html',
+    'text/plain',
+    'text/css',
+    'application/javascript',
+)
+
+
+class GzipCompressor:
+    def __init__(self, level=6):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = gzip container
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, level=4):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class ZstdCompressor:
+    def __init__(self, level=3):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+def available_compressors():
+    """Content-Encoding token -> compressor class, for the libraries installed"""
+    compressors = {'gzip': GzipCompressor}
+    if brotli is not None:
+        compressors['br'] = BrotliCompressor
+    if zstandard is not None:
+        compressors['zstd'] = ZstdCompressor
+    return compressors
+
+
+def compress_bytes(encoding, data, level):
+    """One-shot compression of a complete body"""
+    compressor = available_compressors()[encoding](level)
+    return compressor.compress(data) + compressor.finish()
+
+
+class Compression:
+    def __init__(self, app=None):
+        self.algorithms = []
+        self.levels = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('COMPRESS_ENABLED', True)
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', 1024)
+        self.stream_flush_size = app.config.get('COMPRESS_STREAM_FLUSH_SIZE', 16384)
+        self.mimetypes = set(app.config.get('COMPRESS_MIMETYPES') or DEFAULT_MIMETYPES)
+        self.levels = {
+            'gzip': app.config.get('COMPRESS_GZIP_LEVEL', 6),
+            'br': app.config.get('COMPRESS_BROTLI_QUALITY', 4),
+            'zstd': app.config.get('COMPRESS_ZSTD_LEVEL', 3),
+        }
+
+        compressors = available_compressors()
+        preferred = [name.strip() for name in app.config.get('COMPRESS_ALGORITHMS', 'zstd,br,gzip').split(',')]
+        self.compressors = compressors
+        self.algorithms = [name for name in preferred if name in compressors]
+        skipped = [name for name in preferred if name and name not in compressors]
+        if skipped:
+            logger.info(f"Compression: {', '.join(skipped)} unavailable (library not installed)")
+
+        app.extensions['compression'] = self
+        if self.enabled:
+            app.after_request(self.after_request)
+
+    def negotiate(self):
+        """Server-preferred encoding the client accepts, or None"""
+        accepted = request.accept_encodings
+        for name in self.algorithms:
+            if accepted.quality(name) > 0:
+                return name
+        return None
+
+    def _should_compress(self, response):
+        if request.method == 'HEAD' or response.status_code < 200 or response.status_code in (204, 304):
+            return False
+        if response.direct_passthrough or 'Content-Encoding' in response.headers:
+            return False
+        if response.mimetype not in self.mimetypes:
+            return False
+        if not response.is_streamed and response.content_length is not None and response.content_length < self.min_size:
+            return False
+        return True
+
+    def after_request(self, response):
+        if not self._should_compress(response):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = self.negotiate()
+        if encoding is None:
+            return response
+
+        compressor = self.compressors[encoding](self.levels[encoding])
+        if response.is_streamed:
+            response.response = self._stream(compressor, response.iter_encoded(), self.stream_flush_size)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            response.set_data(compressor.compress(data) + compressor.finish())
+
+        response.headers['Content-Encoding'] = encoding
+        # The compressed bytes differ from the identity representation
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    @staticmethod
+    def _stream(compressor, chunks, flush_size):
+        pending = 0
+        for chunk in chunks:
+            if not chunk:
+                continue
+            output = compressor.compress(chunk)
+            pending += len(chunk)
+            if pending >= flush_size:
+                output += compressor.flush()
+                pending = 0
+            if output:
+                yield output
+        yield compressor.finish()
@@ -0,0 +1,52 @@
+"""
+Conditional GET support (ETag / Last-Modified)
+Validators are derived from `updated_at` only - the row's own value, the
+(id, updated_at) pairs of a page, or COUNT/MAX(updated_at) of a small table - so
+a matching If-None-Match / If-Modified-Since is answered with 304 before
+anything is serialized.
+"""
+
+import hashlib
+from datetime import timezone
+
+from flask import request
+from werkzeug.http import http_date, quote_etag
+
+from app import db
+
+
+def _digest(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def item_validators(item):
+    """(etag, last_modified) for a single row"""
+    return _digest(item.id, item.updated_at), item.updated_at
+
+
+def page_validators(rows, *meta):
+    """(etag, last_modified) for a page of rows carrying id and updated_at, plus page metadata"""
+    last_modified = max((row.updated_at for row in rows if row.updated_at is not None), default=None)
+    return _digest([(row.id, row.updated_at) for row in rows], meta), last_modified
+
+
+def table_validators(model):
+    """(etag, last_modified) covering every row of `model`: changes with any insert, update or delete"""
+    total, last_modified = db.session.query(db.func.count(), db.func.max(model.updated_at)).select_from(model).one()
+    return _digest(model.__tablename__, total, last_modified), last_modified
+
+
+def is_fresh(etag, last_modified=None):
+    """True when the client's cached copy is still current (If-None-Match wins over If-Modified-Since)"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= request.if_modified_since
+    return False
+
+
+def validator_headers(etag, last_modified=None):
+    headers = {'ETag': quote_etag(etag, weak=True)}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified.replace(tzinfo=timezone.utc))
+    return headers
@@ -509,6 +509,15 @@ def seed_database():
         db.session.commit()
         logger.info(f"✅ Successfully seeded {technicians_created} technicians")
         
+        # Link the sample items to their technicians; active_jobs follows from the items,
+        # the seeded completed_jobs history is kept
+        technician_ids = {name: technician_id for technician_id, name in db.session.query(Technician.id, Technician.name)}
+        for item in MaintenanceItem.query.filter(MaintenanceItem.assigned_technician.isnot(None)):
+            item.technician_id = technician_ids.get(item.assigned_technician)
+        db.session.commit()
+        from app.services.maintainance_service import MaintenanceService
+        MaintenanceService.reconcile_technician_counters()
+        
         # ===== SEED PARTS INVENTORY =====
         logger.info("📦 Seeding parts inventory...")
         parts_data = [
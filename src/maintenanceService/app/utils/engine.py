@@ -0,0 +1,109 @@
+"""
+SQLAlchemy engine configuration
+Builds SQLALCHEMY_ENGINE_OPTIONS from the DB_* settings of the active config
+class (pool size, overflow, timeouts, pre-ping, recycle, statement timeout) and
+swaps in a QueuePool that records how long requests wait for a connection, so
+pool sizing can be checked against the shared PostgreSQL max_connections.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+from app import db
+
+
+class MonitoredQueuePool(QueuePool):
+    """QueuePool that tracks checkout wait time and timeouts"""
+
+    # SQLAlchemy names a pool's logger after its class, which puts this one under the
+    # Flask app's logger ('app'); in debug mode that would log every checkout and ping.
+    # Keep it at SQLAlchemy's own pool default - pool logging is echo_pool's job.
+    logging.getLogger(f'{__name__}.MonitoredQueuePool').setLevel(logging.WARNING)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._stats_lock = threading.Lock()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+
+    def stats(self):
+        return {
+            'pool_size': self.size(),
+            'max_overflow': self._max_overflow,
+            'checked_out': self.checkedout(),
+            'checked_in': self.checkedin(),
+            'overflow': max(self.overflow(), 0),
+            'checkouts': self.checkouts,
+            'timeouts': self.timeouts,
+            'avg_wait_ms': self.total_wait / self.checkouts * 1000 if self.checkouts else 0.0,
+            'max_wait_ms': self.max_wait * 1000,
+        }
+
+
+def engine_options(config):
+    """Engine options for the configured database URL (explicit SQLALCHEMY_ENGINE_OPTIONS win)"""
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    options = {}
+
+    in_memory_sqlite = url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+    if not in_memory_sqlite:
+        options.update(
+            poolclass=MonitoredQueuePool,
+            pool_size=config.get('DB_POOL_SIZE', 5),
+            max_overflow=config.get('DB_MAX_OVERFLOW', 10),
+            pool_timeout=config.get('DB_POOL_TIMEOUT', 30),
+            pool_recycle=config.get('DB_POOL_RECYCLE', 1800),
+            pool_pre_ping=config.get('DB_POOL_PRE_PING', True),
+        )
+
+    if url.get_backend_name() == 'postgresql':
+        connect_args = {
+            'connect_timeout': config.get('DB_CONNECT_TIMEOUT', 10),
+            'application_name': config.get('DB_APPLICATION_NAME', 'maintenance-service'),
+        }
+        statement_timeout = config.get('DB_STATEMENT_TIMEOUT_MS', 0)
+        if statement_timeout:
+            connect_args['options'] = f'-c statement_timeout={statement_timeout}'
+        options['connect_args'] = connect_args
+
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    return options
+
+
+def init_engine_options(app):
+    """Resolve SQLALCHEMY_ENGINE_OPTIONS; must run before db.init_app(app)"""
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+
+
+def pool_stats():
+    """Live statistics of this process's connection pool"""
+    pool = db.engine.pool
+    stats = {'pid': os.getpid(), 'pool_class': type(pool).__name__}
+    if isinstance(pool, MonitoredQueuePool):
+        stats.update(pool.stats())
+    else:
+        stats['status'] = pool.status()
+    return stats
@@ -0,0 +1,130 @@
+"""
+JWKS Key Store
+Keeps the OIDC issuer's signing keys in memory (kid -> public key) so token
+verification never waits on the network:
+
+- keys are loaded and then refreshed every JWKS_REFRESH_INTERVAL seconds by a
+  background thread, started in each worker (post_fork) or on first use - never
+  at import or create_app time, so CLI commands such as `flask db upgrade` do not
+  touch the issuer. Only the first verification in a process waits (at most
+  `timeout` seconds) for that initial load.
+- a token with an unknown kid (key rotation) triggers one asynchronous refetch
+  shared by all concurrent requests, rate-limited by JWKS_MIN_REFETCH_INTERVAL
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+from jwt.algorithms import RSAAlgorithm
+
+logger = logging.getLogger(__name__)
+
+
+class JWKSKeyStore:
+    def __init__(self, jwks_uri, refresh_interval=3600, min_refetch_interval=30, timeout=5):
+        self.jwks_uri = jwks_uri
+        self.refresh_interval = refresh_interval
+        self.min_refetch_interval = min_refetch_interval
+        self.timeout = timeout
+        self.keys = {}
+        self.loaded_at = None
+        self.version = 0  # bumped whenever the key set changes
+        self.listeners = []  # callables run after the key set changes
+
+        self._lock = threading.Lock()
+        self._refetching = False
+        self._last_fetch_attempt = 0.0
+        self._thread = None
+        self._thread_pid = None
+        self._stop = threading.Event()
+        self._first_load = threading.Event()  # set once the refresher's first fetch finished
+
+    # ---------- lookups (request path - memory only) ----------
+
+    def get_key(self, kid):
+        """Public key for `kid`, or None (scheduling a background refetch for unknown kids)"""
+        self.ensure_refresher()
+        if self.loaded_at is None:
+            self._first_load.wait(self.timeout)
+        key = self.keys.get(kid)
+        if key is None:
+            self.request_refetch()
+        return key
+
+    # ---------- fetching (background only) ----------
+
+    def load(self):
+        """Fetch the JWKS document and swap in the new key map; returns True on success"""
+        self._last_fetch_attempt = time.monotonic()
+        try:
+            response = requests.get(self.jwks_uri, timeout=self.timeout)
+            response.raise_for_status()
+            document = response.json()
+        except Exception as e:
+            logger.error(f"Failed to fetch JWKS from {self.jwks_uri}: {e}")
+            return False
+
+        keys = {}
+        for jwk in document.get('keys', []):
+            if jwk.get('kty') != 'RSA' or jwk.get('use', 'sig') != 'sig' or 'kid' not in jwk:
+                continue
+            try:
+                keys[jwk['kid']] = RSAAlgorithm.from_jwk(json.dumps(jwk))
+            except Exception as e:
+                logger.warning(f"Skipping unusable JWK {jwk.get('kid')}: {e}")
+
+        changed = set(keys) != set(self.keys)
+        self.keys = keys
+        self.loaded_at = time.time()
+        if changed:
+            self.version += 1
+            logger.info(f"Loaded {len(keys)} signing key(s) from {self.jwks_uri}")
+            for listener in self.listeners:
+                listener()
+        return True
+
+    def request_refetch(self):
+        """Single-flight, rate-limited asynchronous refetch"""
+        with self._lock:
+            if self._refetching:
+                return
+            if time.monotonic() - self._last_fetch_attempt < self.min_refetch_interval:
+                return
+            self._refetching = True
+
+        def refetch():
+            try:
+                self.load()
+            finally:
+                self._refetching = False
+
+        threading.Thread(target=refetch, name='jwks-refetch', daemon=True).start()
+
+    def ensure_refresher(self):
+        """Start the periodic refresh thread in this process (again after a fork)"""
+        if self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread_pid == os.getpid():
+                return
+            self._stop.clear()
+            self._first_load = threading.Event()
+            self._thread = threading.Thread(target=self._refresh_loop, name='jwks-refresh', daemon=True)
+            self._thread.start()
+            self._thread_pid = os.getpid()
+
+    def _refresh_loop(self):
+        try:
+            if not self.keys:
+                self.load()
+        finally:
+            self._first_load.set()
+        while not self._stop.wait(self.refresh_interval):
+            self.load()
+
+    def stop(self):
+        self._stop.set()
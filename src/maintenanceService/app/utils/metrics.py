@@ -0,0 +1,307 @@
+"""
+Request and SQL instrumentation
+Records per-route request latency, the number of SQL statements and the DB time
+spent by each request, and samples of slow statements, and serves them in the
+Prometheus text exposition format on METRICS_PATH (default /metrics).
+
+Hooks: Flask before/after_request for latency, SQLAlchemy before/after_cursor_execute
+on the app's engines for statement timing. With METRICS_ENABLED=false none of the
+hooks are installed, so requests pay nothing.
+
+Metrics are kept per process; under gunicorn every worker reports its own series
+(labelled with `pid`), so aggregate with sum() in queries.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def expose(self, const_labels=()):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        names = tuple(name for name, _ in const_labels) + self.labelnames
+        consts = tuple(value for _, value in const_labels)
+        with self._lock:
+            values = list(self._values.items())
+        for labelvalues, value in sorted(values):
+            lines.append(f'{self.name}{_labels(names, consts + labelvalues)} {_number(value)}')
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                # per-bucket counts (last slot is +Inf), sum, count
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def expose(self, const_labels=()):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        names = tuple(name for name, _ in const_labels) + self.labelnames
+        consts = tuple(value for _, value in const_labels)
+        with self._lock:
+            snapshot = [(labelvalues, list(counts), total, count)
+                        for labelvalues, (counts, total, count) in self._series.items()]
+        for labelvalues, counts, total, count in sorted(snapshot):
+            values = consts + labelvalues
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _labels(names + ('le',), values + (_number(bound),))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(names, values)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(names, values)} {count}')
+        return lines
+
+
+class SlowQueryLog:
+    """The slowest distinct statements seen, capped at `max_samples` (least recent evicted)"""
+
+    def __init__(self, max_samples=20, max_statement_length=300):
+        self.max_samples = max_samples
+        self.max_statement_length = max_statement_length
+        self._samples = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, statement, duration, route):
+        statement = _WHITESPACE.sub(' ', statement).strip()[:self.max_statement_length]
+        with self._lock:
+            sample = self._samples.get(statement)
+            if sample is None:
+                sample = self._samples[statement] = {'count': 0, 'max_seconds': 0.0, 'route': route}
+            sample['count'] += 1
+            if duration >= sample['max_seconds']:
+                sample['max_seconds'] = duration
+                sample['route'] = route
+            self._samples.move_to_end(statement)
+            while len(self._samples) > self.max_samples:
+                self._samples.popitem(last=False)
+
+    def samples(self):
+        with self._lock:
+            return [dict(sample, statement=statement) for statement, sample in self._samples.items()]
+
+    def expose(self, const_labels=()):
+        names = tuple(name for name, _ in const_labels) + ('route', 'statement')
+        consts = tuple(value for _, value in const_labels)
+        max_lines = ['# HELP sql_slow_query_max_seconds Longest execution of a sampled slow statement',
+                     '# TYPE sql_slow_query_max_seconds gauge']
+        count_lines = ['# HELP sql_slow_query_samples Executions of a sampled statement above the slow threshold',
+                       '# TYPE sql_slow_query_samples gauge']
+        for sample in self.samples():
+            labels = _labels(names, consts + (sample['route'], sample['statement']))
+            max_lines.append(f'sql_slow_query_max_seconds{labels} {_number(sample["max_seconds"])}')
+            count_lines.append(f'sql_slow_query_samples{labels} {sample["count"]}')
+        return max_lines + count_lines
+
+
+class Metrics:
+    def __init__(self, app=None):
+        self.enabled = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        app.extensions['metrics'] = self
+        if not self.enabled:
+            return
+
+        self.slow_query_threshold = app.config.get('METRICS_SLOW_QUERY_MS', 200) / 1000
+        self.requests = Histogram(
+            'http_request_duration_seconds', 'Request latency by route',
+            ('method', 'route', 'status'), LATENCY_BUCKETS)
+        self.request_queries = Histogram(
+            'http_request_sql_queries', 'SQL statements issued per request',
+            ('method', 'route'), QUERY_COUNT_BUCKETS)
+        self.request_db_time = Histogram(
+            'http_request_sql_duration_seconds', 'Total SQL execution time per request',
+            ('method', 'route'), LATENCY_BUCKETS)
+        self.queries = Histogram(
+            'sql_query_duration_seconds', 'SQL statement execution time (requests and background jobs)',
+            (), SQL_BUCKETS)
+        self.slow_queries = Counter(
+            'sql_slow_queries_total', 'SQL statements slower than METRICS_SLOW_QUERY_MS', ('route',))
+        self.slow_query_log = SlowQueryLog(app.config.get('METRICS_SLOW_QUERY_SAMPLES', 20))
+        self.collectors = [pool_collector, cache_collector]
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+        from app import db
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+        app.add_url_rule(app.config.get('METRICS_PATH', '/metrics'), 'metrics', self.metrics_view)
+
+    def add_collector(self, collector):
+        """Register a callable returning exposition lines, evaluated at scrape time"""
+        self.collectors.append(collector)
+
+    # --- Flask hooks ---
+
+    def _before_request(self):
+        g.metrics_started = time.perf_counter()
+        g.metrics_queries = 0
+        g.metrics_db_time = 0.0
+
+    def _after_request(self, response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            route = _route()
+            self.requests.observe(time.perf_counter() - started, request.method, route, str(response.status_code))
+            self.request_queries.observe(g.metrics_queries, request.method, route)
+            self.request_db_time.observe(g.metrics_db_time, request.method, route)
+        return response
+
+    # --- SQLAlchemy hooks ---
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_metrics_started', None)
+        if started is None:
+            return
+        duration = time.perf_counter() - started
+        self.queries.observe(duration)
+
+        in_request = has_request_context() and 'metrics_started' in g
+        if in_request:
+            g.metrics_queries += 1
+            g.metrics_db_time += duration
+        if duration >= self.slow_query_threshold:
+            route = _route() if in_request else 'background'
+            self.slow_queries.inc(route)
+            self.slow_query_log.record(statement, duration, route)
+            logger.warning(f"Slow query ({duration * 1000:.0f}ms, {route}): {statement[:200]}")
+
+    # --- Exposition ---
+
+    def render(self):
+        const_labels = (('pid', os.getpid()),)
+        lines = []
+        for metric in (self.requests, self.request_queries, self.request_db_time,
+                       self.queries, self.slow_queries, self.slow_query_log):
+            lines.extend(metric.expose(const_labels))
+        for collector in self.collectors:
+            try:
+                lines.extend(collector(const_labels))
+            except Exception as e:
+                logger.error(f"Metrics collector {collector.__name__} failed: {str(e)}")
+        return '\n'.join(lines) + '\n'
+
+    def metrics_view(self):
+        return Response(self.render(), content_type=CONTENT_TYPE)
+
+
+def _route():
+    """Route template (bounded cardinality) rather than the raw path"""
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
+
+
+def sample_lines(name, metric_type, documentation, value, const_labels=()):
+    """Exposition lines for a single-sample counter or gauge"""
+    labels = _labels([label for label, _ in const_labels], [label_value for _, label_value in const_labels])
+    return [f'# HELP {name} {documentation}', f'# TYPE {name} {metric_type}', f'{name}{labels} {_number(value)}']
+
+
+def pool_collector(const_labels):
+    """Connection pool gauges/counters from app.utils.engine.pool_stats()"""
+    from app.utils.engine import pool_stats
+    stats = pool_stats()
+    if 'checkouts' not in stats:
+        return []
+    return (
+        sample_lines('db_pool_checked_out', 'gauge', 'Connections currently checked out', stats['checked_out'], const_labels)
+        + sample_lines('db_pool_overflow', 'gauge', 'Overflow connections open', stats['overflow'], const_labels)
+        + sample_lines('db_pool_checkouts_total', 'counter', 'Connection checkouts', stats['checkouts'], const_labels)
+        + sample_lines('db_pool_timeouts_total', 'counter', 'Checkouts that timed out', stats['timeouts'], const_labels)
+        + sample_lines('db_pool_max_wait_seconds', 'gauge', 'Longest wait for a connection',
+                       stats['max_wait_ms'] / 1000, const_labels)
+    )
+
+
+def cache_collector(const_labels):
+    """Read-cache hit/miss counters from app.utils.cache"""
+    from app.utils.cache import get_cache
+    cache = get_cache()
+    if cache is None:
+        return []
+    stats = cache.stats()
+    return (
+        sample_lines('cache_hits_total', 'counter', 'Read-cache hits', stats['hits'], const_labels)
+        + sample_lines('cache_misses_total', 'counter', 'Read-cache misses', stats['misses'], const_labels)
+        + sample_lines('cache_invalidations_total', 'counter', 'Read-cache namespace invalidations',
+                       stats['invalidations'], const_labels)
+    )
+
+
+def get_metrics():
+    from flask import current_app
+    metrics = current_app.extensions.get('metrics')
+    return metrics if metrics is not None and metrics.enabled else None
@@ -0,0 +1,111 @@
+"""
+Keyset (cursor) pagination helpers
+Pages are fetched with a WHERE clause on the last row's sort key instead of
+OFFSET, so every page costs the same regardless of depth. Cursors are opaque
+base64 tokens holding that sort key.
+"""
+
+import base64
+import json
+from datetime import date, datetime
+
+from sqlalchemy import and_, or_, text
+
+from app import db
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if hasattr(value, 'value'):  # Enum
+        return value.value
+    return value
+
+
+def _decode_value(column, value):
+    if value is None:
+        return None
+    column_type = column.type
+    if getattr(column_type, 'enum_class', None) is not None:
+        return column_type.enum_class(value)
+    python_type = column_type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return value
+
+
+def encode_cursor(row, order_by):
+    """Build the cursor pointing just after `row`"""
+    values = [_encode_value(getattr(row, column.key)) for column, _ in order_by]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, order_by):
+    """Turn a cursor back into typed sort-key values"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(order_by):
+            raise ValueError('cursor does not match the sort order')
+        return [_decode_value(column, value) for (column, _), value in zip(order_by, values)]
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidCursor(f'Invalid cursor: {e}')
+
+
+def _after(order_by, values):
+    """WHERE clause selecting rows that sort strictly after `values`"""
+    clauses = []
+    for i, (column, descending) in enumerate(order_by):
+        equal = [order_column == value for (order_column, _), value in zip(order_by[:i], values[:i])]
+        beyond = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal, beyond))
+    return or_(*clauses)
+
+
+def estimate_count(query):
+    """Row estimate from the PostgreSQL planner; exact COUNT(*) elsewhere"""
+    if db.engine.dialect.name != 'postgresql':
+        return query.order_by(None).count()
+
+    statement = query.order_by(None).statement.compile(
+        dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}
+    )
+    plan = db.session.execute(text(f'EXPLAIN (FORMAT JSON) {statement}')).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def keyset_paginate(query, order_by, cursor=None, per_page=10, count='none'):
+    """
+    Fetch one page of `query` ordered by `order_by` - a list of (column, descending)
+    pairs whose last column must be unique. `count` is 'exact', 'estimate' or 'none'.
+    """
+    per_page = max(per_page, 1)  # the next cursor is taken from the last row of the page
+    total = None
+    if count == 'exact':
+        total = query.order_by(None).count()
+    elif count == 'estimate':
+        total = estimate_count(query)
+
+    if cursor:
+        query = query.filter(_after(order_by, decode_cursor(cursor, order_by)))
+
+    query = query.order_by(*[column.desc() if descending else column.asc() for column, descending in order_by])
+    rows = query.limit(per_page + 1).all()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    return {
+        'items': rows,
+        'next_cursor': encode_cursor(rows[-1], order_by) if has_more else None,
+        'total': total,
+        'per_page': per_page
+    }
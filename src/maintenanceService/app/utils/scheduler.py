@@ -0,0 +1,296 @@
+"""
+Periodic Job Scheduler for Maintenance Service
+Runs background jobs (bulk status updates, schedule materialization, cache
+refreshes) on jittered intervals inside the service process. A leader lock
+makes sure only one replica runs the jobs when the service is scaled out:
+a PostgreSQL advisory lock, or a file lock as a stand-in for SQLite.
+"""
+
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from app import db
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class AdvisoryLock:
+    """Session-level pg_try_advisory_lock held on a dedicated connection"""
+
+    def __init__(self, engine, key):
+        # Unpooled and in autocommit: the held connection neither occupies one of the app's
+        # pool slots nor sits idle in a transaction (idle_in_transaction_session_timeout
+        # would kill it and drop the lock)
+        self.engine = create_engine(engine.url, poolclass=NullPool, isolation_level='AUTOCOMMIT')
+        self.key = key
+        self._connection = None
+
+    def acquire(self):
+        """Try to become (or confirm we still are) the leader - never blocks"""
+        if self._connection is not None:
+            try:
+                self._connection.execute(text('SELECT 1'))
+                return True
+            except Exception:
+                logger.warning("Lost scheduler leader connection; re-electing")
+                self.release()
+
+        connection = self.engine.connect()
+        try:
+            acquired = connection.execute(
+                text('SELECT pg_try_advisory_lock(:key)'), {'key': self.key}
+            ).scalar()
+        except Exception:
+            connection.close()
+            raise
+
+        if acquired:
+            self._connection = connection
+            logger.info(f"Acquired scheduler leader lock (advisory lock {self.key})")
+            return True
+
+        connection.close()
+        return False
+
+    def release(self):
+        if self._connection is None:
+            return
+        try:
+            self._connection.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': self.key})
+        except Exception:
+            pass
+        finally:
+            self._connection.close()
+            self._connection = None
+
+
+class FileLock:
+    """Exclusive flock on a lock file - leader election for single-host SQLite setups"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def acquire(self):
+        if self._file is not None:
+            return True
+        if fcntl is None:
+            # No flock available: assume a single process
+            return True
+
+        lock_file = open(self.path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+
+        self._file = lock_file
+        logger.info(f"Acquired scheduler leader lock ({self.path})")
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+
+
+class Job:
+    def __init__(self, name, func, interval, jitter, leader_only=True):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.leader_only = leader_only
+        # Spread the first run so replicas started together do not fire in lockstep
+        self.next_run = time.monotonic() + random.uniform(0, interval * jitter)
+        self.runs = 0
+        self.failures = 0
+        self.last_duration = None
+
+    def schedule_next(self, now):
+        spread = self.interval * self.jitter
+        self.next_run = now + self.interval + random.uniform(-spread, spread)
+
+
+class Scheduler:
+    """Background thread running registered jobs while this process holds the leader lock"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.jobs = []
+        self.lock = None
+        self._thread = None
+        self._stop = threading.Event()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.jitter = app.config.get('SCHEDULER_JITTER', 0.1)
+        self.tick = app.config.get('SCHEDULER_TICK_SECONDS', 1.0)
+        app.extensions['scheduler'] = self
+
+    def add_job(self, name, func, interval, leader_only=True):
+        """
+        Run `func()` inside an app context every `interval` seconds (0 disables the job),
+        on the leader only or (leader_only=False) in every process
+        """
+        if interval and interval > 0:
+            self.jobs.append(Job(name, func, interval, self.jitter, leader_only))
+
+    def _create_lock(self):
+        with self.app.app_context():
+            engine = db.engine
+        if engine.dialect.name == 'postgresql':
+            return AdvisoryLock(engine, self.app.config.get('SCHEDULER_LOCK_KEY'))
+
+        lock_path = self.app.config.get('SCHEDULER_LOCK_FILE') or os.path.join(
+            tempfile.gettempdir(), 'maintenance-service-scheduler.lock'
+        )
+        return FileLock(lock_path)
+
+    def start(self):
+        if self._thread is not None or not self.jobs:
+            return
+        self.lock = self._create_lock()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='scheduler', daemon=True)
+        self._thread.start()
+        logger.info(f"⏱️  Scheduler started with jobs: {', '.join(job.name for job in self.jobs)}")
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self.lock is not None:
+            self.lock.release()
+
+    def _run(self):
+        while not self._stop.wait(self.tick):
+            now = time.monotonic()
+            due = [job for job in self.jobs if job.next_run <= now]
+            if not due:
+                continue
+
+            is_leader = False
+            if any(job.leader_only for job in due):
+                try:
+                    is_leader = self.lock.acquire()
+                except Exception as e:
+                    logger.error(f"Scheduler leader election failed: {e}")
+
+            for job in due:
+                if is_leader or not job.leader_only:
+                    self._run_job(job)
+                job.schedule_next(time.monotonic())
+
+    def _run_job(self, job):
+        started = time.monotonic()
+        with self.app.app_context():
+            try:
+                job.func()
+                job.runs += 1
+            except Exception as e:
+                job.failures += 1
+                db.session.rollback()
+                logger.error(f"Scheduled job '{job.name}' failed: {e}")
+            finally:
+                db.session.remove()
+        job.last_duration = time.monotonic() - started
+
+
+def _update_statuses():
+    from flask import current_app
+    from app.services.maintainance_service import MaintenanceService
+
+    result = MaintenanceService.update_maintenance_status_bulk(
+        current_app.config.get('STATUS_UPDATE_BATCH_SIZE')
+    )
+    if result['updated_count']:
+        logger.info(f"🔄 Status job updated {result['updated_count']} items: {result['transitions']}")
+
+
+def _materialize_schedules():
+    from flask import current_app
+    from app.services.maintainance_service import MaintenanceService
+
+    config = current_app.config
+    result = MaintenanceService.materialize_recurring_schedules(
+        config.get('SCHEDULE_MATERIALIZE_BATCH_SIZE'),
+        config.get('SCHEDULE_LEAD_DAYS', 0),
+        config.get('SCHEDULE_MAX_CATCHUP', 0)
+    )
+    if result['items_created'] or result['occurrences_skipped']:
+        logger.info(f"📅 Schedule job created {result['items_created']} items from {result['schedules']} schedules "
+                    f"({result['occurrences_skipped']} missed occurrences skipped)")
+
+
+def _refresh_mileage():
+    from flask import current_app
+    from app.services.maintainance_service import MaintenanceService
+
+    result = MaintenanceService.refresh_mileage_projections(
+        current_app.config.get('MILEAGE_REFRESH_BATCH_SIZE'),
+        current_app.config.get('MILEAGE_HISTORY_DAYS', 365)
+    )
+    logger.info(f"🛣️  Mileage job refit {result['vehicles']} vehicles, pruned {result['readings_pruned']} readings")
+
+
+def _reconcile_technicians():
+    from app.services.maintainance_service import MaintenanceService
+
+    result = MaintenanceService.reconcile_technician_counters()
+    if result['corrected']:
+        logger.warning(f"👷 Technician job corrected {result['corrected']} counters "
+                       f"(active drift {result['active_drift']})")
+
+
+def _warm_cache():
+    from app.services.maintainance_service import MaintenanceService
+
+    MaintenanceService.get_maintenance_summary.refresh()
+    MaintenanceService.get_cost_analytics.refresh()
+    MaintenanceService.get_overdue_items.refresh()
+    MaintenanceService.get_upcoming_items.refresh(30)
+
+
+def init_scheduler(app):
+    """Create the scheduler and register the built-in jobs from config intervals"""
+    scheduler = Scheduler(app)
+    scheduler.add_job('update_statuses', _update_statuses, app.config.get('STATUS_UPDATE_INTERVAL', 0))
+    scheduler.add_job('materialize_schedules', _materialize_schedules,
+                      app.config.get('SCHEDULE_MATERIALIZE_INTERVAL', 0))
+    scheduler.add_job('refresh_mileage', _refresh_mileage, app.config.get('MILEAGE_REFRESH_INTERVAL', 0))
+    scheduler.add_job('reconcile_technicians', _reconcile_technicians,
+                      app.config.get('TECHNICIAN_RECONCILE_INTERVAL', 0))
+    # A per-process cache (memory backend) has to be warmed in every worker
+    cache = app.extensions.get('cache')
+    scheduler.add_job('warm_cache', _warm_cache, app.config.get('CACHE_WARM_INTERVAL', 0),
+                      leader_only=cache is not None and cache.shared)
+    return scheduler
+
+
+def start_scheduler(app):
+    """Start the app's scheduler if SCHEDULER_ENABLED"""
+    if not app.config.get('SCHEDULER_ENABLED', False):
+        return None
+    scheduler = app.extensions['scheduler']
+    scheduler.start()
+    return scheduler
@@ -0,0 +1,91 @@
+"""
+Benchmark for batch technician assignment (MaintenanceService.assign_technicians)
+
+Adds synthetic technicians with random skills to the benchmark database and times
+planning (dry run) and planning + saving for batches of open, unassigned items.
+Saved assignments are undone afterwards, so the database can be reused.
+
+Usage:
+    python benchmarks/bench_assignment.py --technicians 200 --batches 500 2000 5000
+"""
+
+import argparse
+import random
+import time
+
+from sqlalchemy import insert, update
+
+from common import create_bench_app, seed_items
+
+from app import db
+from app.models.maintainance import MaintenanceItem, Technician, TechnicianStatus
+from app.services.maintainance_service import MaintenanceService
+
+SKILLS = ['Oil Changes', 'Brake Systems', 'Tire Service', 'Engine Diagnostics', 'Transmission Service',
+          'Battery Systems', 'Air Conditioning', 'Electrical Systems', 'Suspension', 'Fuel Systems']
+NAME_PREFIX = 'Bench Tech'
+
+
+def seed_technicians(count):
+    Technician.query.filter(Technician.name.like(f'{NAME_PREFIX}%')).delete(synchronize_session=False)
+    rng = random.Random(7)
+    rows = [{
+        'id': f'BT{n:05d}',
+        'name': f'{NAME_PREFIX} {n}',
+        'email': f'bench{n}@example.com',
+        'specialization': rng.sample(SKILLS, rng.randint(1, 3)),
+        'certifications': [],
+        'status': rng.choice([TechnicianStatus.AVAILABLE] * 4 + [TechnicianStatus.OFF_DUTY]).value,
+        'rating': round(rng.uniform(3.5, 5.0), 1),
+        'hourly_rate': round(rng.uniform(40, 120), 2),
+        'active_jobs': rng.randint(0, 3),
+        'completed_jobs': 0,
+    } for n in range(count)]
+    db.session.execute(insert(Technician.__table__), rows)
+    db.session.commit()
+
+
+def undo_assignments():
+    db.session.execute(
+        update(MaintenanceItem).where(MaintenanceItem.assigned_technician.like(f'{NAME_PREFIX}%'))
+        .values(assigned_technician=None).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--technicians', type=int, default=200)
+    parser.add_argument('--batches', type=int, nargs='*', default=[500, 2000, 5000])
+    parser.add_argument('--max-active-jobs', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    with app.app_context():
+        seed_items(args.rows)
+        seed_technicians(args.technicians)
+
+        for batch in args.batches:
+            for dry_run in (True, False):
+                timings = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    result = MaintenanceService.assign_technicians(
+                        limit=batch, max_active_jobs=args.max_active_jobs, dry_run=dry_run)
+                    timings.append(time.perf_counter() - start)
+                    if not dry_run:
+                        undo_assignments()
+                        seed_technicians(args.technicians)
+                label = 'plan only' if dry_run else 'plan + save'
+                print(f'batch={batch:<6} {label:<12} assigned={result["assigned"]:<6} '
+                      f'unassigned={result["unassigned"]:<6} best={min(timings) * 1000:8.1f}ms')
+
+        undo_assignments()
+        Technician.query.filter(Technician.name.like(f'{NAME_PREFIX}%')).delete(synchronize_session=False)
+        db.session.commit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark for response compression
+
+Fetches typical payloads through the test client (identity encoding) and
+reports, for every installed algorithm and a few levels, the compressed size,
+ratio and CPU time - the numbers behind the COMPRESS_* defaults.
+
+Usage:
+    python benchmarks/bench_compression.py --rows 100000
+    python benchmarks/bench_compression.py --levels gzip=1,6 br=4,11 zstd=3,19
+"""
+
+import argparse
+import time
+
+from common import create_bench_app, seed_items
+
+from app.utils.compression import available_compressors, compress_bytes
+
+PAYLOADS = [
+    ('costs analytics', '/api/maintenance/analytics/costs'),
+    ('list per_page=50', '/api/maintenance/?per_page=50'),
+    ('list per_page=500', '/api/maintenance/?per_page=500'),
+    ('vehicle history', '/api/maintenance/vehicle/VH-00042/history'),
+    ('export ndjson', '/api/maintenance/export?format=ndjson&status=completed'),
+]
+
+DEFAULT_LEVELS = {'gzip': [1, 6, 9], 'br': [1, 4, 9], 'zstd': [1, 3, 9]}
+
+
+def parse_levels(specs):
+    levels = dict(DEFAULT_LEVELS)
+    for spec in specs or []:
+        name, _, values = spec.partition('=')
+        levels[name] = [int(value) for value in values.split(',')]
+    return levels
+
+
+def measure_compression(encoding, data, level, repeat=3):
+    """Return (compressed size, best CPU ms) for one-shot compression of `data`"""
+    timings = []
+    for _ in range(repeat):
+        start = time.process_time()
+        size = len(compress_bytes(encoding, data, level))
+        timings.append(time.process_time() - start)
+    return size, min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--levels', nargs='*', help='Per-algorithm levels, e.g. gzip=1,6,9')
+    parser.add_argument('--export-limit', type=int, default=20_000, help='Export lines to keep for the sample')
+    args = parser.parse_args()
+
+    levels = parse_levels(args.levels)
+    app = create_bench_app()
+    with app.app_context():
+        seed_items(args.rows)
+
+    client = app.test_client()
+    compressors = available_compressors()
+    print(f'Algorithms installed: {", ".join(compressors)}')
+
+    for label, path in PAYLOADS:
+        response = client.get(path, headers={'Accept-Encoding': 'identity'})
+        data = response.get_data()
+        if path.startswith('/api/maintenance/export'):
+            data = b'\n'.join(data.split(b'\n')[:args.export_limit]) + b'\n'
+        print(f'\n{label} ({path}): {len(data):,} bytes')
+        for encoding in compressors:
+            for level in levels.get(encoding, []):
+                size, cpu_ms = measure_compression(encoding, data, level)
+                print(f'  {encoding:<5} level={level:<3} {size:>10,} bytes  '
+                      f'ratio={len(data) / size:6.1f}x  cpu={cpu_ms:8.2f}ms  '
+                      f'throughput={len(data) / 1e6 / max(cpu_ms / 1000, 1e-9):7.1f}MB/s')
+
+
+if __name__ == '__main__':
+    main()
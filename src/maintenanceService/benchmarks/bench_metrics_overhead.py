@@ -0,0 +1,62 @@
+"""
+Overhead of the request/SQL instrumentation (app.utils.metrics)
+
+Times the same requests through the test client with METRICS_ENABLED on and off
+and prints the per-request difference, plus the cost of rendering /metrics.
+
+Usage:
+    python benchmarks/bench_metrics_overhead.py --requests 500 --rounds 5
+"""
+
+import argparse
+import os
+import time
+
+from common import create_bench_app, seed_items
+
+PATHS = [
+    '/health',
+    '/api/maintenance/?per_page=50',
+    '/api/maintenance/vehicle/VH-00042/history',
+]
+
+
+def time_requests(client, path, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        client.get(path)
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--requests', type=int, default=500, help='Requests per path per round')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    clients = {}
+    for enabled in ('false', 'true'):
+        os.environ['METRICS_ENABLED'] = enabled
+        app = create_bench_app()
+        with app.app_context():
+            seed_items(args.rows)
+        clients[enabled] = app.test_client()
+
+    # Alternate the two apps and keep the best round to damp noise
+    results = {}
+    for _ in range(args.rounds):
+        for path in PATHS:
+            for enabled, client in clients.items():
+                elapsed = time_requests(client, path, args.requests)
+                results[enabled, path] = min(results.get((enabled, path), elapsed), elapsed)
+    scrape = time_requests(clients['true'], '/metrics', 200)
+
+    for path in PATHS:
+        off, on = results['false', path], results['true', path]
+        print(f'{path:<45} off={off * 1e6:8.1f}us  on={on * 1e6:8.1f}us  overhead={(on - off) * 1e6:6.1f}us')
+    print(f'{"/metrics render":<45} {scrape * 1e6:8.1f}us')
+
+
+if __name__ == '__main__':
+    main()
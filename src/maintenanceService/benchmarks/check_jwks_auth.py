@@ -0,0 +1,162 @@
+"""
+Bearer-token verification against a local stand-in JWKS server (app.utils.auth / app.utils.jwks)
+
+Serves a generated RSA key set over HTTP on 127.0.0.1 in place of Keycloak, points
+OIDC_ISSUER / OIDC_JWKS_URI at it and sends signed tokens to an authenticated endpoint:
+
+- create_app does not fetch the key set (CLI commands such as `flask db upgrade` stay offline)
+- the first verification loads the keys; valid tokens pass, repeats come from the token cache
+- expired, wrong-issuer, wrong-audience and forged tokens are rejected with 401
+- a token with a newly published kid is rejected once, triggers a refetch and then passes
+- after a kid is withdrawn, its tokens are rejected again (the token cache is cleared)
+
+Exits non-zero if a check fails.
+
+Usage:
+    python benchmarks/check_jwks_auth.py
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+AUDIENCE = 'maintenance-service'
+ENDPOINT = '/api/maintenance/admin/pool'
+
+
+class StandInJWKS(ThreadingHTTPServer):
+    """Serves {'keys': [...]} for the currently published kids and counts the fetches"""
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), JWKSHandler)
+        self.signing_keys = {}  # kid -> private key
+        self.published = []
+        self.fetches = 0
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def add_key(self, kid):
+        self.signing_keys[kid] = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        return self.signing_keys[kid]
+
+    def document(self):
+        keys = []
+        for kid in self.published:
+            jwk = json.loads(RSAAlgorithm.to_jwk(self.signing_keys[kid].public_key()))
+            keys.append({**jwk, 'kid': kid, 'use': 'sig', 'alg': 'RS256'})
+        return {'keys': keys}
+
+
+class JWKSHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.fetches += 1
+        body = json.dumps(self.server.document()).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+server = StandInJWKS()
+threading.Thread(target=server.serve_forever, name='stand-in-jwks', daemon=True).start()
+
+# Must be set before config.py is imported (through common)
+ISSUER = f'{server.base_url}/realms/fleet-management'
+os.environ.update(
+    AUTH_DISABLED='false',
+    OIDC_ISSUER=ISSUER,
+    OIDC_JWKS_URI=f'{server.base_url}/protocol/openid-connect/certs',
+    OIDC_AUDIENCE=AUDIENCE,
+    JWKS_MIN_REFETCH_INTERVAL='0',
+    SCHEDULER_ENABLED='false',
+)
+
+from common import create_bench_app  # noqa: E402
+
+
+def token(kid, signing_kid=None, issuer=ISSUER, audience=AUDIENCE, lifetime=300):
+    now = int(time.time())
+    claims = {'sub': 'bench-user', 'iss': issuer, 'aud': audience, 'iat': now, 'exp': now + lifetime}
+    return jwt.encode(claims, server.signing_keys[signing_kid or kid], algorithm='RS256', headers={'kid': kid})
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def main():
+    failures = []
+
+    def check(label, passed):
+        print(f"{'OK  ' if passed else 'FAIL'} {label}")
+        if not passed:
+            failures.append(label)
+
+    server.add_key('key-1')
+    server.add_key('key-2')
+    server.add_key('forger')
+    server.published = ['key-1']
+
+    app = create_bench_app()
+    client = app.test_client()
+    key_store = app.extensions['jwks']
+    token_cache = app.extensions['token_cache']
+
+    def status(bearer):
+        return client.get(ENDPOINT, headers={'Authorization': f'Bearer {bearer}'}).status_code
+
+    check('create_app does not fetch the key set', server.fetches == 0)
+
+    valid = token('key-1')
+    check('valid token accepted on first use', status(valid) == 200)
+    check('first verification loaded the key set once', server.fetches == 1)
+    hits = token_cache.hits
+    check('repeated token accepted', status(valid) == 200)
+    check('repeated token served from the token cache', token_cache.hits == hits + 1)
+
+    check('expired token rejected', status(token('key-1', lifetime=-60)) == 401)
+    check('wrong issuer rejected', status(token('key-1', issuer='http://elsewhere/realms/x')) == 401)
+    check('wrong audience rejected', status(token('key-1', audience='another-service')) == 401)
+    check('forged signature rejected', status(token('key-1', signing_kid='forger')) == 401)
+    check('missing Authorization header rejected', client.get(ENDPOINT).status_code == 401)
+
+    # Rotation: a new kid is published; its first token misses and schedules a refetch
+    server.published = ['key-1', 'key-2']
+    rotated = token('key-2')
+    check('token with a not yet loaded kid rejected', status(rotated) == 401)
+    check('unknown kid triggered a refetch', wait_for(lambda: 'key-2' in key_store.keys))
+    check('token with the new kid accepted after the refetch', status(rotated) == 200)
+
+    # Withdrawal: key-1 is removed; cached key-1 tokens must not outlive it
+    server.published = ['key-2']
+    check('unknown kid while key-1 is withdrawn rejected', status(token('forger')) == 401)
+    check('withdrawn kid dropped from the key set', wait_for(lambda: 'key-1' not in key_store.keys))
+    check('token of a withdrawn kid rejected', status(valid) == 401)
+    check('token of the remaining kid still accepted', status(rotated) == 200)
+
+    print(f'{server.fetches} JWKS fetch(es)')
+    print('FAILED' if failures else 'OK')
+    server.shutdown()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Shared helpers for the maintenance service benchmarks
+Builds an app against BENCH_DATABASE_URL (default: a throwaway SQLite file),
+bulk-loads synthetic maintenance items and counts the SQL statements issued.
+"""
+
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event, insert
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_URL = 'sqlite:////tmp/maintenance_bench.db'
+# Must be set before config.py is imported
+os.environ['DATABASE_URL'] = os.environ.get('BENCH_DATABASE_URL', DEFAULT_URL)
+os.environ.setdefault('AUTH_DISABLED', 'true')
+# Time the uncached reads: with a response cache every repeat after the first would be a hit
+# (the redis package is not needed either). load_test.py sets its servers' backend itself.
+os.environ.setdefault('CACHE_BACKEND', 'null')
+
+from app import create_app, db  # noqa: E402
+from app.models.maintainance import MaintenanceItem, MaintenanceStatus, MaintenancePriority  # noqa: E402
+
+TYPES = ['Oil Change', 'Brake Service', 'Tire Rotation', 'Engine Diagnostics',
+         'Transmission Service', 'Battery Check', 'HVAC Service', 'Annual Inspection']
+
+
+def create_bench_app():
+    """Create an app bound to the benchmark database with SQL echo disabled"""
+    return create_app('production')
+
+
+def seed_items(rows, vehicles=5000, batch_size=10000):
+    """Load `rows` synthetic maintenance items (skipped if the table already has them)"""
+    db.create_all()
+    existing = MaintenanceItem.query.count()
+    if existing >= rows:
+        print(f'Using existing {existing:,} maintenance_items rows')
+        return existing
+
+    rng = random.Random(42)
+    statuses = list(MaintenanceStatus)
+    priorities = list(MaintenancePriority)
+    today = date.today()
+    now = datetime.utcnow()
+    table = MaintenanceItem.__table__
+
+    start = time.perf_counter()
+    for offset in range(existing, rows, batch_size):
+        batch = []
+        for n in range(offset, min(offset + batch_size, rows)):
+            status = rng.choice(statuses)
+            created = now - timedelta(days=rng.randint(0, 730))
+            current_mileage = rng.randint(0, 200000)
+            batch.append({
+                'id': f'B{n + 1:07d}',
+                'vehicle_id': f'VH-{rng.randint(1, vehicles):05d}',
+                'type': rng.choice(TYPES),
+                'description': 'Synthetic benchmark item',
+                'status': status.value,
+                'priority': rng.choice(priorities).value,
+                'due_date': today + timedelta(days=rng.randint(-60, 120)),
+                'created_at': created,
+                'updated_at': created,
+                'current_mileage': current_mileage,
+                'due_mileage': current_mileage + rng.randint(-1000, 10000),
+                'estimated_cost': round(rng.uniform(50, 2000), 2),
+                'actual_cost': round(rng.uniform(50, 2500), 2) if status == MaintenanceStatus.COMPLETED else None,
+            })
+        db.session.execute(insert(table), batch)
+        db.session.commit()
+    print(f'Seeded {rows - existing:,} rows in {time.perf_counter() - start:.1f}s')
+    return rows
+
+
+@contextmanager
+def count_queries():
+    """Yield a dict whose 'count' is the number of statements executed inside the block"""
+    stats = {'count': 0}
+
+    def before_cursor_execute(*args):
+        stats['count'] += 1
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield stats
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def measure(label, fn, repeat=5):
+    """
+    Run `fn` `repeat` times and print the first run's query count plus best/mean latency.
+    If later runs issue a different number of statements (a cache or lazy load kicked in),
+    their range is shown too, since the timings then mix both.
+    """
+    timings, counts = [], []
+    for _ in range(repeat):
+        with count_queries() as stats:
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        counts.append(stats['count'])
+        db.session.rollback()
+    queries = str(counts[0])
+    if len(set(counts)) > 1:
+        queries += f' (repeats {min(counts[1:])}-{max(counts[1:])})'
+    print(f'{label:<28} queries={queries:<6} '
+          f'best={min(timings) * 1000:9.1f}ms  mean={sum(timings) / len(timings) * 1000:9.1f}ms')
+    return counts[0], timings
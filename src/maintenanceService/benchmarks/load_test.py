@@ -0,0 +1,149 @@
+"""
+HTTP load test for the Maintenance Service
+
+Drives a mix of read endpoints with concurrent clients for a fixed duration and
+reports throughput and latency percentiles. By default it starts each server
+itself against the benchmark database, so the development server (`python
+run.py`) and gunicorn (`gunicorn wsgi:app`) can be compared on one machine:
+
+Usage:
+    python benchmarks/load_test.py --server dev gunicorn --rows 50000
+    python benchmarks/load_test.py --url http://localhost:5001 --concurrency 64
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+from common import DEFAULT_URL, create_bench_app, seed_items
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = [
+    '/health',
+    '/api/maintenance/?per_page=50',
+    '/api/maintenance/?per_page=50&cursor=',
+    '/api/maintenance/summary',
+    '/api/maintenance/upcoming?days=7&fields=vehicle_id,status,priority,due_date',
+    '/api/maintenance/vehicle/VH-00042/history',
+]
+
+SERVERS = {
+    'dev': [sys.executable, 'run.py'],
+    'gunicorn': [sys.executable, '-m', 'gunicorn', 'wsgi:app'],
+}
+
+# gunicorn refuses the per-process cache with several workers; --cache-backend redis to include caching
+CACHE_BACKENDS = {'dev': 'memory', 'gunicorn': 'null'}
+
+
+def start_server(kind, port, cache_backend=None):
+    env = dict(
+        os.environ,
+        DATABASE_URL=os.environ.get('BENCH_DATABASE_URL', DEFAULT_URL),
+        FLASK_ENV='development' if kind == 'dev' else 'production',
+        AUTH_DISABLED='true',
+        # Always explicit: the parent's CACHE_BACKEND is the in-process benchmarks' default
+        CACHE_BACKEND=cache_backend or CACHE_BACKENDS[kind],
+        PORT=str(port),
+        HOST='127.0.0.1',
+        GUNICORN_ACCESS_LOG='/dev/null',
+    )
+    process = subprocess.Popen(SERVERS[kind], cwd=SERVICE_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f'{base_url}/health', timeout=1).ok:
+                return process, base_url
+        except requests.RequestException:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f'{kind} server did not become healthy on port {port}')
+
+
+def run_load(base_url, concurrency, duration):
+    """Return (latencies in seconds, error count) from `concurrency` looping clients"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client(offset):
+        session = requests.Session()
+        local, failed, n = [], 0, offset
+        while time.monotonic() < stop_at:
+            path = ENDPOINTS[n % len(ENDPOINTS)]
+            n += 1
+            start = time.perf_counter()
+            try:
+                ok = session.get(base_url + path, timeout=30).status_code < 500
+            except requests.RequestException:
+                ok = False
+            local.append(time.perf_counter() - start)
+            failed += not ok
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0]
+
+
+def report(label, latencies, errors, duration):
+    if not latencies:
+        print(f'{label:<10} no requests completed')
+        return
+    ordered = sorted(latencies)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000
+
+    print(f'{label:<10} requests={len(ordered):<7} errors={errors:<5} rps={len(ordered) / duration:8.1f}  '
+          f'p50={percentile(0.50):7.1f}ms  p95={percentile(0.95):7.1f}ms  p99={percentile(0.99):7.1f}ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', nargs='+', choices=sorted(SERVERS), default=['dev', 'gunicorn'])
+    parser.add_argument('--url', help='Load an already running service instead of starting servers')
+    parser.add_argument('--rows', type=int, default=50_000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--port', type=int, default=5601)
+    parser.add_argument('--cache-backend', choices=['memory', 'redis', 'null'],
+                        help='Servers\' CACHE_BACKEND (default: memory for dev, null for gunicorn)')
+    args = parser.parse_args()
+
+    if args.url:
+        latencies, errors = run_load(args.url.rstrip('/'), args.concurrency, args.duration)
+        report('target', latencies, errors, args.duration)
+        return
+
+    app = create_bench_app()
+    with app.app_context():
+        seed_items(args.rows)
+
+    for kind in args.server:
+        process, base_url = start_server(kind, args.port, args.cache_backend)
+        try:
+            run_load(base_url, args.concurrency, 2)  # warm-up
+            latencies, errors = run_load(base_url, args.concurrency, args.duration)
+            report(kind, latencies, errors, args.duration)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+
+if __name__ == '__main__':
+    main()
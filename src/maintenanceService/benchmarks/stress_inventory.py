@@ -0,0 +1,249 @@
+"""
+Concurrency stress test for parts reservations and stock movements (app.services.inventory)
+
+Worker threads, each with its own app context / session / connection, hammer a few
+"hot" parts at once: they create items that reserve several parts in one statement,
+complete (consume) or cancel (release) them, and restock or take out units directly
+(taking out reserved units shorts the newest reservations). Each worker tallies only
+what it committed. Afterwards, for every part:
+
+- quantity == initial + restocked - used - consumed     (no lost updates)
+- reserved_quantity == units of reservations still open (reservations and counter agree)
+- 0 <= reserved_quantity <= quantity                    (never oversold)
+- the stock ledger sums to quantity - initial           (every change is recorded)
+
+and every open item's reserved plus short units are what it asked for.
+
+--naive replays the restock/use part of the workload with the read-modify-write
+update_part used to do, to show the updates it loses.
+Exits non-zero if an invariant does not hold.
+
+Usage:
+    python benchmarks/stress_inventory.py --workers 8 --ops 300
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/stress_inventory.py --workers 32
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+# A separate file: the workload writes a lot and the schema must include the inventory tables
+os.environ.setdefault('BENCH_DATABASE_URL', 'sqlite:////tmp/maintenance_stress.db')
+os.environ.setdefault('SCHEDULER_ENABLED', 'false')
+# Waiting on other workers' locks is the point here, not a slow query
+os.environ.setdefault('METRICS_SLOW_QUERY_MS', '60000')
+
+from sqlalchemy import delete, func, select  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from common import create_bench_app  # noqa: E402
+
+from app import db  # noqa: E402
+from app.models.maintainance import (  # noqa: E402
+    MaintenanceItem, MaintenancePriority, MaintenanceStatus, Part, PartMovement, PartReservation, ReservationStatus
+)
+from app.services import inventory  # noqa: E402
+
+PREFIX = 'STRESS'
+
+
+def reset(parts, stock):
+    db.create_all()
+    stress_items = select(MaintenanceItem.id).where(MaintenanceItem.id.like(f'{PREFIX}%'))
+    stress_parts = select(Part.id).where(Part.id.like(f'{PREFIX}%'))
+    db.session.execute(delete(PartReservation).where(PartReservation.item_id.in_(stress_items)))
+    db.session.execute(delete(PartMovement).where(PartMovement.part_id.in_(stress_parts)))
+    db.session.execute(delete(MaintenanceItem).where(MaintenanceItem.id.like(f'{PREFIX}%')))
+    db.session.execute(delete(Part).where(Part.id.like(f'{PREFIX}%')))
+    ids = [f'{PREFIX}-P{n}' for n in range(parts)]
+    for part_id in ids:
+        db.session.add(Part(id=part_id, name=part_id, part_number=part_id, category='Stress',
+                            quantity=stock, reserved_quantity=0, min_quantity=0, unit_cost=1.0))
+    db.session.commit()
+    return ids
+
+
+class Worker(threading.Thread):
+    def __init__(self, app, number, part_ids, ops, naive):
+        super().__init__(name=f'worker-{number}')
+        self.app, self.number, self.part_ids, self.ops, self.naive = app, number, part_ids, ops, naive
+        self.rng = random.Random(number)
+        self.restocked, self.used, self.consumed = Counter(), Counter(), Counter()
+        self.open_items = {}  # item_id -> {part_id: quantity} it asked for
+        self.outcomes = Counter()
+        self.error = None
+
+    def run(self):
+        try:
+            with self.app.app_context():
+                for n in range(self.ops):
+                    self.step(n)
+        except Exception as e:  # surfaced by main()
+            self.error = e
+
+    def step(self, n):
+        operation = self.rng.choice(['restock', 'use'] if self.naive else
+                                    ['reserve', 'reserve', 'complete', 'cancel', 'restock', 'use'])
+        try:
+            # Operations return their tally updates; they only apply once the transaction has committed
+            tallies = getattr(self, operation)(n)
+            db.session.commit()
+        except inventory.InsufficientStock:
+            db.session.rollback()
+            self.outcomes[f'{operation} (short)'] += 1
+            return
+        except inventory.StockConflict:
+            db.session.rollback()
+            self.outcomes[f'{operation} (conflict)'] += 1
+            return
+        except OperationalError:
+            # SQLite: "database is locked" once the busy timeout is exhausted
+            db.session.rollback()
+            self.outcomes[f'{operation} (locked)'] += 1
+            return
+        self.outcomes[operation] += 1
+        for apply in tallies:
+            apply()
+
+    def reserve(self, n):
+        item_id = f'{PREFIX}-{self.number}-{n}'
+        required = {part_id: self.rng.randint(1, 3)
+                    for part_id in self.rng.sample(self.part_ids, self.rng.randint(1, len(self.part_ids)))}
+        due = date.today() + timedelta(days=30)
+        db.session.add(MaintenanceItem(
+            id=item_id, vehicle_id=f'{PREFIX}-V{self.number}', type='Stress', priority=MaintenancePriority.LOW,
+            status=MaintenanceStatus.SCHEDULED, due_date=due, projected_due_date=due,
+            current_mileage=0, due_mileage=10000,
+        ))
+        inventory.reserve(item_id, required)
+        return [lambda: self.open_items.__setitem__(item_id, required)]
+
+    def _pick_item(self):
+        return self.rng.choice(list(self.open_items)) if self.open_items else None
+
+    def complete(self, n):
+        item_id = self._pick_item()
+        if not item_id:
+            return []
+        consumed = inventory.consume(item_id)
+        return [lambda: self.consumed.update(consumed), lambda: self.open_items.pop(item_id)]
+
+    def cancel(self, n):
+        item_id = self._pick_item()
+        if not item_id:
+            return []
+        inventory.release(item_id)
+        return [lambda: self.open_items.pop(item_id)]
+
+    def restock(self, n):
+        part_id, quantity = self.rng.choice(self.part_ids), self.rng.randint(1, 5)
+        if self.naive:
+            self._read_modify_write(part_id, quantity)
+        else:
+            inventory.adjust_stock(part_id, quantity, inventory.RESTOCK)
+        return [lambda: self.restocked.update({part_id: quantity})]
+
+    def use(self, n):
+        part_id, quantity = self.rng.choice(self.part_ids), self.rng.randint(1, 5)
+        if self.naive:
+            self._read_modify_write(part_id, -quantity)
+        else:
+            inventory.adjust_stock(part_id, -quantity, inventory.USE)
+        return [lambda: self.used.update({part_id: quantity})]
+
+    def _read_modify_write(self, part_id, delta):
+        part = db.session.get(Part, part_id, populate_existing=True)
+        if part.quantity + delta < part.reserved_quantity:
+            raise inventory.InsufficientStock({part_id: {'requested': -delta, 'available': part.quantity}})
+        time.sleep(0)  # let another worker read the same value
+        part.quantity = part.quantity + delta
+
+
+def check(part_ids, stock, workers, naive):
+    failures = []
+    totals = {name: Counter() for name in ('restocked', 'used', 'consumed')}
+    for worker in workers:
+        for name, counter in totals.items():
+            counter.update(getattr(worker, name))
+
+    held = dict(db.session.execute(
+        select(PartReservation.part_id, func.sum(PartReservation.quantity))
+        .where(PartReservation.status == ReservationStatus.RESERVED, PartReservation.part_id.in_(part_ids))
+        .group_by(PartReservation.part_id)
+    ).all())
+    asked = {(item_id, part_id): quantity for worker in workers
+             for item_id, required in worker.open_items.items() for part_id, quantity in required.items()}
+    covered = Counter({(item_id, part_id): int(quantity) for item_id, part_id, quantity in db.session.execute(
+        select(PartReservation.item_id, PartReservation.part_id, func.sum(PartReservation.quantity))
+        .where(PartReservation.status.in_([ReservationStatus.RESERVED, ReservationStatus.SHORT]),
+               PartReservation.part_id.in_(part_ids))
+        .group_by(PartReservation.item_id, PartReservation.part_id)
+    )})
+    if not naive and covered != Counter(asked):
+        failures.append(f'{sum(1 for key in set(asked) | set(covered) if covered[key] != asked.get(key, 0))} '
+                        f'open item/part pairs whose reserved + short units differ from what they asked for')
+    ledger = dict(db.session.execute(
+        select(PartMovement.part_id, func.sum(PartMovement.delta))
+        .where(PartMovement.part_id.in_(part_ids)).group_by(PartMovement.part_id)
+    ).all())
+
+    for part in Part.query.filter(Part.id.in_(part_ids)).order_by(Part.id):
+        expected = stock + totals['restocked'][part.id] - totals['used'][part.id] - totals['consumed'][part.id]
+        print(f'{part.id}: quantity={part.quantity} expected={expected} reserved={part.reserved_quantity} '
+              f'open reservations={held.get(part.id, 0)} ledger={ledger.get(part.id, 0):+d}')
+        if part.quantity != expected:
+            failures.append(f'{part.id}: quantity {part.quantity}, expected {expected} (lost updates)')
+        if part.reserved_quantity != held.get(part.id, 0):
+            failures.append(f'{part.id}: reserved_quantity {part.reserved_quantity} != open reservations {held.get(part.id, 0)}')
+        if not 0 <= part.reserved_quantity <= part.quantity:
+            failures.append(f'{part.id}: oversold (reserved {part.reserved_quantity} of {part.quantity})')
+        if not naive and ledger.get(part.id, 0) != part.quantity - stock:
+            failures.append(f'{part.id}: ledger sums to {ledger.get(part.id, 0)}, stock moved {part.quantity - stock}')
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--ops', type=int, default=300, help='Operations per worker')
+    parser.add_argument('--parts', type=int, default=3, help='Number of hot parts')
+    parser.add_argument('--stock', type=int, default=50, help='Initial quantity of each part')
+    parser.add_argument('--naive', action='store_true', help='Use read-modify-write stock updates')
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    with app.app_context():
+        part_ids = reset(args.parts, args.stock)
+
+    workers = [Worker(app, n, part_ids, args.ops, args.naive) for n in range(args.workers)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    outcomes = Counter()
+    for worker in workers:
+        outcomes.update(worker.outcomes)
+        if worker.error is not None:
+            print(f'{worker.name} failed: {worker.error!r}')
+    print(f'{args.workers} workers x {args.ops} ops in {elapsed:.1f}s: '
+          + ', '.join(f'{name}={count}' for name, count in sorted(outcomes.items())))
+
+    with app.app_context():
+        failures = check(part_ids, args.stock, workers, args.naive)
+    failures += [f'{worker.name} failed: {worker.error!r}' for worker in workers if worker.error is not None]
+    for failure in failures:
+        print(f'FAIL {failure}')
+    print('FAILED' if failures else 'OK')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Gunicorn configuration for the Maintenance Service
+
+    gunicorn wsgi:app
+
+Workers and threads are derived from the CPUs available to the container
+(GUNICORN_WORKERS / GUNICORN_THREADS override them). Requests mostly wait on
+PostgreSQL, so each worker runs a small thread pool (gthread) on top of the
+usual 2 * CPU + 1 processes.
+
+Graceful worker restart:  kill -HUP <master pid>
+Deploy new code:          kill -USR2 <master pid>, then -WINCH/-QUIT the old master
+                          (the app is preloaded, so HUP alone keeps the old code)
+"""
+
+import os
+
+
+def _cpu_count():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS / Windows
+        return os.cpu_count() or 1
+
+
+cpus = _cpu_count()
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', 5001)}"
+
+worker_class = 'gthread'
+workers = int(os.environ.get('GUNICORN_WORKERS', cpus * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', min(max(cpus * 2, 4), 8)))
+
+# Build the app once in the master; workers fork from it
+preload_app = True
+
+# Graceful restarts: finish in-flight requests, recycle workers to cap memory growth
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 1000))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    """Refuse a per-process read cache when several workers would each keep their own"""
+    cache = server.app.wsgi().extensions.get('cache')
+    if server.cfg.workers > 1 and cache is not None and cache.backend is not None and not cache.shared:
+        raise RuntimeError(
+            f"CACHE_BACKEND={server.app.wsgi().config['CACHE_BACKEND']} is per process: with "
+            f"{server.cfg.workers} workers the others would serve stale reads after a write. "
+            "Use CACHE_BACKEND=redis (or null), or GUNICORN_WORKERS=1"
+        )
+
+
+def post_fork(server, worker):
+    """Give the worker its own connections and start its scheduler"""
+    from app import db
+    from app.utils.scheduler import start_scheduler
+
+    app = worker.app.wsgi()
+    with app.app_context():
+        # Connections opened by the master during preload must not be shared across processes
+        db.engine.dispose(close=False)
+
+    # Fetch the OIDC signing keys in the background before the first request needs them
+    key_store = app.extensions.get('jwks')
+    if key_store is not None:
+        key_store.ensure_refresher()
+
+    # Every worker runs a scheduler; the leader lock lets only one of them execute jobs
+    start_scheduler(app)
+
+
+def worker_exit(server, worker):
+    """Release the scheduler leader lock so another worker can take over immediately"""
+    app = worker.app.wsgi()
+    scheduler = app.extensions.get('scheduler')
+    if scheduler is not None:
+        scheduler.stop()
@@ -90,9 +90,22 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # the full-text search column and its GIN index only exist on PostgreSQL
+    # (see app/models/maintainance.py), so autogenerate must not add them elsewhere
+    def include_object(object, name, type_, reflected, compare_to):
+        if get_engine().dialect.name == 'postgresql':
+            return True
+        if type_ == 'column':
+            return not object.info.get('postgresql_only')
+        if type_ == 'index':
+            return not any(column.info.get('postgresql_only') for column in object.columns)
+        return True
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
     connectable = get_engine()
 
@@ -0,0 +1,28 @@
+"""Add id_sequences counter table
+
+Revision ID: a3f1c9d2e4b7
+Revises: 69ebb1f27825
+Create Date: 2026-10-17 09:12:31.402118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f1c9d2e4b7'
+down_revision = '69ebb1f27825'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('id_sequences',
+    sa.Column('prefix', sa.String(length=20), nullable=False),
+    sa.Column('next_value', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('prefix')
+    )
+
+
+def downgrade():
+    op.drop_table('id_sequences')
@@ -0,0 +1,47 @@
+"""Link maintenance items to technicians and derive active_jobs from items
+
+Revision ID: a9d3f6c2e8b4
+Revises: f4c9a2e7b1d8
+Create Date: 2026-10-17 20:03:18.274461
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d3f6c2e8b4'
+down_revision = 'f4c9a2e7b1d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('maintenance_items', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('technician_id', sa.String(length=50), nullable=True))
+        batch_op.create_foreign_key('fk_maintenance_items_technician_id', 'technicians',
+                                    ['technician_id'], ['id'], ondelete='SET NULL')
+        batch_op.create_index('ix_maintenance_items_technician_status', ['technician_id', 'status'], unique=False)
+
+    # Link by the free-text name where it identifies exactly one technician
+    op.execute(
+        'UPDATE maintenance_items SET technician_id = '
+        '(SELECT t.id FROM technicians t WHERE t.name = maintenance_items.assigned_technician) '
+        'WHERE assigned_technician IS NOT NULL AND '
+        '(SELECT COUNT(*) FROM technicians t WHERE t.name = maintenance_items.assigned_technician) = 1'
+    )
+
+    # active_jobs was edited by hand until now; recount it from the linked items.
+    # completed_jobs is history (older jobs may have no item or no link) and is kept as it is
+    op.execute(
+        'UPDATE technicians SET '
+        "active_jobs = (SELECT COUNT(*) FROM maintenance_items m WHERE m.technician_id = technicians.id "
+        "AND m.status IN ('scheduled', 'due_soon', 'overdue', 'in_progress'))"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('maintenance_items', schema=None) as batch_op:
+        batch_op.drop_index('ix_maintenance_items_technician_status')
+        batch_op.drop_constraint('fk_maintenance_items_technician_id', type_='foreignkey')
+        batch_op.drop_column('technician_id')
@@ -0,0 +1,71 @@
+"""Add part reservations, the stock ledger and Part.reserved_quantity
+
+Revision ID: b6e1c8d4f2a9
+Revises: a9d3f6c2e8b4
+Create Date: 2026-10-17 21:41:52.608137
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e1c8d4f2a9'
+down_revision = 'a9d3f6c2e8b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nothing is reserved yet: open items take their parts when next updated, completed
+    # or re-reserved through POST /api/maintenance/<id>/reservations
+    with op.batch_alter_table('parts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('reserved_quantity', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_check_constraint('ck_parts_reserved_quantity',
+                                         'reserved_quantity >= 0 AND reserved_quantity <= quantity')
+
+    op.create_table('part_reservations',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('item_id', sa.String(length=50), nullable=False),
+    sa.Column('part_id', sa.String(length=50), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('status', sa.Enum('reserved', 'consumed', 'released', 'short', name='reservationstatus'), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['item_id'], ['maintenance_items.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['part_id'], ['parts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('part_reservations', schema=None) as batch_op:
+        batch_op.create_index('ix_part_reservations_item_status', ['item_id', 'status'], unique=False)
+        batch_op.create_index('ix_part_reservations_part_status', ['part_id', 'status'], unique=False)
+
+    op.create_table('part_movements',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('part_id', sa.String(length=50), nullable=False),
+    sa.Column('item_id', sa.String(length=50), nullable=True),
+    sa.Column('delta', sa.Integer(), nullable=False),
+    sa.Column('reason', sa.String(length=20), nullable=False),
+    sa.Column('quantity_after', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['part_id'], ['parts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('part_movements', schema=None) as batch_op:
+        batch_op.create_index('ix_part_movements_part_created', ['part_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('part_movements', schema=None) as batch_op:
+        batch_op.drop_index('ix_part_movements_part_created')
+    op.drop_table('part_movements')
+
+    with op.batch_alter_table('part_reservations', schema=None) as batch_op:
+        batch_op.drop_index('ix_part_reservations_part_status')
+        batch_op.drop_index('ix_part_reservations_item_status')
+    op.drop_table('part_reservations')
+    sa.Enum(name='reservationstatus').drop(op.get_bind(), checkfirst=True)
+
+    with op.batch_alter_table('parts', schema=None) as batch_op:
+        batch_op.drop_constraint('ck_parts_reserved_quantity', type_='check')
+        batch_op.drop_column('reserved_quantity')
@@ -0,0 +1,45 @@
+"""Add weighted full-text search vector to maintenance_items
+
+Revision ID: b7d4e2a91c05
+Revises: a3f1c9d2e4b7
+Create Date: 2026-10-17 11:40:08.913554
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d4e2a91c05'
+down_revision = 'a3f1c9d2e4b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # PostgreSQL only - SQLite uses the in-process inverted index in app/services/search.py
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("""
+        ALTER TABLE maintenance_items ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple',
+                coalesce(id, '') || ' ' || coalesce(vehicle_id, '') || ' ' || coalesce(type, '')), 'A') ||
+            setweight(to_tsvector('simple',
+                coalesce(assigned_technician, '') || ' ' || coalesce(assigned_to, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+        ) STORED
+    """)
+    op.create_index(
+        'ix_maintenance_items_search_vector', 'maintenance_items', ['search_vector'],
+        postgresql_using='gin'
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.drop_index('ix_maintenance_items_search_vector', table_name='maintenance_items')
+    op.drop_column('maintenance_items', 'search_vector')
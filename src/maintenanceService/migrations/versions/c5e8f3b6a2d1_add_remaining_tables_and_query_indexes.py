@@ -0,0 +1,119 @@
+"""Add technicians, parts, recurring_schedules and query-shape indexes
+
+Revision ID: c5e8f3b6a2d1
+Revises: b7d4e2a91c05
+Create Date: 2026-10-17 13:05:47.220961
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e8f3b6a2d1'
+down_revision = 'b7d4e2a91c05'
+branch_labels = None
+depends_on = None
+
+OPEN_STATUSES = sa.text("status IN ('scheduled', 'due_soon')")
+
+
+def upgrade():
+    # These tables were previously only created by db.create_all() on startup,
+    # so existing databases may already have them.
+    existing_tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'technicians' not in existing_tables:
+        op.create_table('technicians',
+        sa.Column('id', sa.String(length=50), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=False),
+        sa.Column('phone', sa.String(length=20), nullable=True),
+        sa.Column('specialization', sa.JSON(), nullable=True),
+        sa.Column('status', sa.Enum('available', 'busy', 'off-duty', name='technicianstatus'), nullable=False),
+        sa.Column('rating', sa.Float(), nullable=True),
+        sa.Column('completed_jobs', sa.Integer(), nullable=True),
+        sa.Column('active_jobs', sa.Integer(), nullable=True),
+        sa.Column('certifications', sa.JSON(), nullable=True),
+        sa.Column('hourly_rate', sa.Float(), nullable=True),
+        sa.Column('join_date', sa.Date(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email')
+        )
+
+    if 'parts' not in existing_tables:
+        op.create_table('parts',
+        sa.Column('id', sa.String(length=50), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('part_number', sa.String(length=50), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('min_quantity', sa.Integer(), nullable=False),
+        sa.Column('unit_cost', sa.Float(), nullable=False),
+        sa.Column('supplier', sa.String(length=100), nullable=True),
+        sa.Column('location', sa.String(length=100), nullable=True),
+        sa.Column('last_restocked', sa.Date(), nullable=True),
+        sa.Column('used_in', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('part_number')
+        )
+
+    if 'recurring_schedules' not in existing_tables:
+        op.create_table('recurring_schedules',
+        sa.Column('id', sa.String(length=50), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('vehicle_id', sa.String(length=50), nullable=False),
+        sa.Column('maintenance_type', sa.String(length=100), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('frequency', sa.Enum('daily', 'weekly', 'monthly', 'quarterly', 'yearly', 'mileage-based', name='frequencytype'), nullable=False),
+        sa.Column('frequency_value', sa.Integer(), nullable=False),
+        sa.Column('estimated_cost', sa.Float(), nullable=True),
+        sa.Column('estimated_duration', sa.Float(), nullable=True),
+        sa.Column('assigned_to', sa.String(length=200), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('last_executed', sa.DateTime(), nullable=True),
+        sa.Column('next_scheduled', sa.DateTime(), nullable=True),
+        sa.Column('total_executions', sa.Integer(), nullable=True),
+        sa.Column('created_date', sa.Date(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+    with op.batch_alter_table('maintenance_items', schema=None) as batch_op:
+        batch_op.create_index('ix_maintenance_items_list_order',
+                              [sa.text('status DESC'), sa.text('priority DESC'), 'due_date', 'id'], unique=False)
+        batch_op.create_index('ix_maintenance_items_status_due_date', ['status', 'due_date'], unique=False)
+        batch_op.create_index('ix_maintenance_items_open_due_date', ['due_date'], unique=False,
+                              postgresql_where=OPEN_STATUSES, sqlite_where=OPEN_STATUSES)
+        batch_op.create_index('ix_maintenance_items_vehicle_due_date', ['vehicle_id', 'due_date'], unique=False)
+        batch_op.create_index('ix_maintenance_items_type_status', ['type', 'status'], unique=False)
+        batch_op.create_index('ix_maintenance_items_created_at', ['created_at'], unique=False)
+
+    with op.batch_alter_table('recurring_schedules', schema=None) as batch_op:
+        batch_op.create_index('ix_recurring_schedules_active_next', ['next_scheduled'], unique=False,
+                              postgresql_where=sa.text('is_active'), sqlite_where=sa.text('is_active'))
+
+
+def downgrade():
+    with op.batch_alter_table('recurring_schedules', schema=None) as batch_op:
+        batch_op.drop_index('ix_recurring_schedules_active_next')
+
+    with op.batch_alter_table('maintenance_items', schema=None) as batch_op:
+        batch_op.drop_index('ix_maintenance_items_created_at')
+        batch_op.drop_index('ix_maintenance_items_type_status')
+        batch_op.drop_index('ix_maintenance_items_vehicle_due_date')
+        batch_op.drop_index('ix_maintenance_items_open_due_date')
+        batch_op.drop_index('ix_maintenance_items_status_due_date')
+        batch_op.drop_index('ix_maintenance_items_list_order')
+
+    op.drop_table('recurring_schedules')
+    op.drop_table('parts')
+    op.drop_table('technicians')
+
+    sa.Enum(name='frequencytype').drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name='technicianstatus').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,28 @@
+"""Link maintenance items to the recurring schedule occurrence they were generated from
+
+Revision ID: d2a7c4e9f6b3
+Revises: c5e8f3b6a2d1
+Create Date: 2026-10-17 16:42:10.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a7c4e9f6b3'
+down_revision = 'c5e8f3b6a2d1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('maintenance_items', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('schedule_id', sa.String(length=50), nullable=True))
+        batch_op.create_index('ux_maintenance_items_schedule_due_date', ['schedule_id', 'due_date'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('maintenance_items', schema=None) as batch_op:
+        batch_op.drop_index('ux_maintenance_items_schedule_due_date')
+        batch_op.drop_column('schedule_id')
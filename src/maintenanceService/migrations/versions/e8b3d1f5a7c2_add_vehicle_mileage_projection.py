@@ -0,0 +1,73 @@
+"""Odometer time series, per-vehicle mileage rates and projected due dates
+
+Revision ID: e8b3d1f5a7c2
+Revises: d2a7c4e9f6b3
+Create Date: 2026-10-17 18:05:44.902113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8b3d1f5a7c2'
+down_revision = 'd2a7c4e9f6b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('odometer_readings',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('vehicle_id', sa.String(length=50), nullable=False),
+    sa.Column('reading_date', sa.Date(), nullable=False),
+    sa.Column('odometer', sa.Integer(), nullable=False),
+    sa.Column('recorded_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('vehicle_id', 'reading_date', name='uq_odometer_readings_vehicle_date')
+    )
+    op.create_table('vehicle_mileage',
+    sa.Column('vehicle_id', sa.String(length=50), nullable=False),
+    sa.Column('odometer', sa.Integer(), nullable=False),
+    sa.Column('odometer_date', sa.Date(), nullable=False),
+    sa.Column('daily_rate', sa.Float(), nullable=True),
+    sa.Column('sample_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('vehicle_id')
+    )
+
+    # Existing items have no mileage projection yet: start from the calendar due date
+    with op.batch_alter_table('maintenance_items', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('projected_due_date', sa.Date(), nullable=True))
+    op.execute('UPDATE maintenance_items SET projected_due_date = due_date')
+    with op.batch_alter_table('maintenance_items', schema=None) as batch_op:
+        batch_op.alter_column('projected_due_date', existing_type=sa.Date(), nullable=False)
+        batch_op.create_index('ix_maintenance_items_status_projected_due', ['status', 'projected_due_date'], unique=False)
+
+    with op.batch_alter_table('recurring_schedules', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('next_due_mileage', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_recurring_schedules_vehicle_frequency', ['vehicle_id', 'frequency'], unique=False)
+
+    # Seed the time series from the mileage snapshots already recorded on items;
+    # the refresh_mileage job fits rates and projections from it
+    # (SQLite has no DATE type: CAST(... AS DATE) would yield a number there)
+    day = 'date(created_at)' if op.get_bind().dialect.name == 'sqlite' else 'CAST(created_at AS DATE)'
+    op.execute(
+        'INSERT INTO odometer_readings (vehicle_id, reading_date, odometer, recorded_at) '
+        f'SELECT vehicle_id, {day}, MAX(current_mileage), MAX(created_at) '
+        'FROM maintenance_items WHERE created_at IS NOT NULL AND current_mileage IS NOT NULL '
+        f'GROUP BY vehicle_id, {day}'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('recurring_schedules', schema=None) as batch_op:
+        batch_op.drop_index('ix_recurring_schedules_vehicle_frequency')
+        batch_op.drop_column('next_due_mileage')
+
+    with op.batch_alter_table('maintenance_items', schema=None) as batch_op:
+        batch_op.drop_index('ix_maintenance_items_status_projected_due')
+        batch_op.drop_column('projected_due_date')
+
+    op.drop_table('vehicle_mileage')
+    op.drop_table('odometer_readings')
@@ -0,0 +1,30 @@
+"""Partial index of open, unassigned maintenance items for batch technician assignment
+
+Revision ID: f4c9a2e7b1d8
+Revises: e8b3d1f5a7c2
+Create Date: 2026-10-17 19:12:37.551820
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4c9a2e7b1d8'
+down_revision = 'e8b3d1f5a7c2'
+branch_labels = None
+depends_on = None
+
+UNASSIGNED = "status IN ('scheduled', 'due_soon', 'overdue') AND assigned_technician IS NULL"
+
+
+def upgrade():
+    with op.batch_alter_table('maintenance_items', schema=None) as batch_op:
+        batch_op.create_index('ix_maintenance_items_unassigned', ['projected_due_date'], unique=False,
+                              postgresql_where=sa.text(UNASSIGNED),
+                              sqlite_where=sa.text(UNASSIGNED))
+
+
+def downgrade():
+    with op.batch_alter_table('maintenance_items', schema=None) as batch_op:
+        batch_op.drop_index('ix_maintenance_items_unassigned')
@@ -1,10 +1,9 @@
 from app import create_app, db
 from app.models.maintainance import MaintenanceItem
 from app.utils.database_seeder import initialize_database, seed_database
+from app.utils.scheduler import start_scheduler
 import os
 import logging
-import threading
-import time
 
 # Configure logging
 logging.basicConfig(
@@ -52,18 +51,15 @@ if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5001))
     host = os.environ.get('HOST', '0.0.0.0')
     
-    def heartbeat():
-        """Log a heartbeat message every 10 seconds"""
-        while True:
-            logger.info("💓 Maintenance Service is alive and running...")
-            time.sleep(10)
-
-    # Start heartbeat in a background thread
-    threading.Thread(target=heartbeat, daemon=True).start()
+    # Start periodic background jobs (status updates, ...)
+    # Skip the reloader's parent process so jobs only run in the serving process
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true' or not app.debug:
+        start_scheduler(app)
 
+    # Development server only - production runs `gunicorn wsgi:app`
     logger.info(f"🌐 Starting server on {host}:{port}")
     app.run(
         host=host,
         port=port,
-        debug=True
+        debug=app.debug
     )
@@ -0,0 +1,25 @@
+"""
+WSGI entrypoint for production servers
+
+    gunicorn wsgi:app            # settings from gunicorn.conf.py
+
+With preload_app the app (and the database initialization) is built once in the
+gunicorn master and shared copy-on-write by the workers; per-process resources
+(connection pool, scheduler) are set up in the post_fork hook.
+"""
+
+import logging
+import os
+
+from app import create_app
+from app.utils.database_seeder import initialize_database
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+app = create_app(os.environ.get('FLASK_ENV', 'production'))
+
+with app.app_context():
+    initialize_database()